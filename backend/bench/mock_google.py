@@ -0,0 +1,302 @@
+import json
+import random
+import re
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+try:
+    import jwt
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from jwt.algorithms import RSAAlgorithm
+except ImportError:
+    jwt = None
+
+
+class MockGoogleServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class MockGoogleHandler(BaseHTTPRequestHandler):
+    """
+    Local stand-in for the Google endpoints the app calls. Point
+    GOOGLE_API_BASE_URL and GOOGLE_OAUTH2_BASE_URL at the server to run the
+    app without touching googleapis.com. error_rate is the share of calls
+    answered with a 503 backendError.
+    """
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    latency = 0.0
+    error_rate = 0.0
+    events_per_month = 100
+    jwks = {'keys': []}
+    signing_key = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        self._delay()
+        if self._fail():
+            return
+
+        if url.path.endswith('/events'):
+            page = self._list_events(query)
+            if page.get('etag') and self.headers.get('If-None-Match') == page['etag']:
+                return self._send_not_modified(page['etag'])
+            return self._send_json(200, page)
+        if url.path.endswith('/calendarList'):
+            return self._send_json(200, {'items': [
+                {'id': 'primary', 'summary': 'Mock', 'primary': True, 'accessRole': 'owner'},
+                {'id': 'team@group.calendar.google.com', 'summary': 'Team', 'accessRole': 'writer'},
+            ]})
+        if url.path.endswith('/certs'):
+            return self._send_json(200, self.jwks, {'Cache-Control': 'public, max-age=21600'})
+        if url.path.endswith('/tokeninfo') and 'id_token' in query:
+            return self._send_json(200, {'iss': 'https://accounts.google.com', 'sub': '1000',
+                                         'email': 'mock@example.com', 'aud': 'mock-client'})
+        if url.path.endswith('/tokeninfo'):
+            return self._send_json(200, {'expires_in': '3599', 'scope': 'https://www.googleapis.com/auth/calendar',
+                                         'sub': '1000', 'email': 'mock@example.com', 'aud': 'mock-client'})
+        self._send_json(404, {'error': {'code': 404, 'message': 'Not Found'}})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        body = self._read_body()
+        self._delay()
+        if self._fail():
+            return
+
+        if url.path.endswith('/events'):
+            return self._send_json(200, _created_event(json.loads(body or b'{}')))
+        if url.path.endswith('/events/watch'):
+            return self._send_json(200, _watch_channel(json.loads(body or b'{}')))
+        if url.path.endswith('/channels/stop'):
+            return self._send_json(200, {})
+        if url.path.endswith('/batch/calendar/v3'):
+            return self._send_batch(body)
+        if url.path.endswith('/freeBusy'):
+            return self._send_json(200, self._free_busy(json.loads(body or b'{}')))
+        if url.path.endswith('/token'):
+            form = {key: values[0] for key, values in parse_qs(body.decode()).items()}
+            return self._send_json(200, self._token(form))
+        self._send_json(404, {'error': {'code': 404, 'message': 'Not Found'}})
+
+    def do_DELETE(self):
+        self._delay()
+        if self._fail():
+            return
+        self.send_response(204)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _delay(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _fail(self):
+        if not self.error_rate or random.random() >= self.error_rate:
+            return False
+        self._send_json(503, {'error': {'code': 503, 'message': 'Backend Error',
+                                        'errors': [{'reason': 'backendError'}]}})
+        return True
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_not_modified(self, etag):
+        self.send_response(304)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def _send_batch(self, body):
+        boundary = re.search(r'boundary="?([^";]+)"?', self.headers.get('Content-Type', '')).group(1)
+        response_boundary = f'batch_{uuid.uuid4().hex}'
+        parts = []
+
+        for part in body.decode().replace('\r\n', '\n').split(f'--{boundary}')[1:]:
+            if part.startswith('--'):
+                break
+            outer_headers, _, http_request = part.strip('\n').partition('\n\n')
+            content_id = re.search(r'Content-ID:\s*<(.+?)>', outer_headers, re.IGNORECASE).group(1)
+            request_line, _, rest = http_request.partition('\n')
+            _, _, content = rest.partition('\n\n')
+
+            if request_line.startswith('POST'):
+                status_line, payload = '200 OK', json.dumps(_created_event(json.loads(content or '{}')))
+            else:
+                status_line, payload = '204 No Content', ''
+
+            parts.append(
+                f'--{response_boundary}\r\nContent-Type: application/http\r\n'
+                f'Content-ID: <response-{content_id}>\r\n\r\n'
+                f'HTTP/1.1 {status_line}\r\nContent-Type: application/json\r\n\r\n{payload}\r\n'
+            )
+
+        response_body = (''.join(parts) + f'--{response_boundary}--\r\n').encode()
+        self.send_response(200)
+        self.send_header('Content-Type', f'multipart/mixed; boundary={response_boundary}')
+        self.send_header('Content-Length', str(len(response_body)))
+        self.end_headers()
+        self.wfile.write(response_body)
+
+    def _list_events(self, query):
+        if 'syncToken' in query:
+            return {'items': [], 'nextSyncToken': uuid.uuid4().hex}
+
+        now = datetime.now(timezone.utc)
+        window_start = _parse_time(query.get('timeMin')) or now.replace(day=1, hour=0, minute=0, second=0,
+                                                                         microsecond=0)
+        window_end = _parse_time(query.get('timeMax')) or window_start + timedelta(days=31)
+        count = max(1, int(self.events_per_month * (window_end - window_start).days / 30))
+
+        offset = int(query.get('pageToken') or 0)
+        page_size = int(query.get('maxResults') or 250)
+        if query.get('orderBy') == 'startTime':
+            events = sorted(
+                (synthetic_event(index, window_start, window_end) for index in range(count)),
+                key=lambda event: event['start']['dateTime']
+            )
+            items = events[offset:offset + page_size]
+        else:
+            items = [
+                synthetic_event(index, window_start, window_end)
+                for index in range(offset, min(offset + page_size, count))
+            ]
+
+        page = {'etag': f'"{window_start.timestamp():.0f}-{window_end.timestamp():.0f}-{count}"', 'items': items}
+        if offset + page_size < count:
+            page['nextPageToken'] = str(offset + page_size)
+        else:
+            page['nextSyncToken'] = uuid.uuid4().hex
+        return page
+
+    def _token(self, form):
+        token = {'access_token': f'mock-{uuid.uuid4().hex}', 'expires_in': 3599, 'token_type': 'Bearer'}
+        if form.get('grant_type') != 'authorization_code' or self.signing_key is None:
+            return token
+
+        # Each authorization code logs in its own mock user.
+        now = int(time.time())
+        code = form.get('code', 'mock')
+        token['refresh_token'] = f'mock-refresh-{code}'
+        token['id_token'] = jwt.encode({
+            'iss': 'https://accounts.google.com',
+            'aud': form.get('client_id'),
+            'sub': f'mock-{code}',
+            'email': f'{code}@example.com',
+            'email_verified': True,
+            'given_name': 'Mock',
+            'family_name': code,
+            'iat': now,
+            'exp': now + 3600,
+        }, self.signing_key, algorithm='RS256', headers={'kid': 'mock'})
+        return token
+
+    def _free_busy(self, query):
+        window_start = _parse_time(query['timeMin'])
+        window_end = _parse_time(query['timeMax'])
+        count = max(1, int(self.events_per_month * (window_end - window_start).days / 30))
+        events = [synthetic_event(index, window_start, window_end) for index in range(count)]
+        busy = [{'start': event['start']['dateTime'], 'end': event['end']['dateTime']} for event in events]
+
+        return {
+            'kind': 'calendar#freeBusy',
+            'timeMin': query['timeMin'],
+            'timeMax': query['timeMax'],
+            'calendars': {item['id']: {'busy': busy} for item in query.get('items', [])},
+        }
+
+
+def _parse_time(value):
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def _created_event(event):
+    event.update({'id': uuid.uuid4().hex, 'status': 'confirmed'})
+    return event
+
+
+def _watch_channel(body):
+    ttl = int(body.get('params', {}).get('ttl', 604800))
+    return {
+        'kind': 'api#channel',
+        'id': body.get('id'),
+        'resourceId': f'resource-{uuid.uuid4().hex}',
+        'token': body.get('token'),
+        'expiration': str(int((time.time() + ttl) * 1000)),
+    }
+
+
+def synthetic_event(index, window_start, window_end):
+    rng = random.Random(f'{window_start.isoformat()}-{index}')
+    span_minutes = max(60, int((window_end - window_start).total_seconds() // 60) - 60)
+    start = window_start + timedelta(minutes=15 * rng.randrange(span_minutes // 15))
+    end = start + timedelta(minutes=15 * rng.randint(1, 8))
+
+    return {
+        'id': f'mock{window_start:%Y%m}{index:06d}',
+        'etag': f'"{index}"',
+        'status': 'confirmed',
+        'summary': f'Mock event {index}',
+        'description': 'Generated by the mock Google server',
+        'htmlLink': f'https://calendar.google.com/event?eid=mock{index}',
+        'creator': {'email': 'mock@example.com', 'self': True},
+        'start': {'dateTime': start.isoformat().replace('+00:00', 'Z')},
+        'end': {'dateTime': end.isoformat().replace('+00:00', 'Z')},
+        'updated': window_start.isoformat().replace('+00:00', 'Z'),
+    }
+
+
+def _signing_keys():
+    """
+    Key pair the mock signs ID tokens with, or (None, None) without PyJWT
+    and cryptography installed.
+    """
+    if jwt is None:
+        return None, None
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk.update({'kid': 'mock', 'alg': 'RS256', 'use': 'sig'})
+    return private_key, {'keys': [jwk]}
+
+
+def make_server(host='127.0.0.1', port=0, latency=0.0, events_per_month=100, jwks=None, error_rate=0.0):
+    """
+    Build a mock server. Without jwks it generates its own signing key, so
+    /token answers authorization code grants with an ID token the app can
+    verify against /certs.
+    """
+    signing_key = None
+    if jwks is None:
+        signing_key, jwks = _signing_keys()
+
+    handler = type('ConfiguredMockGoogleHandler', (MockGoogleHandler,), {
+        'latency': latency,
+        'error_rate': error_rate,
+        'events_per_month': events_per_month,
+        'jwks': jwks or {'keys': []},
+        'signing_key': signing_key,
+    })
+    return MockGoogleServer((host, port), handler)
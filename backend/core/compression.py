@@ -0,0 +1,75 @@
+import re
+
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import decorator_from_middleware
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+re_accepts_brotli = re.compile(r'\bbr\b')
+
+
+def _brotli_sequence(sequence, quality):
+    compressor = brotli.Compressor(quality=quality)
+    for chunk in sequence:
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def _abrotli_sequence(sequence, quality):
+    compressor = brotli.Compressor(quality=quality)
+    async for chunk in sequence:
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware that prefers brotli when the brotli package is installed
+    and the client accepts it. Streamed event lists are compressed chunk by
+    chunk as they are produced.
+    """
+
+    def process_response(self, request, response):
+        if brotli is None or not re_accepts_brotli.search(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+            return super().process_response(request, response)
+
+        if not response.streaming and len(response.content) < 200:
+            return response
+
+        if response.has_header('Content-Encoding'):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        quality = settings.BROTLI_QUALITY
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = _abrotli_sequence(response.streaming_content, quality)
+            else:
+                response.streaming_content = _brotli_sequence(response.streaming_content, quality)
+            del response.headers['Content-Length']
+        else:
+            compressed_content = brotli.compress(response.content, quality=quality)
+            if len(compressed_content) >= len(response.content):
+                return response
+            response.content = compressed_content
+            response.headers['Content-Length'] = str(len(response.content))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+
+        return response
+
+
+compress_page = decorator_from_middleware(CompressionMiddleware)
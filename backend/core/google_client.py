@@ -0,0 +1,154 @@
+import asyncio
+import threading
+import time
+import weakref
+import httpx
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from . import metrics, rate_limit
+
+# 429s are not retried here; rate_limit.after_call owns the Retry-After
+# backoff for them.
+RETRY_STATUSES = (500, 502, 503, 504)
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS'})
+
+
+class GoogleRetry(Retry):
+    # urllib3 retries any 413/429/503 carrying Retry-After, whatever the
+    # status_forcelist says.
+    RETRY_AFTER_STATUS_CODES = frozenset({503})
+
+
+_session = None
+_session_lock = threading.Lock()
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def api_url(path):
+    return f'{settings.GOOGLE_API_BASE_URL}{path}'
+
+
+def oauth2_url(path):
+    return f'{settings.GOOGLE_OAUTH2_BASE_URL}{path}'
+
+
+def _build_session():
+    retry = GoogleRetry(
+        total=settings.GOOGLE_HTTP_RETRIES,
+        backoff_factor=settings.GOOGLE_HTTP_BACKOFF,
+        status_forcelist=RETRY_STATUSES,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=settings.GOOGLE_HTTP_POOL_CONNECTIONS,
+        pool_maxsize=settings.GOOGLE_HTTP_POOL_SIZE,
+        max_retries=retry,
+    )
+
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session():
+    """
+    Return the process-wide session. Connections to Google are pooled and
+    kept alive between requests, and idempotent calls are retried with
+    backoff on 5xx responses.
+    """
+    global _session
+
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def request(method, url, cost=1, **kwargs):
+    """
+    Send a request through the pooled session. Calendar API calls are
+    charged cost tokens against the per-user and project budgets first and
+    raise RateLimited when either is exhausted or Google throttles us.
+    """
+    kwargs.setdefault('timeout', (settings.GOOGLE_HTTP_CONNECT_TIMEOUT, settings.GOOGLE_HTTP_READ_TIMEOUT))
+    rate_limit.before_call(url, cost)
+    started = time.perf_counter()
+    status = 'error'
+    try:
+        response = get_session().request(method, url, **kwargs)
+        status = response.status_code
+        rate_limit.after_call(url, response)
+        return response
+    finally:
+        metrics.observe_google(method, url, status, time.perf_counter() - started)
+
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
+
+
+def delete(url, **kwargs):
+    return request('DELETE', url, **kwargs)
+
+
+def get_async_client():
+    """
+    Return the httpx client for the running event loop. httpx pools are
+    bound to the loop they were created on, so each loop gets its own.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.GOOGLE_HTTP_ASYNC_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.GOOGLE_HTTP_POOL_SIZE,
+            ),
+            timeout=httpx.Timeout(settings.GOOGLE_HTTP_READ_TIMEOUT, connect=settings.GOOGLE_HTTP_CONNECT_TIMEOUT),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+async def arequest(method, url, cost=1, **kwargs):
+    client = get_async_client()
+    attempt = 0
+    await sync_to_async(rate_limit.before_call)(url, cost)
+    started = time.perf_counter()
+    status = 'error'
+    try:
+        while True:
+            response = await client.request(method, url, **kwargs)
+            status = response.status_code
+            if (response.status_code not in RETRY_STATUSES or method not in IDEMPOTENT_METHODS
+                    or attempt >= settings.GOOGLE_HTTP_RETRIES):
+                await sync_to_async(rate_limit.after_call)(url, response)
+                return response
+
+            await asyncio.sleep(rate_limit.retry_delay(response, attempt))
+            attempt += 1
+    finally:
+        metrics.observe_google(method, url, status, time.perf_counter() - started)
+
+
+async def aget(url, **kwargs):
+    return await arequest('GET', url, **kwargs)
+
+
+async def apost(url, **kwargs):
+    return await arequest('POST', url, **kwargs)
+
+
+async def adelete(url, **kwargs):
+    return await arequest('DELETE', url, **kwargs)
@@ -0,0 +1,154 @@
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from urllib.parse import urlparse
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+_UPSTREAM_IDS = [
+    (re.compile(r'/calendars/[^/]+'), '/calendars/{calendarId}'),
+    (re.compile(r'/events/[^/]+'), '/events/{eventId}'),
+]
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    def __init__(self, name, documentation, labels):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labels, label_values)} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labels, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(label_values)
+            if series is None:
+                series = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for label_values, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + ('+Inf',), counts):
+                    cumulative += count
+                    le = f'le="{bound}"'
+                    lines.append(f'{self.name}_bucket{_format_labels(self.labels, label_values, le)} {cumulative}')
+                lines.append(f'{self.name}_sum{_format_labels(self.labels, label_values)} {total}')
+                lines.append(f'{self.name}_count{_format_labels(self.labels, label_values)} {cumulative}')
+        return lines
+
+
+request_duration = Histogram(
+    'http_request_duration_seconds', 'Time to produce a response, per endpoint.',
+    ('endpoint', 'method', 'status'), LATENCY_BUCKETS)
+request_queries = Histogram(
+    'http_request_db_queries', 'SQL statements executed per request.', ('endpoint',), QUERY_BUCKETS)
+google_duration = Histogram(
+    'google_request_duration_seconds', 'Latency of outbound Google API calls, including retries.',
+    ('endpoint', 'method', 'status'), LATENCY_BUCKETS)
+cache_requests = Counter(
+    'cache_requests_total', 'Cache lookups by cache and result.', ('cache', 'result'))
+prefetch_jobs = Counter(
+    'calendar_prefetch_jobs_total', 'Background month prefetch jobs by outcome.', ('result',))
+
+REGISTRY = [request_duration, request_queries, google_duration, cache_requests, prefetch_jobs]
+
+
+class RequestTimings:
+    """
+    Time spent waiting on Google and the database while serving one
+    request, reported through Server-Timing.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.google_seconds = 0.0
+        self.google_calls = 0
+        self.db_seconds = 0.0
+        self.db_queries = 0
+
+    def db_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - started
+            self.db_queries += 1
+
+    def server_timing(self):
+        total = time.perf_counter() - self.started
+        return ', '.join([
+            f'google;dur={self.google_seconds * 1000:.1f};desc="{self.google_calls} calls"',
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{self.db_queries} queries"',
+            f'app;dur={(total - self.google_seconds - self.db_seconds) * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+
+current_timings = ContextVar('current_timings', default=None)
+
+
+def upstream_endpoint(url):
+    path = urlparse(url).path
+    for pattern, replacement in _UPSTREAM_IDS:
+        path = pattern.sub(replacement, path)
+    return path
+
+
+def observe_google(method, url, status, seconds):
+    google_duration.observe(seconds, upstream_endpoint(url), method, str(status))
+
+    timings = current_timings.get()
+    if timings is not None:
+        timings.google_seconds += seconds
+        timings.google_calls += 1
+
+
+def record_cache(cache_name, hit):
+    cache_requests.inc(cache_name, 'hit' if hit else 'miss')
+
+
+def expose():
+    lines = []
+    for metric in REGISTRY:
+        lines += metric.expose()
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,98 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connection
+
+from . import metrics, rate_limit
+
+
+def _endpoint(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.route if match is not None else 'unmatched'
+
+
+class MetricsMiddleware:
+    """
+    Record per-endpoint latency and SQL statement counts, and optionally
+    add a Server-Timing header that splits the request into time spent on
+    Google, the database and the app itself. Streamed bodies are produced
+    after the response leaves the middleware and are not included.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        timings = metrics.RequestTimings()
+        token = metrics.current_timings.set(timings)
+        try:
+            with connection.execute_wrapper(timings.db_wrapper):
+                response = self.get_response(request)
+        finally:
+            metrics.current_timings.reset(token)
+
+        return self._finish(request, response, timings, count_queries=True)
+
+    async def __acall__(self, request):
+        # Queries run in sync_to_async worker threads on their own
+        # connections, so only Google time is split out for async views.
+        timings = metrics.RequestTimings()
+        token = metrics.current_timings.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.current_timings.reset(token)
+
+        return self._finish(request, response, timings, count_queries=False)
+
+    @staticmethod
+    def _finish(request, response, timings, count_queries):
+        endpoint = _endpoint(request)
+        metrics.request_duration.observe(
+            time.perf_counter() - timings.started, endpoint, request.method, str(response.status_code)
+        )
+        if count_queries:
+            metrics.request_queries.observe(timings.db_queries, endpoint)
+
+        if settings.METRICS_SERVER_TIMING:
+            response['Server-Timing'] = timings.server_timing()
+        return response
+
+
+class RateLimitContextMiddleware:
+    """
+    Expose the current request to the Google rate limiter so calls made
+    while serving it are charged to the requesting user.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        token = rate_limit.current_request.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            rate_limit.current_request.reset(token)
+
+    async def __acall__(self, request):
+        token = rate_limit.current_request.set(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            rate_limit.current_request.reset(token)
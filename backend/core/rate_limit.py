@@ -0,0 +1,226 @@
+import json
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from types import SimpleNamespace
+from email.utils import parsedate_to_datetime
+
+from django.conf import settings
+from django.core.cache import cache
+
+RATE_LIMIT_STATUSES = (403, 429)
+RATE_LIMIT_REASONS = frozenset({'rateLimitExceeded', 'userRateLimitExceeded', 'quotaExceeded'})
+LIMITED_PATHS = ('/calendar/v3/', '/batch/calendar/v3')
+
+# Swapped out for a fake clock in tests.
+clock = time.time
+
+current_request = ContextVar('rate_limit_request', default=None)
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f'Google API budget exhausted, retry after {retry_after:.1f}s')
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Token bucket kept in the shared cache so every worker draws from the
+    same budget. Updates are serialized with a short cache lock; if the
+    lock cannot be taken the call is let through rather than blocked.
+    """
+
+    def __init__(self, key, rate, capacity):
+        self.key = key
+        self.rate = rate
+        self.capacity = capacity
+
+    def take(self, tokens=1):
+        """
+        Take tokens and return 0, or return the seconds until enough tokens
+        will be available without taking any.
+        """
+        tokens = min(tokens, self.capacity)
+        lock_key = f'{self.key}:lock'
+        if not _acquire(lock_key):
+            return 0
+
+        try:
+            now = clock()
+            available = self._available(now)
+
+            if available < tokens:
+                cache.set(self.key, (available, now), self._ttl())
+                return (tokens - available) / self.rate
+
+            cache.set(self.key, (available - tokens, now), self._ttl())
+            return 0
+        finally:
+            cache.delete(lock_key)
+
+    def give(self, tokens=1):
+        """
+        Return tokens taken for a call that was not made after all.
+        """
+        tokens = min(tokens, self.capacity)
+        lock_key = f'{self.key}:lock'
+        if not _acquire(lock_key):
+            return
+
+        try:
+            now = clock()
+            cache.set(self.key, (min(self.capacity, self._available(now) + tokens), now), self._ttl())
+        finally:
+            cache.delete(lock_key)
+
+    def available(self):
+        return self._available(clock())
+
+    def _available(self, now):
+        available, updated_at = cache.get(self.key) or (self.capacity, now)
+        return min(self.capacity, available + max(0.0, now - updated_at) * self.rate)
+
+    def _ttl(self):
+        return int(self.capacity / self.rate) + 60
+
+
+def _acquire(lock_key, attempts=20):
+    for _ in range(attempts):
+        if cache.add(lock_key, 1, 2):
+            return True
+        time.sleep(0.002)
+    return False
+
+
+def retry_delay(response, attempt):
+    retry_after = response.headers.get('Retry-After')
+    if retry_after:
+        if retry_after.isdigit():
+            return int(retry_after)
+        try:
+            return max(0, parsedate_to_datetime(retry_after).timestamp() - clock())
+        except (TypeError, ValueError):
+            pass
+    return settings.GOOGLE_HTTP_BACKOFF * (2 ** attempt)
+
+
+def _limited(url):
+    return settings.GOOGLE_RATE_LIMIT_ENABLED and any(path in url for path in LIMITED_PATHS)
+
+
+@contextmanager
+def charged_to(user):
+    """
+    Charge Google calls made outside a request, e.g. by background jobs,
+    to user.
+    """
+    token = current_request.set(SimpleNamespace(user=user))
+    try:
+        yield
+    finally:
+        current_request.reset(token)
+
+
+def _user_id():
+    user = getattr(current_request.get(), 'user', None)
+    if user is None or not user.is_authenticated:
+        return None
+    return user.pk
+
+
+def _buckets(user_id):
+    buckets = [('project', TokenBucket('google-budget:project', settings.GOOGLE_PROJECT_RATE,
+                                       settings.GOOGLE_PROJECT_BURST))]
+    if user_id is not None:
+        buckets.append((f'user:{user_id}', TokenBucket(f'google-budget:user:{user_id}', settings.GOOGLE_USER_RATE,
+                                                       settings.GOOGLE_USER_BURST)))
+    return buckets
+
+
+def before_call(url, cost=1):
+    """
+    Raise RateLimited instead of calling Google when the project or the
+    requesting user is backing off after a rate limit response, or has
+    spent its budget.
+    """
+    if not _limited(url):
+        return
+
+    buckets = _buckets(_user_id())
+    now = clock()
+    for scope, _ in buckets:
+        until = cache.get(f'google-backoff:{scope}')
+        if until and until > now:
+            raise RateLimited(until - now)
+
+    # A call refused by the user's bucket must not spend the project's
+    # budget, so tokens already taken are handed back.
+    charged = []
+    for _, bucket in buckets:
+        wait = bucket.take(cost)
+        if wait:
+            for taken in charged:
+                taken.give(cost)
+            raise RateLimited(wait)
+        charged.append(bucket)
+
+
+def headroom(user_id=None):
+    """
+    Smallest share of budget left in the project and user buckets, or 0
+    while either is backing off. Optional work checks it to stay out of the
+    way of interactive requests.
+    """
+    if not settings.GOOGLE_RATE_LIMIT_ENABLED:
+        return 1.0
+
+    now = clock()
+    shares = []
+    for scope, bucket in _buckets(user_id):
+        until = cache.get(f'google-backoff:{scope}')
+        if until and until > now:
+            return 0.0
+        shares.append(bucket.available() / bucket.capacity)
+    return min(shares)
+
+
+def _rate_limit_reason(response):
+    if response.status_code == 429:
+        return 'rateLimitExceeded'
+    try:
+        errors = json.loads(response.content).get('error', {}).get('errors', [])
+    except (ValueError, AttributeError):
+        return None
+    reasons = {error.get('reason') for error in errors} & RATE_LIMIT_REASONS
+    return reasons.pop() if reasons else None
+
+
+def after_call(url, response):
+    """
+    When Google answers with a rate limit error, back off the user (for
+    per-user limits) or the whole project, honoring Retry-After and
+    doubling the delay on consecutive limits, and raise RateLimited.
+    """
+    if not _limited(url) or response.status_code not in RATE_LIMIT_STATUSES:
+        return
+
+    reason = _rate_limit_reason(response)
+    if reason is None:
+        return
+
+    user_id = _user_id()
+    scope = f'user:{user_id}' if reason == 'userRateLimitExceeded' and user_id is not None else 'project'
+
+    count_key = f'google-backoff-count:{scope}'
+    cache.add(count_key, 0, settings.GOOGLE_RATE_LIMIT_BACKOFF_RESET)
+    try:
+        attempt = cache.incr(count_key) - 1
+    except ValueError:
+        attempt = 0
+
+    now = clock()
+    delay = min(retry_delay(response, attempt), settings.GOOGLE_RATE_LIMIT_MAX_BACKOFF)
+    until = max(now + delay, cache.get(f'google-backoff:{scope}') or 0)
+    cache.set(f'google-backoff:{scope}', until, int(until - now) + 1)
+    raise RateLimited(until - now)
@@ -0,0 +1,33 @@
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_fallback_encoder = JSONEncoder()
+
+
+def dumps(data):
+    """
+    Serialize data to JSON bytes with orjson when it is installed. Types
+    orjson does not handle natively (lazy strings, Decimal, ...) go through
+    DRF's encoder.
+    """
+    if orjson is None:
+        return _fallback_encoder.encode(data).encode()
+    return orjson.dumps(data, default=_fallback_encoder.default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class ORJSONRenderer(BaseRenderer):
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None:
+            return JSONRenderer().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
@@ -51,6 +51,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'allauth.account.middleware.AccountMiddleware',
     'django.middleware.security.SecurityMiddleware',
@@ -58,6 +59,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.RateLimitContextMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -93,9 +95,35 @@ DATABASES = {
         "PASSWORD": os.getenv('DB_PASSWORD'),
         "HOST": os.getenv('DB_HOST'),
         "PORT": os.getenv('DB_PORT'),
+        "CONN_MAX_AGE": int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        "CONN_HEALTH_CHECKS": os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True',
     }
 }
 
+# Caches
+# A shared cache is needed for cached sessions and for the token and calendar
+# caches to be shared between workers; without REDIS_URL each process keeps
+# its own local-memory cache.
+
+REDIS_URL = os.getenv('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+
+# Sessions are read on every authenticated request. cached_db serves them
+# from the cache and only falls back to the database on a miss, but a
+# per-process cache would keep serving a session after logout in another
+# worker, so it is only the default when a shared cache is configured.
+SESSION_ENGINE = os.getenv(
+    'SESSION_ENGINE',
+    'django.contrib.sessions.backends.cached_db' if REDIS_URL else 'django.contrib.sessions.backends.db'
+)
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -189,3 +217,85 @@ CSRF_TRUSTED_ORIGINS = ['http://localhost:5173', 'http://127.0.0.1:8000']
 
 CORS_ALLOWED_ORIGINS = ["http://localhost:5173"]
 CORS_ALLOW_CREDENTIALS = True
+
+FREE_SLOTS_MAX_DAYS = int(os.getenv('FREE_SLOTS_MAX_DAYS', 31))
+
+CALENDAR_CACHE_TTL = int(os.getenv('CALENDAR_CACHE_TTL', 300))
+CALENDAR_CACHE_MAX_MONTHS = int(os.getenv('CALENDAR_CACHE_MAX_MONTHS', 24))
+
+CALENDAR_SYNC_ENABLED = os.getenv('CALENDAR_SYNC_ENABLED', 'False') == 'True'
+CALENDAR_CACHE_MAX_EVENTS = int(os.getenv('CALENDAR_CACHE_MAX_EVENTS', 2500))
+
+GOOGLE_API_BASE_URL = os.getenv('GOOGLE_API_BASE_URL', 'https://www.googleapis.com')
+GOOGLE_OAUTH2_BASE_URL = os.getenv('GOOGLE_OAUTH2_BASE_URL', 'https://oauth2.googleapis.com')
+GOOGLE_HTTP_POOL_CONNECTIONS = int(os.getenv('GOOGLE_HTTP_POOL_CONNECTIONS', 4))
+GOOGLE_HTTP_POOL_SIZE = int(os.getenv('GOOGLE_HTTP_POOL_SIZE', 20))
+GOOGLE_HTTP_RETRIES = int(os.getenv('GOOGLE_HTTP_RETRIES', 3))
+GOOGLE_HTTP_BACKOFF = float(os.getenv('GOOGLE_HTTP_BACKOFF', 0.3))
+GOOGLE_HTTP_CONNECT_TIMEOUT = float(os.getenv('GOOGLE_HTTP_CONNECT_TIMEOUT', 3.05))
+GOOGLE_HTTP_READ_TIMEOUT = float(os.getenv('GOOGLE_HTTP_READ_TIMEOUT', 10))
+GOOGLE_HTTP_ASYNC_MAX_CONNECTIONS = int(os.getenv('GOOGLE_HTTP_ASYNC_MAX_CONNECTIONS', 500))
+
+CALENDAR_RANGE_MAX_MONTHS = int(os.getenv('CALENDAR_RANGE_MAX_MONTHS', 12))
+CALENDAR_RANGE_WORKERS = int(os.getenv('CALENDAR_RANGE_WORKERS', 4))
+
+TOKENINFO_CACHE_TTL = int(os.getenv('TOKENINFO_CACHE_TTL', 600))
+TOKENINFO_NEGATIVE_TTL = int(os.getenv('TOKENINFO_NEGATIVE_TTL', 60))
+TOKENINFO_EXPIRY_MARGIN = int(os.getenv('TOKENINFO_EXPIRY_MARGIN', 30))
+
+GOOGLE_ID_TOKEN_LEEWAY = int(os.getenv('GOOGLE_ID_TOKEN_LEEWAY', 30))
+# Minimum seconds between cert refetches triggered by an unknown key id.
+GOOGLE_ID_TOKEN_REFETCH_INTERVAL = int(os.getenv('GOOGLE_ID_TOKEN_REFETCH_INTERVAL', 60))
+
+GOOGLE_TOKEN_REFRESH_MARGIN = int(os.getenv('GOOGLE_TOKEN_REFRESH_MARGIN', 300))
+GOOGLE_TOKEN_REFRESH_LOCK_TTL = int(os.getenv('GOOGLE_TOKEN_REFRESH_LOCK_TTL', 15))
+
+CALENDAR_BATCH_MAX_ITEMS = int(os.getenv('CALENDAR_BATCH_MAX_ITEMS', 500))
+
+FREEBUSY_CACHE_TTL = int(os.getenv('FREEBUSY_CACHE_TTL', 120))
+
+CALENDAR_MAX_CALENDARS = int(os.getenv('CALENDAR_MAX_CALENDARS', 20))
+
+USER_PROFILE_CACHE_TTL = int(os.getenv('USER_PROFILE_CACHE_TTL', 900))
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', 5))
+
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+METRICS_SERVER_TIMING = os.getenv('METRICS_SERVER_TIMING', 'False') == 'True'
+
+GOOGLE_RATE_LIMIT_ENABLED = os.getenv('GOOGLE_RATE_LIMIT_ENABLED', 'True') == 'True'
+GOOGLE_USER_RATE = float(os.getenv('GOOGLE_USER_RATE', 5))
+GOOGLE_USER_BURST = int(os.getenv('GOOGLE_USER_BURST', 30))
+GOOGLE_PROJECT_RATE = float(os.getenv('GOOGLE_PROJECT_RATE', 100))
+GOOGLE_PROJECT_BURST = int(os.getenv('GOOGLE_PROJECT_BURST', 500))
+GOOGLE_RATE_LIMIT_MAX_BACKOFF = int(os.getenv('GOOGLE_RATE_LIMIT_MAX_BACKOFF', 60))
+GOOGLE_RATE_LIMIT_BACKOFF_RESET = int(os.getenv('GOOGLE_RATE_LIMIT_BACKOFF_RESET', 300))
+
+CALENDAR_STALE_TTL = int(os.getenv('CALENDAR_STALE_TTL', 86400))
+
+CALENDAR_WEBHOOK_URL = os.getenv('CALENDAR_WEBHOOK_URL')
+CALENDAR_WATCH_TTL = int(os.getenv('CALENDAR_WATCH_TTL', 604800))
+CALENDAR_WATCH_RENEW_MARGIN = int(os.getenv('CALENDAR_WATCH_RENEW_MARGIN', 86400))
+CALENDAR_WATCHED_CACHE_TTL = int(os.getenv('CALENDAR_WATCHED_CACHE_TTL', 86400))
+
+# Dotted path to the backend that runs month prefetch jobs; empty disables prefetching.
+CALENDAR_PREFETCH_BACKEND = os.getenv('CALENDAR_PREFETCH_BACKEND', 'google_calendar.prefetch.ThreadPoolBackend')
+CALENDAR_PREFETCH_WORKERS = int(os.getenv('CALENDAR_PREFETCH_WORKERS', 2))
+CALENDAR_PREFETCH_QUEUE_SIZE = int(os.getenv('CALENDAR_PREFETCH_QUEUE_SIZE', 100))
+CALENDAR_PREFETCH_RADIUS = int(os.getenv('CALENDAR_PREFETCH_RADIUS', 1))
+CALENDAR_PREFETCH_DEDUP_TTL = int(os.getenv('CALENDAR_PREFETCH_DEDUP_TTL', 60))
+CALENDAR_PREFETCH_MIN_HEADROOM = float(os.getenv('CALENDAR_PREFETCH_MIN_HEADROOM', 0.5))
+
+GROUP_SLOTS_MAX_ATTENDEES = int(os.getenv('GROUP_SLOTS_MAX_ATTENDEES', 50))
+
+# Fetch recurring events as one series each and expand them locally instead of asking Google for every instance.
+CALENDAR_EXPAND_RECURRENCE = os.getenv('CALENDAR_EXPAND_RECURRENCE', 'False') == 'True'
+CALENDAR_RECURRENCE_PADDING_DAYS = int(os.getenv('CALENDAR_RECURRENCE_PADDING_DAYS', 7))
+CALENDAR_OCCURRENCES_CACHE_TTL = int(os.getenv('CALENDAR_OCCURRENCES_CACHE_TTL', 86400))
@@ -0,0 +1,241 @@
+import json
+from email.utils import formatdate
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from google_calendar import cache as event_cache
+
+from . import rate_limit
+from .rate_limit import RateLimited, TokenBucket
+
+LOCAL_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+CALENDAR_URL = 'https://www.googleapis.com/calendar/v3/calendars/primary/events'
+RATE_LIMIT_SETTINGS = {
+    'CACHES': LOCAL_CACHE,
+    'GOOGLE_RATE_LIMIT_ENABLED': True,
+    'GOOGLE_USER_RATE': 1,
+    'GOOGLE_USER_BURST': 5,
+    'GOOGLE_PROJECT_RATE': 10,
+    'GOOGLE_PROJECT_BURST': 20,
+    'GOOGLE_RATE_LIMIT_MAX_BACKOFF': 60,
+    'GOOGLE_RATE_LIMIT_BACKOFF_RESET': 300,
+    'GOOGLE_HTTP_BACKOFF': 0.5,
+}
+
+
+class FakeClock:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def _user(pk):
+    return SimpleNamespace(pk=pk, is_authenticated=True)
+
+
+def _response(status_code, errors=None, retry_after=None):
+    body = {'error': {'code': status_code, 'errors': errors or []}}
+    headers = {'Retry-After': retry_after} if retry_after is not None else {}
+    return SimpleNamespace(status_code=status_code, headers=headers, content=json.dumps(body).encode())
+
+
+class FakeClockTestCase(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.clock = FakeClock()
+        patcher = mock.patch.object(rate_limit, 'clock', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+@override_settings(**RATE_LIMIT_SETTINGS)
+class TokenBucketTests(FakeClockTestCase):
+    def test_starts_full(self):
+        self.assertEqual(TokenBucket('bucket', rate=2, capacity=10).available(), 10)
+
+    def test_exhaustion_returns_wait_without_taking(self):
+        bucket = TokenBucket('bucket', rate=2, capacity=10)
+
+        self.assertEqual(bucket.take(10), 0)
+        self.assertEqual(bucket.take(3), 1.5)
+        self.assertEqual(bucket.available(), 0)
+
+    def test_refills_at_rate_up_to_capacity(self):
+        bucket = TokenBucket('bucket', rate=2, capacity=10)
+        bucket.take(10)
+
+        self.clock.advance(1.5)
+        self.assertEqual(bucket.available(), 3)
+        self.assertEqual(bucket.take(3), 0)
+        self.assertEqual(bucket.available(), 0)
+
+        self.clock.advance(60)
+        self.assertEqual(bucket.available(), 10)
+
+    def test_cost_above_capacity_is_capped(self):
+        bucket = TokenBucket('bucket', rate=2, capacity=10)
+
+        self.assertEqual(bucket.take(50), 0)
+        self.assertEqual(bucket.take(50), 5)
+
+    def test_give_returns_tokens(self):
+        bucket = TokenBucket('bucket', rate=2, capacity=10)
+        bucket.take(4)
+        bucket.give(4)
+
+        self.assertEqual(bucket.available(), 10)
+
+
+@override_settings(**RATE_LIMIT_SETTINGS)
+class RetryDelayTests(FakeClockTestCase):
+    def test_seconds(self):
+        self.assertEqual(rate_limit.retry_delay(_response(429, retry_after='7'), attempt=0), 7)
+
+    def test_http_date(self):
+        retry_after = formatdate(self.clock.now + 30, usegmt=True)
+
+        self.assertEqual(rate_limit.retry_delay(_response(429, retry_after=retry_after), attempt=0), 30)
+
+    def test_http_date_in_the_past(self):
+        retry_after = formatdate(self.clock.now - 30, usegmt=True)
+
+        self.assertEqual(rate_limit.retry_delay(_response(429, retry_after=retry_after), attempt=0), 0)
+
+    def test_exponential_backoff_without_header(self):
+        self.assertEqual(rate_limit.retry_delay(_response(429), attempt=0), 0.5)
+        self.assertEqual(rate_limit.retry_delay(_response(429), attempt=3), 4)
+        self.assertEqual(rate_limit.retry_delay(_response(429, retry_after='soon'), attempt=1), 1)
+
+
+@override_settings(**RATE_LIMIT_SETTINGS)
+class BeforeCallTests(FakeClockTestCase):
+    def project(self):
+        return TokenBucket('google-budget:project', 10, 20)
+
+    def test_charges_user_and_project(self):
+        with rate_limit.charged_to(_user(1)):
+            rate_limit.before_call(CALENDAR_URL, cost=2)
+
+        self.assertEqual(TokenBucket('google-budget:user:1', 1, 5).available(), 3)
+        self.assertEqual(self.project().available(), 18)
+
+    def test_user_refusal_does_not_spend_project_budget(self):
+        with rate_limit.charged_to(_user(1)):
+            rate_limit.before_call(CALENDAR_URL, cost=5)
+            with self.assertRaises(RateLimited) as raised:
+                rate_limit.before_call(CALENDAR_URL, cost=3)
+
+        self.assertEqual(raised.exception.retry_after, 3)
+        self.assertEqual(self.project().available(), 15)
+
+    def test_other_urls_are_not_limited(self):
+        with rate_limit.charged_to(_user(1)):
+            for _ in range(10):
+                rate_limit.before_call('https://oauth2.googleapis.com/tokeninfo')
+
+        self.assertEqual(self.project().available(), 20)
+
+    @override_settings(GOOGLE_RATE_LIMIT_ENABLED=False)
+    def test_disabled(self):
+        with rate_limit.charged_to(_user(1)):
+            for _ in range(10):
+                rate_limit.before_call(CALENDAR_URL)
+
+
+@override_settings(**RATE_LIMIT_SETTINGS)
+class AfterCallTests(FakeClockTestCase):
+    def limit(self, user, response):
+        with rate_limit.charged_to(user), self.assertRaises(RateLimited) as raised:
+            rate_limit.after_call(CALENDAR_URL, response)
+        return raised.exception
+
+    def test_user_rate_limit_backs_off_only_that_user(self):
+        error = self.limit(_user(1), _response(403, [{'reason': 'userRateLimitExceeded'}], retry_after='10'))
+
+        self.assertEqual(error.retry_after, 10)
+        self.assertEqual(cache.get('google-backoff:user:1'), self.clock.now + 10)
+        self.assertIsNone(cache.get('google-backoff:project'))
+
+        with rate_limit.charged_to(_user(1)), self.assertRaises(RateLimited):
+            rate_limit.before_call(CALENDAR_URL)
+        with rate_limit.charged_to(_user(2)):
+            rate_limit.before_call(CALENDAR_URL)
+
+    def test_project_rate_limit_backs_off_everyone(self):
+        self.limit(_user(1), _response(403, [{'reason': 'rateLimitExceeded'}], retry_after='10'))
+
+        self.assertIsNone(cache.get('google-backoff:user:1'))
+        with rate_limit.charged_to(_user(2)), self.assertRaises(RateLimited):
+            rate_limit.before_call(CALENDAR_URL)
+
+    def test_user_rate_limit_without_user_backs_off_project(self):
+        with self.assertRaises(RateLimited):
+            rate_limit.after_call(CALENDAR_URL, _response(403, [{'reason': 'userRateLimitExceeded'}]))
+
+        self.assertIsNotNone(cache.get('google-backoff:project'))
+
+    def test_consecutive_limits_double_the_delay(self):
+        response = _response(429)
+
+        self.assertEqual(self.limit(_user(1), response).retry_after, 0.5)
+        self.clock.advance(1)
+        self.assertEqual(self.limit(_user(1), response).retry_after, 1)
+        self.clock.advance(2)
+        self.assertEqual(self.limit(_user(1), response).retry_after, 2)
+
+    def test_backoff_ends(self):
+        self.limit(_user(1), _response(429, retry_after='5'))
+        self.clock.advance(6)
+
+        with rate_limit.charged_to(_user(1)):
+            rate_limit.before_call(CALENDAR_URL)
+
+    def test_other_forbidden_responses_pass(self):
+        with rate_limit.charged_to(_user(1)):
+            rate_limit.after_call(CALENDAR_URL, _response(403, [{'reason': 'forbidden'}]))
+
+        self.assertIsNone(cache.get('google-backoff:project'))
+
+
+@override_settings(**RATE_LIMIT_SETTINGS, CALENDAR_SYNC_ENABLED=False, CALENDAR_EXPAND_RECURRENCE=False)
+class StaleMonthTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.clock = FakeClock()
+        self.user = User.objects.create(username='user@example.com', email='user@example.com')
+        self.client.force_login(self.user)
+        for patcher in (
+            mock.patch.object(rate_limit, 'clock', self.clock),
+            mock.patch('google_calendar.views.request_access_token', return_value='access-token'),
+            mock.patch('google_calendar.views.prefetch_around'),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        cache.set('google-backoff:project', self.clock.now + 20, None)
+
+    def test_serves_stale_month_while_backing_off(self):
+        payload = {'events': [{'id': 'stored'}], 'period': {'year': 2026, 'month': 10}}
+        event_cache.set_month(self.user.id, 'primary', 2026, 10, payload, 'etag-1')
+        event_cache.invalidate_calendar(self.user.id, 'primary')
+
+        response = self.client.get('/api/calendar/', {'year': 2026, 'month': 10})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Cache'], 'STALE')
+        self.assertEqual(response.json()['events'], [{'id': 'stored'}])
+
+    def test_rate_limited_without_stale_month(self):
+        response = self.client.get('/api/calendar/', {'year': 2026, 'month': 10})
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '20')
@@ -17,11 +17,12 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
-from .views import get_csrf_token
+from .views import get_csrf_token, metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('get-csrf-token/', get_csrf_token, name='get-csrf-token'),
+    path('metrics', metrics_view, name='metrics'),
     path('accounts/', include('allauth.urls')),
     path('api/', include([
         path('', include('google_auth.urls')),
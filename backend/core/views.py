@@ -1,7 +1,24 @@
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import Http404, HttpResponse, JsonResponse
 from django.middleware.csrf import get_token
 
+from . import metrics
+
 
 def get_csrf_token(request):
     csrf_token = get_token(request)
     return JsonResponse({'csrfToken': csrf_token})
+
+
+def metrics_view(request):
+    """
+    Prometheus text exposition of this process's metrics. Outside DEBUG it
+    is only served when METRICS_TOKEN is set and sent as a bearer token.
+    """
+    if settings.METRICS_TOKEN:
+        if request.headers.get('Authorization') != f'Bearer {settings.METRICS_TOKEN}':
+            return HttpResponse(status=401)
+    elif not settings.DEBUG:
+        raise Http404()
+
+    return HttpResponse(metrics.expose(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,45 @@
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.middleware.csrf import get_token
+from django.views import View
+
+from .token_cache import avalidate_access_token
+from .views import UserInfoView
+
+
+class AsyncUserInfoView(View):
+    async def get(self, request):
+        get_token(request)
+
+        try:
+            user = await request.auser()
+            if not user.is_authenticated:
+                await request.session.aflush()
+                return JsonResponse({'is_authenticated': False})
+
+            access_token = request.COOKIES.get('access_token')
+            refreshed_token = None
+
+            if not access_token:
+                refreshed_token = await sync_to_async(UserInfoView._refresh_access_token)(request)
+                if not refreshed_token:
+                    return JsonResponse({'error': 'Tokens are missing, please login again'}, status=401)
+            else:
+                if not await avalidate_access_token(access_token):
+                    response = JsonResponse({'error': 'Failed to validate access token'}, status=401)
+                    for cookie in ('access_token', 'refresh_token', 'sessionid'):
+                        response.set_cookie(cookie, '', max_age=0, expires='Thu, 01 Jan 1970 00:00:00 GMT',
+                                            path='/', httponly=True, secure=True, samesite='None')
+                    return response
+
+            user_data = await sync_to_async(UserInfoView._get_user_data)(user)
+
+            response = JsonResponse(user_data)
+            if refreshed_token:
+                response.set_cookie('access_token', refreshed_token, max_age=3600, httponly=True, secure=True,
+                                    samesite='None')
+            return response
+
+        except Exception as e:
+            print(f"Error retrieving user info: {str(e)}")
+            return JsonResponse({'error': 'Failed to retrieve user information'}, status=500)
@@ -0,0 +1,95 @@
+import re
+import threading
+import time
+
+from django.conf import settings
+
+from core import google_client
+
+try:
+    import jwt
+    from jwt.algorithms import RSAAlgorithm
+except ImportError:
+    jwt = None
+
+GOOGLE_ISSUERS = ('accounts.google.com', 'https://accounts.google.com')
+DEFAULT_KEYS_MAX_AGE = 3600
+
+
+class KeySetUnavailable(Exception):
+    pass
+
+
+class InvalidIdToken(Exception):
+    pass
+
+
+_keys = {}
+_keys_expire_at = 0
+_keys_fetched_at = 0
+_keys_lock = threading.Lock()
+
+
+def _max_age(cache_control):
+    match = re.search(r'max-age=(\d+)', cache_control or '')
+    return int(match.group(1)) if match else DEFAULT_KEYS_MAX_AGE
+
+
+def _fetch_keys():
+    global _keys, _keys_expire_at, _keys_fetched_at
+
+    _keys_fetched_at = time.time()
+    try:
+        response = google_client.get(google_client.api_url('/oauth2/v3/certs'))
+    except Exception as e:
+        raise KeySetUnavailable(str(e))
+
+    if response.status_code != 200:
+        raise KeySetUnavailable(f'Failed to fetch Google certs: {response.status_code}')
+
+    _keys = {jwk['kid']: RSAAlgorithm.from_jwk(jwk) for jwk in response.json().get('keys', [])}
+    _keys_expire_at = time.time() + _max_age(response.headers.get('Cache-Control'))
+
+
+def _signing_key(kid):
+    """
+    Return the public key for kid from the in-process key set, refreshing it
+    when its Cache-Control max-age has passed or when Google has rotated to
+    a key we have not seen yet. Unknown kids refetch at most once per
+    GOOGLE_ID_TOKEN_REFETCH_INTERVAL, so forged tokens cannot make every
+    login hit Google.
+    """
+    if kid in _keys and time.time() < _keys_expire_at:
+        return _keys[kid]
+
+    with _keys_lock:
+        now = time.time()
+        if now >= _keys_expire_at or (
+                kid not in _keys and now >= _keys_fetched_at + settings.GOOGLE_ID_TOKEN_REFETCH_INTERVAL):
+            _fetch_keys()
+
+    if kid not in _keys:
+        raise InvalidIdToken(f'Unknown signing key {kid}')
+    return _keys[kid]
+
+
+def verify_id_token(token):
+    if jwt is None:
+        raise KeySetUnavailable('PyJWT with cryptography is not installed')
+
+    try:
+        kid = jwt.get_unverified_header(token).get('kid')
+        claims = jwt.decode(
+            token,
+            _signing_key(kid),
+            algorithms=['RS256'],
+            audience=settings.GOOGLE_CLIENT_ID,
+            leeway=settings.GOOGLE_ID_TOKEN_LEEWAY,
+        )
+    except jwt.InvalidTokenError as e:
+        raise InvalidIdToken(str(e))
+
+    if claims.get('iss') not in GOOGLE_ISSUERS:
+        raise InvalidIdToken(f"Unexpected issuer {claims.get('iss')}")
+
+    return claims
@@ -0,0 +1,66 @@
+import json
+import statistics
+import threading
+import time as timer
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from jwt.algorithms import RSAAlgorithm
+
+from bench.mock_google import make_server
+from google_auth.views import GoogleAuthService
+
+
+class Command(BaseCommand):
+    help = 'Compare local ID token verification against the remote tokeninfo endpoint on a mock server'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=200)
+        parser.add_argument('--latency', type=float, default=80, help='Mock Google latency in milliseconds')
+
+    def handle(self, *args, **options):
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        jwk = json.loads(RSAAlgorithm.to_jwk(private_key.public_key()))
+        jwk.update({'kid': 'bench', 'alg': 'RS256', 'use': 'sig'})
+
+        server = make_server(latency=options['latency'] / 1000, jwks={'keys': [jwk]})
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{server.server_port}'
+
+        client_id = settings.GOOGLE_CLIENT_ID or 'bench-client'
+        now = int(timer.time())
+        token = jwt.encode({
+            'iss': 'https://accounts.google.com',
+            'aud': client_id,
+            'sub': '1000',
+            'email': 'bench@example.com',
+            'iat': now,
+            'exp': now + 3600,
+        }, private_key, algorithm='RS256', headers={'kid': 'bench'})
+
+        try:
+            with override_settings(GOOGLE_API_BASE_URL=base_url, GOOGLE_CLIENT_ID=client_id):
+                GoogleAuthService.verify_google_token(token)
+                self._report('local (JWKS)', self._measure(GoogleAuthService.verify_google_token, token,
+                                                           options['logins']))
+                self._report('remote tokeninfo', self._measure(GoogleAuthService.verify_google_token_remotely,
+                                                               token, options['logins']))
+        finally:
+            server.shutdown()
+
+    @staticmethod
+    def _measure(verify, token, count):
+        samples = []
+        for _ in range(count):
+            started = timer.perf_counter()
+            if not verify(token):
+                raise RuntimeError('Token verification failed')
+            samples.append((timer.perf_counter() - started) * 1000)
+        return sorted(samples)
+
+    def _report(self, label, samples):
+        p95 = samples[int(len(samples) * 0.95) - 1]
+        self.stdout.write(f'{label:<18} p50 {statistics.median(samples):8.3f} ms  p95 {p95:8.3f} ms')
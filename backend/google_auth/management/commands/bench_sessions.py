@@ -0,0 +1,107 @@
+import statistics
+import threading
+import time as timer
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import Client, override_settings
+
+from bench.mock_google import make_server
+
+MODES = [
+    ('db sessions, connection per request', 'django.contrib.sessions.backends.db', 0),
+    ('db sessions, persistent connections', 'django.contrib.sessions.backends.db', 60),
+    ('cached_db sessions, persistent connections', 'django.contrib.sessions.backends.cached_db', 60),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure /api/user-info/ throughput in-process with database sessions and a new connection per '
+        'request against cached sessions and persistent connections. Point DB_* at a local PostgreSQL '
+        'and set REDIS_URL to measure the production setup.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=8)
+
+    def handle(self, *args, **options):
+        server = make_server()
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{server.server_port}'
+
+        user, _ = get_user_model().objects.get_or_create(
+            username='bench-sessions@example.com', defaults={'email': 'bench-sessions@example.com'})
+        database = connections.settings['default']
+        original = database.get('CONN_MAX_AGE', 0), database.get('CONN_HEALTH_CHECKS', False)
+
+        try:
+            with override_settings(GOOGLE_OAUTH2_BASE_URL=base_url):
+                for label, engine, conn_max_age in MODES:
+                    database['CONN_MAX_AGE'] = conn_max_age
+                    database['CONN_HEALTH_CHECKS'] = bool(conn_max_age)
+                    connections.close_all()
+
+                    with override_settings(SESSION_ENGINE=engine):
+                        result = self._run(self._session_key(user, engine), options['requests'],
+                                           options['concurrency'])
+
+                    self.stdout.write(
+                        f"{label:<44} {result['throughput']:8.1f} req/s  p50 {result['p50']:6.2f} ms  "
+                        f"p95 {result['p95']:6.2f} ms  errors {result['errors']}"
+                    )
+        finally:
+            database['CONN_MAX_AGE'], database['CONN_HEALTH_CHECKS'] = original
+            connections.close_all()
+            server.shutdown()
+
+    @staticmethod
+    def _session_key(user, engine):
+        session = import_module(engine).SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        return session.session_key
+
+    @staticmethod
+    def _run(session_key, total, concurrency):
+        latencies = []
+        errors = 0
+        lock = threading.Lock()
+
+        def worker(count):
+            nonlocal errors
+            client = Client()
+            client.cookies[settings.SESSION_COOKIE_NAME] = session_key
+            client.cookies['access_token'] = 'bench-sessions'
+            try:
+                for _ in range(count):
+                    started = timer.perf_counter()
+                    response = client.get('/api/user-info/')
+                    elapsed = (timer.perf_counter() - started) * 1000
+                    with lock:
+                        latencies.append(elapsed)
+                        if response.status_code != 200:
+                            errors += 1
+            finally:
+                connection.close()
+
+        per_worker = [total // concurrency + (index < total % concurrency) for index in range(concurrency)]
+        started = timer.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(worker, per_worker))
+        elapsed = timer.perf_counter() - started
+
+        latencies.sort()
+        return {
+            'throughput': len(latencies) / elapsed,
+            'p50': statistics.median(latencies),
+            'p95': latencies[int(len(latencies) * 0.95) - 1],
+            'errors': errors,
+        }
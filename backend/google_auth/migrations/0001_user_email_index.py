@@ -0,0 +1,42 @@
+from django.db import migrations, models
+
+INDEX_NAME = 'google_auth_user_email_idx'
+
+
+def _email_indexed(schema_editor, table):
+    with schema_editor.connection.cursor() as cursor:
+        constraints = schema_editor.connection.introspection.get_constraints(cursor, table)
+    return any(info['index'] and info['columns'] == ['email'] for info in constraints.values())
+
+
+def add_email_index(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    if not _email_indexed(schema_editor, User._meta.db_table):
+        schema_editor.add_index(User, models.Index(fields=['email'], name=INDEX_NAME))
+
+
+def remove_email_index(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    with schema_editor.connection.cursor() as cursor:
+        constraints = schema_editor.connection.introspection.get_constraints(cursor, User._meta.db_table)
+    if INDEX_NAME in constraints:
+        schema_editor.remove_index(User, models.Index(fields=['email'], name=INDEX_NAME))
+
+
+class Migration(migrations.Migration):
+    """
+    Login looks users up by email, which auth_user does not index. The
+    project uses the stock User model, so no app of ours owns the table and
+    AddIndex cannot target it; the index is created through the schema
+    editor instead, which emits the right DDL for each backend. It is
+    skipped when auth_user already has an index on email, and only the
+    index created here is dropped on reverse.
+    """
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_email_index, remove_email_index),
+    ]
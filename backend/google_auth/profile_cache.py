@@ -0,0 +1,42 @@
+from allauth.socialaccount.models import SocialAccount
+from django.conf import settings
+from django.core.cache import cache
+
+from core import metrics
+
+
+def _cache_key(user_id):
+    return f'user-profile:{user_id}'
+
+
+def get_user_data(user):
+    """
+    Profile payload for UserInfoView. The Google account fields only change
+    on login, which evicts the entry, so it is cached per user.
+    """
+    user_data = cache.get(_cache_key(user.id))
+    metrics.record_cache('user_profile', user_data is not None)
+    if user_data is not None:
+        return user_data
+
+    social_account = (SocialAccount.objects
+                      .filter(user_id=user.id, provider='google')
+                      .only('uid', 'extra_data')
+                      .first())
+
+    user_data = {
+        'id': user.id,
+        'is_authenticated': True,
+        'username': user.username,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'email': user.email,
+        'google_id': social_account.uid if social_account else None,
+        'profile_picture': social_account.extra_data.get('picture') if social_account else None
+    }
+    cache.set(_cache_key(user.id), user_data, settings.USER_PROFILE_CACHE_TTL)
+    return user_data
+
+
+def evict_user_data(user_id):
+    cache.delete(_cache_key(user_id))
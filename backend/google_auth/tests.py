@@ -0,0 +1,318 @@
+import json
+import re
+import time
+from unittest import mock, skipIf
+
+from allauth.socialaccount.models import SocialApp
+from django.contrib.sites.models import Site
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from . import id_token, views
+from .id_token import InvalidIdToken, KeySetUnavailable, verify_id_token
+from .views import GoogleAuthService
+
+try:
+    import jwt
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from jwt.algorithms import RSAAlgorithm
+except ImportError:
+    jwt = None
+
+CLIENT_ID = 'client-id.apps.googleusercontent.com'
+
+
+def _rsa_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+def _jwk(private_key, kid):
+    jwk = json.loads(RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk.update({'kid': kid, 'alg': 'RS256', 'use': 'sig'})
+    return jwk
+
+
+def _response(status_code, body=None, headers=None):
+    response = mock.Mock(status_code=status_code, headers=headers or {}, text=json.dumps(body))
+    response.json.return_value = body
+    return response
+
+
+@skipIf(jwt is None, 'PyJWT with cryptography is not installed')
+@override_settings(GOOGLE_CLIENT_ID=CLIENT_ID, GOOGLE_ID_TOKEN_LEEWAY=30, GOOGLE_ID_TOKEN_REFETCH_INTERVAL=60)
+class VerifyIdTokenTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.key = _rsa_key()
+        cls.rotated_key = _rsa_key()
+
+    def setUp(self):
+        id_token._keys = {}
+        id_token._keys_expire_at = 0
+        id_token._keys_fetched_at = 0
+        self.jwks = [_jwk(self.key, 'key-1')]
+        self.cache_control = 'public, max-age=600'
+        patcher = mock.patch('core.google_client.get', side_effect=self.serve_certs)
+        self.get = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def serve_certs(self, url, **kwargs):
+        if url.endswith('/oauth2/v3/certs'):
+            return _response(200, {'keys': self.jwks}, {'Cache-Control': self.cache_control})
+        raise AssertionError(f'Unexpected request to {url}')
+
+    def token(self, key=None, kid='key-1', **claims):
+        now = int(time.time())
+        payload = {
+            'iss': 'https://accounts.google.com',
+            'aud': CLIENT_ID,
+            'sub': '1234567890',
+            'email': 'user@example.com',
+            'iat': now,
+            'exp': now + 3600,
+        }
+        payload.update(claims)
+        return jwt.encode(payload, key or self.key, algorithm='RS256', headers={'kid': kid})
+
+    def test_valid_token(self):
+        claims = verify_id_token(self.token())
+
+        self.assertEqual(claims['sub'], '1234567890')
+        self.assertEqual(claims['email'], 'user@example.com')
+
+    def test_keys_are_reused(self):
+        verify_id_token(self.token())
+        verify_id_token(self.token())
+
+        self.assertEqual(self.get.call_count, 1)
+
+    def test_wrong_audience(self):
+        with self.assertRaises(InvalidIdToken):
+            verify_id_token(self.token(aud='someone-else.apps.googleusercontent.com'))
+
+    def test_wrong_issuer(self):
+        with self.assertRaises(InvalidIdToken):
+            verify_id_token(self.token(iss='https://accounts.example.com'))
+
+    def test_expired_token(self):
+        now = int(time.time())
+        with self.assertRaises(InvalidIdToken):
+            verify_id_token(self.token(iat=now - 7200, exp=now - 3600))
+
+    def test_expiry_within_leeway(self):
+        now = int(time.time())
+
+        self.assertEqual(verify_id_token(self.token(iat=now - 3600, exp=now - 10))['sub'], '1234567890')
+
+    def test_wrong_signature(self):
+        with self.assertRaises(InvalidIdToken):
+            verify_id_token(self.token(key=self.rotated_key))
+
+    def later(self, seconds):
+        patcher = mock.patch('google_auth.id_token.time')
+        patcher.start().time.return_value = time.time() + seconds
+        self.addCleanup(patcher.stop)
+
+    def test_unknown_kid_refetches_keys(self):
+        verify_id_token(self.token())
+        self.jwks = [_jwk(self.key, 'key-1'), _jwk(self.rotated_key, 'key-2')]
+        self.later(61)
+
+        claims = verify_id_token(self.token(key=self.rotated_key, kid='key-2'))
+
+        self.assertEqual(claims['sub'], '1234567890')
+        self.assertEqual(self.get.call_count, 2)
+
+    def test_kid_missing_after_refetch(self):
+        verify_id_token(self.token())
+        self.later(61)
+
+        with self.assertRaises(InvalidIdToken):
+            verify_id_token(self.token(key=self.rotated_key, kid='key-2'))
+        self.assertEqual(self.get.call_count, 2)
+
+    def test_unknown_kid_refetches_are_throttled(self):
+        verify_id_token(self.token())
+        self.jwks = [_jwk(self.key, 'key-1'), _jwk(self.rotated_key, 'key-2')]
+
+        for kid in ('key-2', 'forged-1', 'forged-2'):
+            with self.assertRaises(InvalidIdToken):
+                verify_id_token(self.token(key=self.rotated_key, kid=kid))
+        self.assertEqual(self.get.call_count, 1)
+
+        self.later(61)
+        verify_id_token(self.token(key=self.rotated_key, kid='key-2'))
+        self.assertEqual(self.get.call_count, 2)
+
+    def test_keys_expire_after_max_age(self):
+        self.cache_control = 'public, max-age=60, must-revalidate'
+        verify_id_token(self.token())
+        fetched_at = time.time()
+
+        with mock.patch('google_auth.id_token.time') as clock:
+            clock.time.return_value = fetched_at + 30
+            verify_id_token(self.token())
+            self.assertEqual(self.get.call_count, 1)
+
+            clock.time.return_value = fetched_at + 61
+            verify_id_token(self.token())
+            self.assertEqual(self.get.call_count, 2)
+
+    def test_missing_max_age_uses_default(self):
+        self.cache_control = 'no-transform'
+        before = time.time()
+        verify_id_token(self.token())
+
+        self.assertGreaterEqual(id_token._keys_expire_at, before + id_token.DEFAULT_KEYS_MAX_AGE)
+
+    def test_certs_unavailable(self):
+        self.get.side_effect = lambda url, **kwargs: _response(503, {'error': 'backendError'})
+
+        with self.assertRaises(KeySetUnavailable):
+            verify_id_token(self.token())
+
+
+@skipIf(jwt is None, 'PyJWT with cryptography is not installed')
+@override_settings(GOOGLE_CLIENT_ID=CLIENT_ID, GOOGLE_ID_TOKEN_LEEWAY=30)
+class VerifyGoogleTokenTests(SimpleTestCase):
+    def setUp(self):
+        id_token._keys = {}
+        id_token._keys_expire_at = 0
+        id_token._keys_fetched_at = 0
+        self.token = jwt.encode({'sub': '1234567890', 'aud': CLIENT_ID}, _rsa_key(),
+                                algorithm='RS256', headers={'kid': 'key-1'})
+
+    def test_falls_back_to_tokeninfo_when_certs_are_unavailable(self):
+        def get(url, **kwargs):
+            if url.endswith('/oauth2/v3/certs'):
+                return _response(503, {'error': 'backendError'})
+            self.assertEqual(kwargs['params'], {'id_token': self.token})
+            return _response(200, {'sub': '1234567890', 'email': 'user@example.com'})
+
+        with mock.patch('core.google_client.get', side_effect=get) as google_get:
+            google_data = GoogleAuthService.verify_google_token(self.token)
+
+        self.assertEqual(google_data, {'sub': '1234567890', 'email': 'user@example.com'})
+        self.assertTrue(google_get.call_args_list[-1].args[0].endswith('/oauth2/v3/tokeninfo'))
+
+    def test_rejected_token_is_not_sent_to_tokeninfo(self):
+        jwks = {'keys': [_jwk(_rsa_key(), 'key-1')]}
+
+        with mock.patch('core.google_client.get', return_value=_response(200, jwks)) as google_get:
+            self.assertIsNone(GoogleAuthService.verify_google_token(self.token))
+
+        self.assertEqual(google_get.call_count, 1)
+
+
+LOCAL_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+GOOGLE_DATA = {
+    'sub': '1234567890',
+    'email': 'user@example.com',
+    'given_name': 'Ada',
+    'family_name': 'Lovelace',
+    'picture': 'https://example.com/ada.png',
+}
+
+
+# Statements the framework issues around our views: savepoints of atomic
+# blocks, the session store, login()'s last_login update and the
+# authentication middleware loading request.user by id.
+FRAMEWORK_STATEMENTS = re.compile(
+    r'^(RELEASE )?SAVEPOINT |"django_session"|^UPDATE "auth_user" SET "last_login"'
+    r'|FROM "auth_user" WHERE "auth_user"\."id" = \d+ LIMIT 21$'
+)
+
+
+@override_settings(CACHES=LOCAL_CACHE, SESSION_ENGINE='django.contrib.sessions.backends.db')
+class AuthQueryCountTests(TestCase):
+    """
+    Statements our login and user-info views issue, leaving out those of
+    Django and the session backend, which change between versions.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        app = SocialApp.objects.create(provider='google', name='Google', client_id=CLIENT_ID, secret='secret')
+        app.sites.add(Site.objects.get_current())
+
+    def setUp(self):
+        cache.clear()
+        views._google_app = None
+
+        token_response = _response(200, {
+            'access_token': 'access-token',
+            'refresh_token': 'refresh-token',
+            'expires_in': 3600,
+            'id_token': 'id-token',
+        })
+        for patcher in (
+            mock.patch('core.google_client.post', return_value=token_response),
+            mock.patch('core.google_client.get', return_value=_response(200, {'expires_in': 3600})),
+            mock.patch.object(GoogleAuthService, 'verify_google_token', return_value=dict(GOOGLE_DATA)),
+            mock.patch.object(views, 'prefetch_around'),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def owned_queries(self, func):
+        with CaptureQueriesContext(connection) as context:
+            response = func()
+        statements = [query['sql'] for query in context.captured_queries
+                      if not FRAMEWORK_STATEMENTS.search(query['sql'])]
+        return statements, response
+
+    def login(self):
+        response = self.client.post('/api/login/', json.dumps({'code': 'auth-code'}), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def user_info(self):
+        return self.client.get('/api/user-info/')
+
+    def test_login_new_user(self):
+        statements, response = self.owned_queries(self.login)
+
+        # Account and user lookups, the two inserts with the profile, the
+        # SocialApp, loaded once per process, and the token lookup and insert.
+        self.assertEqual(len(statements), 8, statements)
+        self.assertTrue(response.json()['user']['is_new_user'])
+
+    def test_login_existing_user(self):
+        self.login()
+        self.client.logout()
+
+        statements, response = self.owned_queries(self.login)
+
+        # Account lookup and profile update, token lookup and update.
+        self.assertEqual(len(statements), 4, statements)
+        self.assertFalse(response.json()['user']['is_new_user'])
+
+    def test_user_info_cold(self):
+        self.login()
+        cache.clear()
+
+        statements, response = self.owned_queries(self.user_info)
+
+        self.assertEqual(len(statements), 1, statements)
+        self.assertEqual(response.json()['google_id'], '1234567890')
+
+    def test_user_info_with_cached_profile(self):
+        self.login()
+        self.user_info()
+
+        statements, response = self.owned_queries(self.user_info)
+
+        self.assertEqual(statements, [])
+        self.assertEqual(response.json()['profile_picture'], 'https://example.com/ada.png')
+
+    def test_login_evicts_cached_profile(self):
+        self.login()
+        self.user_info()
+        self.login()
+
+        statements, _ = self.owned_queries(self.user_info)
+
+        self.assertEqual(len(statements), 1, statements)
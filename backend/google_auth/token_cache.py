@@ -0,0 +1,61 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core import google_client, metrics
+
+INVALID_TOKEN_STATUSES = (400, 401)
+
+
+def _cache_key(access_token):
+    return 'tokeninfo:' + hashlib.sha256(access_token.encode()).hexdigest()
+
+
+def _remember(access_token, response):
+    """
+    Cache the tokeninfo verdict. Valid tokens are kept no longer than their
+    remaining lifetime; rejected tokens are cached briefly so a stale cookie
+    does not hit Google on every page load. Other failures are not cached.
+    """
+    if response.status_code == 200:
+        expires_in = int(response.json().get('expires_in', 0))
+        timeout = min(settings.TOKENINFO_CACHE_TTL, expires_in - settings.TOKENINFO_EXPIRY_MARGIN)
+        if timeout > 0:
+            cache.set(_cache_key(access_token), True, timeout)
+        return True
+
+    if response.status_code in INVALID_TOKEN_STATUSES:
+        cache.set(_cache_key(access_token), False, settings.TOKENINFO_NEGATIVE_TTL)
+    return False
+
+
+def validate_access_token(access_token):
+    cached = cache.get(_cache_key(access_token))
+    metrics.record_cache('tokeninfo', cached is not None)
+    if cached is not None:
+        return cached
+
+    response = google_client.get(
+        google_client.oauth2_url('/tokeninfo'),
+        params={'access_token': access_token}
+    )
+    return _remember(access_token, response)
+
+
+async def avalidate_access_token(access_token):
+    cached = await cache.aget(_cache_key(access_token))
+    metrics.record_cache('tokeninfo', cached is not None)
+    if cached is not None:
+        return cached
+
+    response = await google_client.aget(
+        google_client.oauth2_url('/tokeninfo'),
+        params={'access_token': access_token}
+    )
+    return _remember(access_token, response)
+
+
+def evict_access_token(access_token):
+    if access_token:
+        cache.delete(_cache_key(access_token))
@@ -0,0 +1,149 @@
+import datetime
+import threading
+import time
+
+from allauth.socialaccount.models import SocialToken
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from core import google_client
+
+# Users share a fixed pool of locks so the pool does not grow with every
+# user who has ever refreshed in this process.
+USER_LOCK_STRIPES = 64
+_user_locks = [threading.Lock() for _ in range(USER_LOCK_STRIPES)]
+
+
+def _user_lock(user_id):
+    return _user_locks[hash(user_id) % USER_LOCK_STRIPES]
+
+
+def _social_token(user):
+    return (SocialToken.objects
+            .select_related('account')
+            .filter(account__user=user, account__provider='google')
+            .first())
+
+
+def _expires_at(social_token):
+    if social_token.expires_at:
+        return social_token.expires_at
+
+    expires_at = social_token.account.extra_data.get('access_token_expires_at')
+    if expires_at:
+        return datetime.datetime.fromtimestamp(expires_at, tz=datetime.timezone.utc)
+    return None
+
+
+def _is_fresh(social_token, margin=None):
+    margin = settings.GOOGLE_TOKEN_REFRESH_MARGIN if margin is None else margin
+    expires_at = _expires_at(social_token)
+    return bool(social_token.token) and expires_at is not None and \
+        expires_at - timezone.now() > datetime.timedelta(seconds=margin)
+
+
+def _request_refresh(refresh_token):
+    token_data = {
+        'client_id': settings.GOOGLE_CLIENT_ID,
+        'client_secret': settings.GOOGLE_CLIENT_SECRET,
+        'refresh_token': refresh_token,
+        'grant_type': 'refresh_token',
+        'redirect_uri': 'postmessage',
+    }
+
+    try:
+        token_response = google_client.post(google_client.oauth2_url('/token'), data=token_data)
+    except Exception as e:
+        print(f"Error refreshing access token: {str(e)}")
+        return None
+
+    if token_response.status_code != 200:
+        print(f"Failed to refresh access token: {token_response.text}")
+        return None
+    return token_response.json()
+
+
+def _store(social_token, token_json):
+    expires_in = token_json.get('expires_in', 3600)
+    expires_at = timezone.now() + datetime.timedelta(seconds=expires_in)
+
+    social_token.token = token_json['access_token']
+    social_token.expires_at = expires_at
+    if token_json.get('refresh_token'):
+        social_token.token_secret = token_json['refresh_token']
+    social_token.save(update_fields=['token', 'expires_at', 'token_secret'])
+
+    account = social_token.account
+    account.extra_data.update({
+        'access_token': social_token.token,
+        'access_token_expires_at': int(expires_at.timestamp()),
+    })
+    account.save(update_fields=['extra_data'])
+
+
+def _wait_for_other_worker(social_token, lock_key):
+    deadline = time.monotonic() + settings.GOOGLE_TOKEN_REFRESH_LOCK_TTL
+    while time.monotonic() < deadline:
+        time.sleep(0.1)
+        social_token.refresh_from_db(fields=['token', 'expires_at', 'token_secret'])
+        if _is_fresh(social_token) or cache.get(lock_key) is None:
+            break
+
+    return social_token.token if _is_fresh(social_token, margin=0) else None
+
+
+def _refresh(user, social_token, refresh_token=None):
+    """
+    Refresh the user's access token at most once at a time. Threads in this
+    process queue on a lock striped by user; other workers are excluded with a
+    cache lock and wait for the refreshed token to land in the database.
+    """
+    with _user_lock(user.pk):
+        social_token.refresh_from_db(fields=['token', 'expires_at', 'token_secret'])
+        if _is_fresh(social_token):
+            return social_token.token
+
+        lock_key = f'google-token-refresh:{user.pk}'
+        if not cache.add(lock_key, 1, settings.GOOGLE_TOKEN_REFRESH_LOCK_TTL):
+            return _wait_for_other_worker(social_token, lock_key)
+
+        try:
+            refresh_token = (social_token.token_secret
+                             or social_token.account.extra_data.get('refresh_token')
+                             or refresh_token)
+            if not refresh_token:
+                return None
+
+            token_json = _request_refresh(refresh_token)
+            if not token_json:
+                return social_token.token if _is_fresh(social_token, margin=0) else None
+
+            _store(social_token, token_json)
+            return social_token.token
+        finally:
+            cache.delete(lock_key)
+
+
+def get_access_token(user, cookie_token=None, refresh_token=None):
+    """
+    Return a usable Google access token for user, refreshing it shortly
+    before it expires. Falls back to the cookie token for users without a
+    stored SocialToken.
+    """
+    social_token = _social_token(user)
+    if social_token is None:
+        return cookie_token
+
+    if _is_fresh(social_token):
+        return social_token.token
+
+    return _refresh(user, social_token, refresh_token)
+
+
+def request_access_token(request, user=None):
+    return get_access_token(
+        user or request.user,
+        request.COOKIES.get('access_token'),
+        request.COOKIES.get('refresh_token'),
+    )
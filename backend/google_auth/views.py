@@ -6,6 +6,7 @@ from django.conf import settings
 from django.contrib.auth import login, logout
 from django.contrib.auth.models import User
 from django.contrib.sites.models import Site
+from django.db import transaction
 from django.http import JsonResponse, HttpResponse
 from django.utils import timezone
 from django.utils.decorators import method_decorator
@@ -19,15 +20,36 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework import status
 
+from core import google_client
+from core.renderers import dumps
+from google_calendar.prefetch import prefetch_around
+
+from .id_token import InvalidIdToken, KeySetUnavailable, verify_id_token
+from .profile_cache import evict_user_data, get_user_data
+from .token_cache import evict_access_token, validate_access_token
+from .token_manager import get_access_token
+
+_google_app = None
+
 
 class GoogleAuthService:
     @staticmethod
     def verify_google_token(token):
         try:
-            response = requests.get(
-                'https://www.googleapis.com/oauth2/v3/tokeninfo',
-                params={'id_token': token},
-                timeout=5
+            return verify_id_token(token)
+        except InvalidIdToken as e:
+            print(f"Failed to verify Google token: {str(e)}")
+            return None
+        except KeySetUnavailable as e:
+            print(f"Verifying Google token remotely: {str(e)}")
+            return GoogleAuthService.verify_google_token_remotely(token)
+
+    @staticmethod
+    def verify_google_token_remotely(token):
+        try:
+            response = google_client.get(
+                google_client.api_url('/oauth2/v3/tokeninfo'),
+                params={'id_token': token}
             )
 
             if response.status_code != 200:
@@ -41,42 +63,98 @@ class GoogleAuthService:
 
     @staticmethod
     def get_or_create_user(google_data):
-        try:
-            social_account = SocialAccount.objects.get(
-                provider='google',
-                uid=google_data['sub']
-            )
+        social_account = (SocialAccount.objects
+                          .select_related('user')
+                          .filter(provider='google', uid=google_data['sub'])
+                          .first())
+        if social_account:
             return social_account.user, False, social_account
 
-        except SocialAccount.DoesNotExist:
-            # created = False
-            # try:
-            #     user = User.objects.get(email=google_data['email'])
-            # except User.DoesNotExist:
-            #     user = User.objects.create_user(
-            #         username=google_data['email'],
-            #         email=google_data['email'],
-            #         first_name=google_data.get('given_name', ''),
-            #         last_name=google_data.get('family_name', '')
-            #     )
-            #     created = True
-            user, created = User.objects.get_or_create(
-                email=google_data['email'],
+        user, created = User.objects.get_or_create(
+            email=google_data['email'],
+            defaults={
+                'username': google_data['email'],
+                'first_name': google_data.get('given_name', ''),
+                'last_name': google_data.get('family_name', '')
+            }
+        )
+
+        social_account = SocialAccount.objects.create(
+            user=user,
+            provider='google',
+            uid=google_data['sub'],
+            extra_data=google_data
+        )
+
+        return user, created, social_account
+
+    @staticmethod
+    def get_google_app():
+        """
+        The Google SocialApp never changes at runtime, so once it exists it is
+        looked up once per process. A freshly created app is not cached in
+        case the surrounding transaction rolls back.
+        """
+        global _google_app
+
+        if _google_app is not None:
+            return _google_app
+
+        google_app = SocialApp.objects.filter(provider='google').first()
+        if google_app is not None:
+            _google_app = google_app
+            return google_app
+
+        google_app = SocialApp.objects.create(
+            provider='google',
+            name='Google',
+            client_id=settings.GOOGLE_CLIENT_ID,
+            secret=settings.GOOGLE_CLIENT_SECRET
+        )
+        google_app.sites.add(Site.objects.get(id=settings.SITE_ID))
+        print("Created Google SocialApp")
+        return google_app
+
+    @staticmethod
+    def store_login(google_data, token_json):
+        """
+        Create or update the user, their Google account and their token in a
+        single transaction.
+        """
+        access_token = token_json.get('access_token')
+        refresh_token = token_json.get('refresh_token', '')
+        access_token_expires_in = token_json.get('expires_in')
+        refresh_token_expires_in = token_json.get('refresh_token_expires_in', 604800)
+
+        with transaction.atomic():
+            user, created, social_account = GoogleAuthService.get_or_create_user(google_data)
+
+            social_account.extra_data = social_account.extra_data or {}
+            social_account.extra_data.update({
+                'access_token': access_token,
+                'refresh_token': refresh_token,
+                'access_token_expires_at': int(time.time()) + access_token_expires_in,
+                'refresh_token_expires_at': int(time.time()) + refresh_token_expires_in,
+                'sub': google_data.get('sub'),
+                'picture': google_data.get('picture'),
+                'email': google_data.get('email'),
+                'given_name': google_data.get('given_name'),
+                'family_name': google_data.get('family_name')
+            })
+            social_account.save(update_fields=['extra_data'])
+
+            SocialToken.objects.update_or_create(
+                account=social_account,
                 defaults={
-                    'username': google_data['email'],
-                    'first_name': google_data.get('given_name', ''),
-                    'last_name': google_data.get('family_name', '')
+                    'app': GoogleAuthService.get_google_app(),
+                    'token': access_token,
+                    'token_secret': refresh_token or '',
+                    'expires_at': timezone.now() + datetime.timedelta(seconds=access_token_expires_in),
                 }
             )
 
-            social_account = SocialAccount.objects.create(
-                user=user,
-                provider='google',
-                uid=google_data['sub'],
-                extra_data=google_data
-            )
-
-            return user, created, social_account
+        evict_user_data(user.id)
+        return user, created, social_account
 
 
 # @method_decorator(csrf_exempt, name='dispatch')
@@ -88,7 +166,7 @@ class GoogleLoginView(APIView):
             if not code:
                 return JsonResponse({'error': 'No authorization code provided'}, status=400)
 
-            token_url = 'https://oauth2.googleapis.com/token'
+            token_url = google_client.oauth2_url('/token')
             token_data = {
                 'code': code,
                 'client_id': settings.GOOGLE_CLIENT_ID,
@@ -96,7 +174,7 @@ class GoogleLoginView(APIView):
                 'redirect_uri': 'postmessage',
                 'grant_type': 'authorization_code'
             }
-            token_response = requests.post(token_url, data=token_data, timeout=5)
+            token_response = google_client.post(token_url, data=token_data)
 
             if token_response.status_code != 200:
                 return JsonResponse({'error': f'Failed to exchange token: {token_response.text}'}, status=400)
@@ -111,9 +189,12 @@ class GoogleLoginView(APIView):
             if not google_data:
                 return JsonResponse({'error': 'Invalid Google token'}, status=400)
 
-            user, created, social_account = GoogleAuthService.get_or_create_user(google_data)
+            user, created, social_account = GoogleAuthService.store_login(google_data, token_json)
             login(request, user)
 
+            today = datetime.date.today()
+            prefetch_around(user.id, 'primary', today.year, today.month, include_current=True)
+
             response_data = {
                 'success': True,
                 'user': {
@@ -129,7 +210,7 @@ class GoogleLoginView(APIView):
             }
 
             response = HttpResponse(
-                json.dumps(response_data),
+                dumps(response_data),
                 content_type='application/json'
             )
 
@@ -137,8 +218,6 @@ class GoogleLoginView(APIView):
             refresh_token = token_json.get('refresh_token', '')
             access_token_expires_in = token_json.get('expires_in')
             refresh_token_expires_in = token_json.get('refresh_token_expires_in', 604800)
-            access_token_expires_at = int(time.time()) + access_token_expires_in
-            refresh_token_expires_at = int(time.time()) + refresh_token_expires_in
 
             response.set_cookie(
                 'access_token',
@@ -159,55 +238,6 @@ class GoogleLoginView(APIView):
                     samesite='None'
                 )
 
-            if social_account:
-                if not social_account.extra_data:
-                    social_account.extra_data = {}
-
-                social_account.extra_data.update({
-                    'access_token': access_token,
-                    'refresh_token': refresh_token,
-                    'access_token_expires_at': access_token_expires_at,
-                    'refresh_token_expires_at': refresh_token_expires_at,
-                    'sub': google_data.get('sub'),
-                    'picture': google_data.get('picture'),
-                    'email': google_data.get('email'),
-                    'given_name': google_data.get('given_name'),
-                    'family_name': google_data.get('family_name')
-                })
-                social_account.save()
-
-                try:
-                    google_app = SocialApp.objects.get(provider='google')
-                except SocialApp.DoesNotExist:
-                    site = Site.objects.get(id=settings.SITE_ID)
-                    google_app = SocialApp.objects.create(
-                        provider='google',
-                        name='Google',
-                        client_id=settings.GOOGLE_CLIENT_ID,
-                        secret=settings.GOOGLE_CLIENT_SECRET
-                    )
-                    google_app.sites.add(site)
-                    google_app.save()
-                    print("Created Google SocialApp")
-
-                expires_at = timezone.now() + datetime.timedelta(seconds=access_token_expires_in)
-                try:
-                    token = SocialToken.objects.get(account=social_account)
-                    token.token = access_token
-                    token.token_secret = ''
-                    token.expires_at = expires_at
-                    if refresh_token:
-                        token.token_secret = refresh_token
-                    token.save()
-                except SocialToken.DoesNotExist:
-                    SocialToken.objects.create(
-                        account=social_account,
-                        app=google_app,
-                        token=access_token,
-                        token_secret=refresh_token or '',
-                        expires_at=expires_at
-                    )
-
             return response
         except Exception as e:
             print(f"Error in Google code login: {str(e)}")
@@ -237,11 +267,7 @@ class UserInfoView(APIView):
                 response.set_cookie('access_token', access_token, max_age=3600, httponly=True, secure=True,
                                     samesite='None')
             else:
-                session = requests.Session()
-                url = f"https://oauth2.googleapis.com/tokeninfo?access_token={access_token}"
-                response = session.get(url)
-
-                if response.status_code != 200:
+                if not validate_access_token(access_token):
                     response = JsonResponse({'error': 'Failed to validate access token'}, status=401)
                     response.set_cookie('access_token', '', max_age=0, expires='Thu, 01 Jan 1970 00:00:00 GMT',
                                         path='/', httponly=True, secure=True, samesite='None')
@@ -285,46 +311,11 @@ class UserInfoView(APIView):
 
     @staticmethod
     def _refresh_access_token(request):
-        refresh_token = request.COOKIES.get('refresh_token')
-        if not refresh_token:
-            return None
-
-        token_url = 'https://oauth2.googleapis.com/token'
-        token_data = {
-            'client_id': settings.GOOGLE_CLIENT_ID,
-            'client_secret': settings.GOOGLE_CLIENT_SECRET,
-            'refresh_token': refresh_token,
-            'grant_type': 'refresh_token',
-            'redirect_uri': 'postmessage',
-        }
-
-        try:
-            token_response = requests.post(token_url, data=token_data)
-            if token_response.status_code == 200:
-                return token_response.json().get('access_token')
-            else:
-                return None
-        except Exception as e:
-            print(f"Error refreshing access token: {str(e)}")
-            return None
+        return get_access_token(request.user, refresh_token=request.COOKIES.get('refresh_token'))
 
     @staticmethod
     def _get_user_data(user):
-        social_account = user.socialaccount_set.filter(provider='google').first()
-
-        google_id = social_account.uid if social_account else None
-        profile_picture = social_account.extra_data.get('picture') if social_account else None
-
-        return {
-            'id': user.id,
-            'is_authenticated': True,
-            'username': user.username,
-            'first_name': user.first_name,
-            'last_name': user.last_name,
-            'email': user.email,
-            'google_id': google_id,
-            'profile_picture': profile_picture
-        }
+        return get_user_data(user)
 
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -332,6 +323,7 @@ class UserInfoView(APIView):
 class LogoutView(View):
     def post(self, request):
         try:
+            evict_access_token(request.COOKIES.get('access_token'))
             logout(request)
             response = JsonResponse({'success': True})
             response.delete_cookie('access_token', samesite='None')
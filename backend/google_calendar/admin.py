@@ -1,3 +1,22 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import CalendarSyncState, CalendarWatchChannel, MirroredEvent
+
+
+@admin.register(CalendarSyncState)
+class CalendarSyncStateAdmin(admin.ModelAdmin):
+    list_display = ('user', 'calendar_id', 'last_synced_at', 'dirty')
+    search_fields = ('user__email', 'calendar_id')
+
+
+@admin.register(CalendarWatchChannel)
+class CalendarWatchChannelAdmin(admin.ModelAdmin):
+    list_display = ('user', 'calendar_id', 'channel_id', 'expiration')
+    search_fields = ('user__email', 'calendar_id', 'channel_id')
+
+
+@admin.register(MirroredEvent)
+class MirroredEventAdmin(admin.ModelAdmin):
+    list_display = ('summary', 'user', 'calendar_id', 'start_time', 'end_time', 'status')
+    list_filter = ('calendar_id', 'status')
+    search_fields = ('summary', 'event_id', 'user__email')
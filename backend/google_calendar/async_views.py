@@ -0,0 +1,185 @@
+import json
+import math
+from datetime import datetime, time, timezone
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+
+from core import google_client
+from core.compression import compress_page
+from core.rate_limit import RateLimited
+from core.renderers import dumps
+from google_auth.token_manager import request_access_token
+
+from . import cache as event_cache
+from . import recurrence
+from .fetch import GoogleAPIError, aiter_pages, events_url, format_event
+from .prefetch import prefetch_around
+from .sync import mirrored_events
+from .views import month_response, month_window, requested_month, series_payload, sync_or_stale
+from .watch import mark_changed
+
+
+def rate_limited(error):
+    response = JsonResponse({'error': 'Google Calendar rate limit reached, please try again shortly'}, status=429)
+    response['Retry-After'] = str(math.ceil(error.retry_after))
+    return response
+
+
+def _mirrored_month(user, calendar_id, window_start, window_end):
+    return [event.as_event() for event in mirrored_events(user, calendar_id, window_start, window_end)]
+
+
+@method_decorator(compress_page, name='get')
+class AsyncCalendarEventListView(View):
+    async def get(self, request):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return JsonResponse({'error': 'Authentication required'}, status=401)
+
+        try:
+            access_token = await sync_to_async(request_access_token)(request, user)
+            calendar_id = 'primary'
+            year, month = requested_month(request.GET)
+            await sync_to_async(prefetch_around)(user.id, calendar_id, year, month)
+
+            version = await sync_to_async(event_cache.calendar_version)(user.id, calendar_id)
+            cached = await sync_to_async(event_cache.get_month)(user.id, calendar_id, year, month, version)
+            if cached is not None:
+                response = HttpResponse(dumps(month_response(cached, request.GET)), content_type='application/json')
+                response['X-Cache'] = 'HIT'
+                return response
+
+            first_day, last_day, time_min, time_max = month_window(year, month)
+            window_start = datetime.combine(first_day, time.min, tzinfo=timezone.utc)
+            window_end = datetime.combine(last_day, time.max, tzinfo=timezone.utc)
+
+            stale = False
+            payload = None
+            if settings.CALENDAR_SYNC_ENABLED:
+                stale = not await sync_to_async(sync_or_stale)(user, access_token, calendar_id)
+                events = await sync_to_async(_mirrored_month)(user, calendar_id, window_start, window_end)
+            else:
+                if recurrence.enabled():
+                    items = [
+                        item
+                        async for page in aiter_pages(access_token, calendar_id,
+                                                      recurrence.series_params(window_start, window_end),
+                                                      recurrence.SERIES_FIELDS)
+                        for item in page.get('items', [])
+                    ]
+                    payload = await sync_to_async(series_payload)(user.id, calendar_id, items, year, month)
+
+                if payload is None:
+                    params = {
+                        'timeMin': time_min,
+                        'timeMax': time_max,
+                        'singleEvents': 'true',
+                        'orderBy': 'startTime'
+                    }
+                    events = [
+                        format_event(event)
+                        async for page in aiter_pages(access_token, calendar_id, params)
+                        for event in page.get('items', [])
+                    ]
+
+            if payload is None:
+                payload = {
+                    'events': events,
+                    'period': {
+                        'year': year,
+                        'month': month,
+                        'start': time_min,
+                        'end': time_max
+                    }
+                }
+            if not stale:
+                await sync_to_async(event_cache.set_month)(
+                    user.id, calendar_id, year, month, payload, version=version)
+
+            response = HttpResponse(dumps(month_response(payload, request.GET)), content_type='application/json')
+            response['X-Cache'] = 'STALE' if stale else 'MISS'
+            return response
+        except GoogleAPIError as e:
+            return JsonResponse({'error': f'Failed to fetch calendar events: {e.text}'}, status=e.status_code)
+        except RateLimited as e:
+            payload = await sync_to_async(event_cache.get_stale_month)(user.id, calendar_id, year, month)
+            if payload is None:
+                return rate_limited(e)
+            response = HttpResponse(dumps(month_response(payload, request.GET)), content_type='application/json')
+            response['X-Cache'] = 'STALE'
+            return response
+        except Exception as e:
+            print(f"Error fetching calendar events: {str(e)}")
+            return JsonResponse({'error': 'Failed to fetch calendar events'}, status=500)
+
+
+class AsyncCalendarAddEventView(View):
+    async def post(self, request):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return JsonResponse({'error': 'Authentication required'}, status=401)
+
+        access_token = await sync_to_async(request_access_token)(request, user)
+
+        if not access_token:
+            return JsonResponse({'error': 'Missing access token'}, status=401)
+
+        try:
+            calendar_id = 'primary'
+            event_data = json.loads(request.body)
+
+            headers = {
+                'Authorization': f'Bearer {access_token}',
+                'Content-Type': 'application/json'
+            }
+            response = await google_client.apost(events_url(calendar_id), json=event_data, headers=headers)
+
+            if response.status_code == 200:
+                await sync_to_async(mark_changed)(
+                    user.id, calendar_id, event_cache.months_for_event(event_data))
+                return JsonResponse({'message': 'Event added successfully'})
+            else:
+                return JsonResponse({'error': f'Failed to add event: {response.text}'}, status=response.status_code)
+
+        except RateLimited as e:
+            return rate_limited(e)
+        except Exception as e:
+            print(f"Error adding event: {str(e)}")
+            return JsonResponse({'error': 'Failed to add event'}, status=500)
+
+
+class AsyncDeleteCalendarEvent(View):
+    async def delete(self, request, event_id):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return JsonResponse({'error': 'Authentication required'}, status=401)
+
+        access_token = await sync_to_async(request_access_token)(request, user)
+
+        if not access_token:
+            return JsonResponse({'error': 'Missing access token'}, status=401)
+
+        try:
+            calendar_id = 'primary'
+
+            headers = {
+                'Authorization': f'Bearer {access_token}'
+            }
+            response = await google_client.adelete(f'{events_url(calendar_id)}/{event_id}', headers=headers)
+
+            if response.status_code in (200, 204):
+                await sync_to_async(mark_changed)(user.id, calendar_id)
+                return JsonResponse({'message': 'Event deleted successfully'})
+            else:
+                return JsonResponse({'error': f'Failed to delete event: {response.text}'},
+                                    status=response.status_code)
+
+        except RateLimited as e:
+            return rate_limited(e)
+        except Exception as e:
+            print(f"Error deleting event: {str(e)}")
+            return JsonResponse({'error': 'Failed to delete event'}, status=500)
@@ -0,0 +1,120 @@
+import json
+import re
+import uuid
+from collections import namedtuple
+from urllib.parse import quote
+
+from core import google_client
+from core.rate_limit import RateLimited
+
+BATCH_LIMIT = 50
+
+BatchItem = namedtuple('BatchItem', ['method', 'path', 'body'], defaults=[None])
+
+
+def build_batch_body(items, boundary):
+    parts = []
+    for index, item in enumerate(items):
+        lines = [
+            f'--{boundary}',
+            'Content-Type: application/http',
+            f'Content-ID: <item-{index}>',
+            '',
+            f'{item.method} {item.path} HTTP/1.1',
+        ]
+        if item.body is not None:
+            lines += ['Content-Type: application/json', '', json.dumps(item.body)]
+        else:
+            lines.append('')
+        parts.append('\r\n'.join(lines))
+
+    return ('\r\n'.join(parts) + f'\r\n--{boundary}--\r\n').encode()
+
+
+def parse_batch_response(content_type, body):
+    """
+    Split a multipart/mixed batch response into {index: (status, payload)}
+    using the Content-ID Google echoes back as <response-item-N>.
+    """
+    match = re.search(r'boundary="?([^";]+)"?', content_type or '')
+    if not match:
+        return {}
+
+    results = {}
+    text = body.decode('utf-8').replace('\r\n', '\n')
+    for part in text.split(f'--{match.group(1)}')[1:]:
+        if part.startswith('--'):
+            break
+
+        outer_headers, _, http_response = part.strip('\n').partition('\n\n')
+        content_id = re.search(r'Content-ID:\s*<response-item-(\d+)>', outer_headers, re.IGNORECASE)
+        if not content_id:
+            continue
+
+        status_line, _, rest = http_response.partition('\n')
+        _, _, content = rest.partition('\n\n')
+        content = content.strip()
+
+        try:
+            payload = json.loads(content) if content else None
+        except ValueError:
+            payload = content
+
+        results[int(content_id.group(1))] = (int(status_line.split()[1]), payload)
+
+    return results
+
+
+def events_path(calendar_id):
+    return f'/calendar/v3/calendars/{quote(calendar_id)}/events'
+
+
+def _send_chunk(access_token, chunk):
+    boundary = f'batch_{uuid.uuid4().hex}'
+    return google_client.post(
+        google_client.api_url('/batch/calendar/v3'),
+        cost=len(chunk),
+        data=build_batch_body(chunk, boundary),
+        headers={
+            'Authorization': f'Bearer {access_token}',
+            'Content-Type': f'multipart/mixed; boundary={boundary}',
+        }
+    )
+
+
+def execute_batch(access_token, items):
+    """
+    Send items through Google's batch endpoint in chunks of BATCH_LIMIT and
+    return one (status, payload) per item, in order. Once the Google budget
+    cannot cover a chunk, it and the chunks after it are not sent and come
+    back as 429 with the seconds to wait in retryAfter, so callers learn
+    which items went through without holding the request open.
+    """
+    results = []
+    for offset in range(0, len(items), BATCH_LIMIT):
+        chunk = items[offset:offset + BATCH_LIMIT]
+
+        try:
+            response = _send_chunk(access_token, chunk)
+        except RateLimited as e:
+            error = {'code': 429, 'message': str(e), 'retryAfter': e.retry_after}
+            return results + [(429, error)] * (len(items) - offset)
+
+        if response.status_code != 200:
+            results += [(response.status_code, response.text)] * len(chunk)
+            continue
+
+        parsed = parse_batch_response(response.headers.get('Content-Type'), response.content)
+        results += [parsed.get(index, (502, 'Missing batch response part')) for index in range(len(chunk))]
+
+    return results
+
+
+def retry_after(results):
+    """
+    Seconds until the items execute_batch could not send may be retried, or
+    None when every item was sent.
+    """
+    delays = [payload['retryAfter'] for status_code, payload in results
+              if status_code == 429 and isinstance(payload, dict) and 'retryAfter' in payload]
+    return max(delays) if delays else None
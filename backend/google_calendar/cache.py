@@ -0,0 +1,244 @@
+import hashlib
+import time
+from datetime import timedelta
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core import metrics
+
+from .planner import parse_event_time
+
+
+def calendar_version(user_id, calendar_id):
+    """
+    Version that is part of every month key of a calendar, bumped when the
+    calendar changes. Seeded from the clock so a version lost to eviction
+    never points back at old entries.
+    """
+    return cache.get_or_set(f'calendar-version:{user_id}:{calendar_id}', time.time_ns, None)
+
+
+def _bucket_key(user_id, calendar_id, year, month, version=None):
+    if version is None:
+        version = calendar_version(user_id, calendar_id)
+    return f'calendar-events:{user_id}:{calendar_id}:{version}:{year}:{month}'
+
+
+def _stale_prefix(user_id):
+    return f'calendar-events-stale:{user_id}:'
+
+
+def _index_key(user_id):
+    return f'calendar-events-index:{user_id}'
+
+
+def _index_ttl():
+    return max(settings.CALENDAR_CACHE_TTL, settings.CALENDAR_WATCHED_CACHE_TTL) * 2
+
+
+# Caches every process keeps for itself. A webhook handled by one worker
+# cannot invalidate months another worker holds in one of these.
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def is_shared():
+    return settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES
+
+
+def _watch_key(user_id, calendar_id):
+    return f'calendar-watched:{user_id}:{calendar_id}'
+
+
+def mark_watched(user_id, calendar_id, expires_at):
+    cache.set(_watch_key(user_id, calendar_id), expires_at, max(1, int(expires_at - time.time())))
+
+
+def unmark_watched(user_id, calendar_id):
+    cache.delete(_watch_key(user_id, calendar_id))
+
+
+def _watched_until(user_id, calendar_id):
+    if not is_shared():
+        return None
+    return cache.get(_watch_key(user_id, calendar_id))
+
+
+def is_watched(user_id, calendar_id):
+    return _watched_until(user_id, calendar_id) is not None
+
+
+def _month_ttl(user_id, calendar_id):
+    """
+    Months of a calendar with an open watch channel only change when Google
+    notifies us, so they are kept until the channel expires, capped at
+    CALENDAR_WATCHED_CACHE_TTL. That needs a cache shared by every worker,
+    since notifications only invalidate the cache of the one handling them.
+    """
+    expires_at = _watched_until(user_id, calendar_id)
+    if expires_at is None:
+        return settings.CALENDAR_CACHE_TTL
+    watched_ttl = min(settings.CALENDAR_WATCHED_CACHE_TTL, int(expires_at - time.time()))
+    return max(settings.CALENDAR_CACHE_TTL, watched_ttl)
+
+
+def _touch(user_id, key):
+    """
+    Move key to the most recently used end of the user's bucket index and
+    evict the least recently used buckets beyond CALENDAR_CACHE_MAX_MONTHS.
+    """
+    index = cache.get(_index_key(user_id)) or []
+    if key in index:
+        index.remove(key)
+    index.append(key)
+
+    overflow = len(index) - settings.CALENDAR_CACHE_MAX_MONTHS
+    if overflow > 0:
+        cache.delete_many(index[:overflow])
+        index = index[overflow:]
+
+    cache.set(_index_key(user_id), index, _index_ttl())
+
+
+def get_month_entry(user_id, calendar_id, year, month, version=None):
+    """
+    Return (payload, etag) for a cached month, or None. etag is None when
+    the month's version was not known at the time it was stored.
+    """
+    key = _bucket_key(user_id, calendar_id, year, month, version)
+    entry = cache.get(key)
+    metrics.record_cache('calendar_month', entry is not None)
+    if entry is None:
+        return None
+
+    _touch(user_id, key)
+    return entry['payload'], entry['etag']
+
+
+def get_month(user_id, calendar_id, year, month, version=None):
+    entry = get_month_entry(user_id, calendar_id, year, month, version)
+    return entry[0] if entry is not None else None
+
+
+def set_month(user_id, calendar_id, year, month, payload, etag=None, version=None):
+    """
+    Store a month. Pass the calendar_version read before the payload was
+    loaded so a change notified in the meantime is not hidden behind it.
+    """
+    key = _bucket_key(user_id, calendar_id, year, month, version)
+    entry = {'payload': payload, 'etag': etag}
+    cache.set(key, entry, _month_ttl(user_id, calendar_id))
+    cache.set(f'{_stale_prefix(user_id)}{calendar_id}:{year}:{month}', entry, settings.CALENDAR_STALE_TTL)
+    _touch(user_id, key)
+
+
+def get_stale_month(user_id, calendar_id, year, month):
+    """
+    Last payload stored for a month, kept well past CALENDAR_CACHE_TTL and
+    not cleared by writes, for when Google cannot be called.
+    """
+    entry = cache.get(f'{_stale_prefix(user_id)}{calendar_id}:{year}:{month}')
+    metrics.record_cache('calendar_month_stale', entry is not None)
+    return entry['payload'] if entry is not None else None
+
+
+def _bump_version(user_id, calendar_id):
+    try:
+        cache.incr(f'calendar-version:{user_id}:{calendar_id}')
+    except ValueError:
+        cache.set(f'calendar-version:{user_id}:{calendar_id}', time.time_ns(), None)
+
+
+def invalidate_months(user_id, calendar_id, months):
+    """
+    Drop the cached months and bump the calendar version, so a reader that
+    loaded a month before the write cannot store it afterwards.
+    """
+    invalidate_free_busy(user_id)
+    keys = {_bucket_key(user_id, calendar_id, year, month) for year, month in months}
+    cache.delete_many(list(keys))
+
+    index = cache.get(_index_key(user_id))
+    if index:
+        cache.set(_index_key(user_id), [key for key in index if key not in keys], _index_ttl())
+    _bump_version(user_id, calendar_id)
+
+
+def invalidate_calendar(user_id, calendar_id):
+    invalidate_free_busy(user_id)
+    _bump_version(user_id, calendar_id)
+
+    prefix = f'calendar-events:{user_id}:{calendar_id}:'
+    index = cache.get(_index_key(user_id)) or []
+    stale = [key for key in index if key.startswith(prefix)]
+
+    cache.delete_many(stale)
+    cache.set(_index_key(user_id), [key for key in index if key not in stale], _index_ttl())
+
+
+def months_for_event(event_data):
+    """
+    Return the (year, month) buckets an event can appear in. The range is
+    padded by a day on each side because month windows are computed in UTC
+    while the event may be expressed in any time zone.
+    """
+    tz = ZoneInfo(settings.TIME_ZONE)
+    start = parse_event_time(event_data.get('start'), tz)
+    end = parse_event_time(event_data.get('end'), tz) or start
+    if start is None:
+        return []
+
+    current = (start - timedelta(days=1)).date().replace(day=1)
+    last = (end + timedelta(days=1)).date()
+
+    months = []
+    while current <= last:
+        months.append((current.year, current.month))
+        current = (current + timedelta(days=32)).replace(day=1)
+
+    return months
+
+
+def _free_busy_version(user_id):
+    return cache.get_or_set(f'freebusy-version:{user_id}', time.time_ns, None)
+
+
+def _free_busy_key(user_id, calendar_ids, time_min, time_max):
+    # Hashed so group queries over many calendars stay within memcached's key length.
+    calendars = hashlib.sha1(','.join(sorted(calendar_ids)).encode()).hexdigest()
+    return f'freebusy-calendars:{user_id}:{_free_busy_version(user_id)}:{calendars}:{time_min}:{time_max}'
+
+
+def get_free_busy(user_id, calendar_ids, time_min, time_max):
+    busy = cache.get(_free_busy_key(user_id, calendar_ids, time_min, time_max))
+    metrics.record_cache('freebusy', busy is not None)
+    return busy
+
+
+def set_free_busy(user_id, calendar_ids, time_min, time_max, busy):
+    cache.set(_free_busy_key(user_id, calendar_ids, time_min, time_max), busy, settings.FREEBUSY_CACHE_TTL)
+
+
+def invalidate_free_busy(user_id):
+    """
+    Free/busy windows are arbitrary, so instead of tracking their keys every
+    write bumps a per-user version that is part of the key.
+    """
+    try:
+        cache.incr(f'freebusy-version:{user_id}')
+    except ValueError:
+        cache.set(f'freebusy-version:{user_id}', time.time_ns(), None)
+
+
+def get_calendar_list(user_id):
+    calendars = cache.get(f'calendar-list:{user_id}')
+    metrics.record_cache('calendar_list', calendars is not None)
+    return calendars
+
+
+def set_calendar_list(user_id, calendars):
+    cache.set(f'calendar-list:{user_id}', calendars, settings.CALENDAR_CACHE_TTL)
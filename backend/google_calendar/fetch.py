@@ -0,0 +1,208 @@
+import hashlib
+from urllib.parse import quote
+
+from django.utils.http import parse_etags
+
+from core import google_client
+from core.rate_limit import RateLimited
+from core.renderers import dumps
+
+EVENT_FIELDS = 'id,summary,description,location,start,end,status,htmlLink,creator'
+LIST_FIELDS = f'etag,nextPageToken,items({EVENT_FIELDS})'
+PAGE_SIZE = 2500
+STREAM_CHUNK_EVENTS = 200
+FORMAT_FIELDS = ('id', 'summary', 'description', 'location', 'start', 'end', 'status', 'htmlLink', 'creator')
+CALENDAR_LIST_FIELDS = 'nextPageToken,items(id,summary,primary,accessRole)'
+
+
+class GoogleAPIError(Exception):
+    def __init__(self, status_code, text):
+        super().__init__(text)
+        self.status_code = status_code
+        self.text = text
+
+
+class NotModified(Exception):
+    def __init__(self, etag):
+        super().__init__(etag)
+        self.etag = etag
+
+
+def events_url(calendar_id):
+    return google_client.api_url(f'/calendar/v3/calendars/{quote(calendar_id)}/events')
+
+
+def revalidation_etag(if_none_match):
+    """
+    The ETag to revalidate with Google from a client's If-None-Match: its
+    only entity tag, in the strong form Google issued it. '*' and lists are
+    not passed on.
+    """
+    if not if_none_match or if_none_match.strip() == '*':
+        return None
+    tags = parse_etags(if_none_match)
+    if len(tags) != 1:
+        return None
+    return tags[0].removeprefix('W/')
+
+
+def list_calendars(access_token):
+    headers = {
+        'Authorization': f'Bearer {access_token}'
+    }
+    params = {'fields': CALENDAR_LIST_FIELDS, 'maxResults': 250}
+    calendars = []
+
+    while True:
+        response = google_client.get(
+            google_client.api_url('/calendar/v3/users/me/calendarList'), params=params, headers=headers
+        )
+        if response.status_code != 200:
+            raise GoogleAPIError(response.status_code, response.text)
+
+        page = response.json()
+        calendars += page.get('items', [])
+
+        if not page.get('nextPageToken'):
+            return calendars
+        params['pageToken'] = page['nextPageToken']
+
+
+def iter_pages(access_token, calendar_id, params, fields=LIST_FIELDS, if_none_match=None):
+    """
+    Walk an events.list result page by page following nextPageToken. Only
+    one page is held in memory at a time. The client's if_none_match is
+    sent with the first page request as revalidation_etag, and NotModified
+    carries the matching ETag when Google answers 304.
+    """
+    headers = {
+        'Authorization': f'Bearer {access_token}'
+    }
+    etag = revalidation_etag(if_none_match)
+    if etag:
+        headers['If-None-Match'] = etag
+    params = {**params, 'maxResults': PAGE_SIZE}
+    if fields:
+        params['fields'] = fields
+
+    while True:
+        response = google_client.get(events_url(calendar_id), params=params, headers=headers)
+        if response.status_code == 304:
+            raise NotModified(response.headers.get('ETag') or etag)
+        if response.status_code != 200:
+            raise GoogleAPIError(response.status_code, response.text)
+
+        page = response.json()
+        yield page
+
+        if not page.get('nextPageToken'):
+            return
+        params['pageToken'] = page['nextPageToken']
+        headers.pop('If-None-Match', None)
+
+
+async def aiter_pages(access_token, calendar_id, params, fields=LIST_FIELDS):
+    headers = {
+        'Authorization': f'Bearer {access_token}'
+    }
+    params = {**params, 'maxResults': PAGE_SIZE}
+    if fields:
+        params['fields'] = fields
+
+    while True:
+        response = await google_client.aget(events_url(calendar_id), params=params, headers=headers)
+        if response.status_code != 200:
+            raise GoogleAPIError(response.status_code, response.text)
+
+        page = response.json()
+        yield page
+
+        if not page.get('nextPageToken'):
+            return
+        params['pageToken'] = page['nextPageToken']
+
+
+def iter_events(access_token, calendar_id, params, fields=LIST_FIELDS):
+    for page in iter_pages(access_token, calendar_id, params, fields):
+        yield from page.get('items', [])
+
+
+def page_etag(page):
+    """
+    Google's list ETag stands for the whole month only when it fits on one
+    page.
+    """
+    if page.get('nextPageToken'):
+        return None
+    return page.get('etag')
+
+
+def month_etag(versions):
+    """
+    Strong ETag for a month from (event_id, etag, updated) rows in a stable
+    order.
+    """
+    digest = hashlib.sha1()
+    for event_id, etag, updated in versions:
+        digest.update(f'{event_id}:{etag or updated}\n'.encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def format_event(event):
+    """
+    Fill in the fields Google left out of an events.list item. The fields
+    mask already limits items to FORMAT_FIELDS, so the freshly parsed dict
+    is completed in place instead of being copied.
+    """
+    for field in FORMAT_FIELDS:
+        if field not in event:
+            event[field] = None
+    return event
+
+
+def stream_month(events, period, on_complete=None, buffer_limit=0):
+    """
+    Serialize a month response as chunks of one JSON object with the same
+    shape as the buffered response. Up to buffer_limit events are kept so
+    on_complete can store the finished payload; larger months are streamed
+    without being retained. Events are written STREAM_CHUNK_EVENTS at a time
+    so compression works on reasonably sized chunks.
+    """
+    buffered = [] if buffer_limit else None
+    complete = True
+    chunk = []
+    separator = b''
+
+    yield b'{"events":['
+    try:
+        for event in events:
+            if buffered is not None:
+                buffered.append(event)
+                if len(buffered) > buffer_limit:
+                    buffered = None
+            chunk.append(dumps(event))
+            if len(chunk) >= STREAM_CHUNK_EVENTS:
+                yield separator + b','.join(chunk)
+                chunk = []
+                separator = b','
+    except GoogleAPIError as e:
+        print(f"Error streaming calendar events: {e.text}")
+        complete = False
+    except RateLimited as e:
+        print(f"Error streaming calendar events: {str(e)}")
+        complete = False
+    except Exception as e:
+        # The 200 has already been sent, so the document is closed as
+        # incomplete rather than left truncated.
+        print(f"Error streaming calendar events: {str(e)}")
+        complete = False
+
+    if chunk:
+        yield separator + b','.join(chunk)
+    yield b'],"period":' + dumps(period)
+    if not complete:
+        yield b',"complete":false'
+    yield b'}'
+
+    if complete and buffered is not None and on_complete:
+        on_complete({'events': buffered, 'period': period})
@@ -0,0 +1,70 @@
+from datetime import datetime, timezone
+
+from core import google_client
+
+from . import cache as event_cache
+from .fetch import GoogleAPIError
+from .planner import merge_intervals
+
+# Google caps the calendars one freeBusy query can expand.
+FREEBUSY_MAX_CALENDARS = 50
+
+
+def _parse(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).astimezone(timezone.utc)
+
+
+def free_busy_by_calendar(user_id, access_token, calendar_ids, time_min, time_max):
+    """
+    Return {calendar_id: merged busy intervals (UTC)} for the window, with
+    None for calendars Google could not read, e.g. another user's private
+    calendar. Calendars are queried FREEBUSY_MAX_CALENDARS per request and
+    the result is cached per user and window until the TTL passes or the
+    user writes to their calendar.
+    """
+    time_min = time_min.isoformat()
+    time_max = time_max.isoformat()
+
+    cached = event_cache.get_free_busy(user_id, calendar_ids, time_min, time_max)
+    if cached is not None:
+        return cached
+
+    busy = {}
+    for offset in range(0, len(calendar_ids), FREEBUSY_MAX_CALENDARS):
+        response = google_client.post(
+            google_client.api_url('/calendar/v3/freeBusy'),
+            json={
+                'timeMin': time_min,
+                'timeMax': time_max,
+                'timeZone': 'UTC',
+                'items': [{'id': calendar_id} for calendar_id in calendar_ids[offset:offset + FREEBUSY_MAX_CALENDARS]],
+            },
+            headers={'Authorization': f'Bearer {access_token}'}
+        )
+        if response.status_code != 200:
+            raise GoogleAPIError(response.status_code, response.text)
+
+        for calendar_id, calendar_data in response.json().get('calendars', {}).items():
+            if calendar_data.get('errors'):
+                print(f"Failed to read free/busy for {calendar_id}: {calendar_data['errors']}")
+                busy[calendar_id] = None
+                continue
+            busy[calendar_id] = merge_intervals(
+                (_parse(interval['start']), _parse(interval['end'])) for interval in calendar_data.get('busy', [])
+            )
+
+    event_cache.set_free_busy(user_id, calendar_ids, time_min, time_max, busy)
+    return busy
+
+
+def query_free_busy(user_id, access_token, calendar_ids, time_min, time_max):
+    """
+    Return merged busy intervals (UTC) across calendar_ids for the window.
+    """
+    intervals = []
+    for calendar_id, busy in free_busy_by_calendar(user_id, access_token, calendar_ids, time_min, time_max).items():
+        if busy is None:
+            raise GoogleAPIError(400, f'Failed to read free/busy for {calendar_id}')
+        intervals += busy
+
+    return merge_intervals(intervals)
@@ -0,0 +1,159 @@
+import math
+from bisect import bisect_right
+from datetime import timedelta
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .planner import free_intervals, merge_intervals, working_windows
+
+
+class Attendee:
+    """
+    One attendee's busy intervals and preferred working windows, in UTC.
+    """
+
+    def __init__(self, calendar_id, busy, working_hours):
+        self.calendar_id = calendar_id
+        self.busy = busy
+        self.working_hours = working_hours
+
+
+def attendee_hours(start_date, end_date, work_start, work_end, tz):
+    # Pad by a day so attendees far from the organizer's time zone still
+    # get windows on the edges of the range.
+    return working_windows(start_date - timedelta(days=1), end_date + timedelta(days=1), work_start, work_end, tz)
+
+
+def _pick(starts, scores, cells, limit):
+    """
+    Take slots in ranked order, skipping those overlapping a slot already
+    taken, until limit is reached.
+    """
+    taken = []
+    for start, score in zip(starts, scores):
+        if all(start + cells <= other or other + cells <= start for other, _ in taken):
+            taken.append((start, score))
+            if len(taken) == limit:
+                break
+    return taken
+
+
+def _slots(taken, origin, resolution, cells, tz):
+    return [
+        {
+            'start': (origin + resolution * start).astimezone(tz),
+            'end': (origin + resolution * (start + cells)).astimezone(tz),
+            'in_hours': int(score),
+        }
+        for start, score in taken
+    ]
+
+
+def _cells(intervals, origin, resolution, size, covering):
+    """
+    First and end cell of each interval, rounded out to every cell it
+    touches (covering) or in to the cells it fully contains.
+    """
+    seconds = resolution.total_seconds()
+    starts = np.array([(start - origin).total_seconds() for start, _ in intervals], dtype=np.float64) / seconds
+    ends = np.array([(end - origin).total_seconds() for _, end in intervals], dtype=np.float64) / seconds
+    if covering:
+        starts, ends = np.floor(starts), np.ceil(ends)
+    else:
+        starts, ends = np.ceil(starts), np.floor(ends)
+    starts = np.clip(starts, 0, size).astype(np.int64)
+    ends = np.clip(ends, 0, size).astype(np.int64)
+    keep = ends > starts
+    return starts[keep], ends[keep]
+
+
+def _coverage(starts, ends, size):
+    """Number of [start, end) cell ranges covering each of size cells."""
+    return np.cumsum(np.bincount(starts, minlength=size + 1)[:size] - np.bincount(ends, minlength=size + 1)[:size])
+
+
+def find_group_slots(attendees, windows, time_min, time_max, duration, resolution, tz, limit=10):
+    """
+    Find up to limit non-overlapping slots of duration inside windows where
+    every attendee is free, ranked by how many attendees have the slot in
+    their own working hours and then by start. Time is cut into cells of
+    resolution starting at time_min; a busy interval blocks every cell it
+    touches. Falls back to find_group_slots_python without NumPy.
+    """
+    if np is None:
+        return find_group_slots_python(attendees, windows, time_min, time_max, duration, resolution, tz, limit)
+
+    size = int((time_max - time_min) / resolution)
+    cells = int(duration / resolution)
+    if cells > size:
+        return []
+
+    # OR every attendee's busy cells, AND the rest with the search windows.
+    busy = _coverage(*_cells([interval for attendee in attendees for interval in attendee.busy],
+                             time_min, resolution, size, covering=True), size) > 0
+    free = ~busy & (_coverage(*_cells(windows, time_min, resolution, size, covering=False), size) > 0)
+
+    blocked = np.concatenate([[0], np.cumsum(~free)])
+    feasible = np.flatnonzero(blocked[cells:] == blocked[:-cells])
+
+    # A slot starting at s is inside working hours [a, b) when a <= s <= b - cells.
+    hours = [interval for attendee in attendees for interval in merge_intervals(attendee.working_hours)]
+    hour_starts, hour_ends = _cells(hours, time_min, resolution, size, covering=False)
+    long_enough = hour_ends - hour_starts >= cells
+    scores = _coverage(hour_starts[long_enough], hour_ends[long_enough] - cells + 1, size - cells + 1)[feasible]
+
+    order = np.lexsort((feasible, -scores))
+    taken = _pick(feasible[order].tolist(), scores[order].tolist(), cells, limit)
+    return _slots(taken, time_min, resolution, cells, tz)
+
+
+def _aligned(intervals, origin, resolution, covering):
+    """
+    Round intervals out to the cells they touch (covering) or in to the
+    cells they fully contain, as _cells does, and merge them.
+    """
+    aligned = []
+    for start, end in intervals:
+        first, last = (start - origin) / resolution, (end - origin) / resolution
+        first, last = (math.floor(first), math.ceil(last)) if covering else (math.ceil(first), math.floor(last))
+        if last > first:
+            aligned.append((origin + resolution * first, origin + resolution * last))
+    return merge_intervals(aligned)
+
+
+def _inside(windows, window_starts, start, end):
+    index = bisect_right(window_starts, start) - 1
+    return index >= 0 and windows[index][1] >= end
+
+
+def find_group_slots_python(attendees, windows, time_min, time_max, duration, resolution, tz, limit=10):
+    """
+    Interval-merge version of find_group_slots: merge everyone's busy
+    intervals, sweep them against the windows and score each candidate
+    start against each attendee's working hours.
+    """
+    size = int((time_max - time_min) / resolution)
+    cells = int(duration / resolution)
+
+    busy = _aligned([interval for attendee in attendees for interval in attendee.busy], time_min, resolution, True)
+    hours = [_aligned(merge_intervals(attendee.working_hours), time_min, resolution, False) for attendee in attendees]
+    hour_starts = [[start for start, _ in own] for own in hours]
+
+    candidates = []
+    for gap_start, gap_end in free_intervals(busy, _aligned(windows, time_min, resolution, False)):
+        first = max(0, int((gap_start - time_min) / resolution))
+        last = min(size, int((gap_end - time_min) / resolution))
+        for start in range(first, last - cells + 1):
+            slot_start = time_min + resolution * start
+            slot_end = slot_start + duration
+            score = sum(
+                _inside(own, starts, slot_start, slot_end) for own, starts in zip(hours, hour_starts)
+            )
+            candidates.append((-score, start))
+
+    candidates.sort()
+    taken = _pick([start for _, start in candidates], [-score for score, _ in candidates], cells, limit)
+    return _slots(taken, time_min, resolution, cells, tz)
@@ -0,0 +1,235 @@
+import contextlib
+import json
+import statistics
+import threading
+import time as timer
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from importlib import import_module
+from pathlib import Path
+
+import requests
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.test import Client, override_settings
+
+from bench.mock_google import make_server
+
+ENDPOINTS = ('calendar', 'add-event', 'user-info', 'login')
+MODES = ('client', 'server')
+# p99 is reported but too noisy on short runs to fail a build on.
+GATED = (('p50', 1), ('p95', 1), ('throughput', -1))
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def bench_request(endpoint, index):
+    """(method, path, JSON body) of the index-th request to endpoint."""
+    if endpoint == 'calendar':
+        today = date.today()
+        return 'GET', f'/api/calendar/?year={today.year}&month={index % 12 + 1}', None
+    if endpoint == 'add-event':
+        start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) + timedelta(hours=index + 1)
+        return 'POST', '/api/calendar/add-event', {
+            'summary': f'Benchmark event {index}',
+            'start': {'dateTime': start.isoformat()},
+            'end': {'dateTime': (start + timedelta(minutes=30)).isoformat()},
+        }
+    if endpoint == 'user-info':
+        return 'GET', '/api/user-info/', None
+    return 'POST', '/api/login/', {'code': 'bench'}
+
+
+def summarize(samples, errors, elapsed):
+    quantiles = statistics.quantiles(samples, n=100, method='inclusive')
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'throughput': len(samples) / elapsed,
+        'p50': quantiles[49],
+        'p95': quantiles[94],
+        'p99': quantiles[98],
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the calendar, add-event, user-info and login endpoints against a mock Google server, '
+        'through the Django test client and a real threaded WSGI server. Reports p50/p95/p99 latency and '
+        'throughput, and fails when results regress past --tolerance from the --baseline file.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint and mode')
+        parser.add_argument('--concurrency', type=int, default=8,
+                            help='Concurrent clients in server mode. SQLite rejects concurrent logins with '
+                                 '"database is locked"; run against PostgreSQL or use 1')
+        parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+        parser.add_argument('--endpoints', nargs='+', choices=ENDPOINTS, default=list(ENDPOINTS))
+        parser.add_argument('--latency', type=float, default=20, help='Mock Google latency in milliseconds')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Share of mock Google calls that fail')
+        parser.add_argument('--events-per-month', type=int, default=100)
+        parser.add_argument('--warm', action='store_true',
+                            help='Keep the month cache, mirror and prefetching as configured instead of '
+                                 'sending every calendar request to Google')
+        parser.add_argument('--baseline', help='JSON file to compare against; written when it does not exist')
+        parser.add_argument('--update-baseline', action='store_true', help='Overwrite --baseline with this run')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed relative regression of p50, p95 and throughput')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 2:
+            raise CommandError('--requests must be at least 2')
+
+        mock = make_server(latency=options['latency'] / 1000, events_per_month=options['events_per_month'],
+                           error_rate=options['error_rate'])
+        threading.Thread(target=mock.serve_forever, daemon=True).start()
+        mock_url = f'http://127.0.0.1:{mock.server_port}'
+
+        overrides = {
+            'GOOGLE_API_BASE_URL': mock_url,
+            'GOOGLE_OAUTH2_BASE_URL': mock_url,
+            'GOOGLE_CLIENT_ID': settings.GOOGLE_CLIENT_ID or 'bench-client',
+            'GOOGLE_CLIENT_SECRET': settings.GOOGLE_CLIENT_SECRET or 'bench-secret',
+            'GOOGLE_RATE_LIMIT_ENABLED': False,
+        }
+        if not options['warm']:
+            overrides.update(CALENDAR_CACHE_TTL=0, CALENDAR_SYNC_ENABLED=False, CALENDAR_PREFETCH_BACKEND='')
+
+        # The mock signs code 'bench' in as this user too, so deleting it
+        # also drops the social account, tokens and mirror the run created.
+        user, created = get_user_model().objects.get_or_create(
+            username='bench@example.com', defaults={'email': 'bench@example.com'})
+
+        results = {}
+        try:
+            with override_settings(**overrides):
+                for mode in options['modes']:
+                    run = self._client_run(user) if mode == 'client' else self._server_run(user, options)
+                    with run as send:
+                        for endpoint in options['endpoints']:
+                            result = self._measure(send, endpoint, options, mode)
+                            results[f'{mode}:{endpoint}'] = result
+                            self._report(mode, endpoint, result)
+        finally:
+            mock.shutdown()
+            if created:
+                user.delete()
+
+        self._check_baseline(results, options)
+
+    @staticmethod
+    def _measure(send, endpoint, options, mode):
+        concurrency = options['concurrency'] if mode == 'server' else 1
+
+        def timed(index):
+            started = timer.perf_counter()
+            status = send(*bench_request(endpoint, index))
+            return (timer.perf_counter() - started) * 1000, status >= 400
+
+        send(*bench_request(endpoint, 0))
+        started = timer.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = list(pool.map(timed, range(options['requests'])))
+        elapsed = timer.perf_counter() - started
+
+        return summarize([sample for sample, _ in outcomes], sum(failed for _, failed in outcomes), elapsed)
+
+    @staticmethod
+    @contextlib.contextmanager
+    def _client_run(user):
+        client = Client()
+        client.force_login(user)
+        client.cookies['access_token'] = 'bench'
+        anonymous = Client()
+
+        def send(method, path, body):
+            target = anonymous if path == '/api/login/' else client
+            if method == 'GET':
+                response = target.get(path)
+            else:
+                response = target.post(path, json.dumps(body), content_type='application/json')
+            if response.streaming:
+                b''.join(response.streaming_content)
+            return response.status_code
+
+        yield send
+
+    @staticmethod
+    @contextlib.contextmanager
+    def _server_run(user, options):
+        server = ThreadedWSGIServer(('127.0.0.1', 0), QuietRequestHandler)
+        server.set_app(get_wsgi_application())
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{server.server_port}'
+
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+
+        csrf = requests.get(f'{base_url}/get-csrf-token/')
+        # The app's cookies are Secure, so they are passed explicitly
+        # rather than through the cookie jar over plain HTTP.
+        cookies = {
+            settings.SESSION_COOKIE_NAME: session.session_key,
+            settings.CSRF_COOKIE_NAME: csrf.cookies[settings.CSRF_COOKIE_NAME],
+            'access_token': 'bench',
+        }
+        headers = {'X-CSRFToken': csrf.json()['csrfToken']}
+        local = threading.local()
+
+        def send(method, path, body):
+            if not hasattr(local, 'session'):
+                local.session = requests.Session()
+            login = path == '/api/login/'
+            response = local.session.request(
+                method, f'{base_url}{path}', json=body,
+                cookies=None if login else cookies, headers=None if login else headers,
+            )
+            return response.status_code
+
+        try:
+            yield send
+        finally:
+            server.shutdown()
+            server.server_close()
+            session.delete()
+
+    def _report(self, mode, endpoint, result):
+        self.stdout.write(
+            f"{mode:<7} {endpoint:<10} {result['throughput']:8.1f} req/s  p50 {result['p50']:8.2f} ms  "
+            f"p95 {result['p95']:8.2f} ms  p99 {result['p99']:8.2f} ms  errors {result['errors']}"
+        )
+
+    def _check_baseline(self, results, options):
+        if not options['baseline']:
+            return
+
+        path = Path(options['baseline'])
+        if options['update_baseline'] or not path.exists():
+            path.write_text(json.dumps(results, indent=2, sort_keys=True) + '\n')
+            self.stdout.write(f'Baseline written to {path}')
+            return
+
+        baseline = json.loads(path.read_text())
+        regressions = []
+        for key, result in results.items():
+            if key not in baseline:
+                continue
+            for metric, direction in GATED:
+                before, after = baseline[key][metric], result[metric]
+                change = (after - before) / before * direction if before else 0
+                if change > options['tolerance']:
+                    regressions.append(f'{key} {metric}: {before:.2f} -> {after:.2f} ({change:+.0%})')
+
+        if regressions:
+            raise CommandError('Performance regressed against the baseline:\n' + '\n'.join(regressions))
+        self.stdout.write(f'Within {options["tolerance"]:.0%} of the baseline in {path}')
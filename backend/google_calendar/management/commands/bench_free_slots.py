@@ -0,0 +1,85 @@
+import random
+import time as timer
+from datetime import date, datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from google_calendar.planner import busy_intervals, event_interval, find_free_slots
+
+
+def synthetic_events(count, start_date, days, tz, seed):
+    rng = random.Random(seed)
+    events = []
+    for index in range(count):
+        day = start_date + timedelta(days=rng.randrange(days))
+        start = datetime.combine(day, time(7), tzinfo=tz) + timedelta(minutes=15 * rng.randrange(48))
+        end = start + timedelta(minutes=15 * rng.randint(1, 8))
+        events.append({
+            'id': f'event-{index}',
+            'start': {'dateTime': start.isoformat()},
+            'end': {'dateTime': end.isoformat()},
+        })
+    return events
+
+
+def naive_free_slots(events, start_date, end_date, work_start, work_end, duration, tz):
+    intervals = [interval for interval in map(lambda event: event_interval(event, tz), events) if interval]
+    slots = []
+    day = start_date
+    while day <= end_date:
+        current = datetime.combine(day, work_start, tzinfo=tz)
+        end_of_search = datetime.combine(day, work_end, tzinfo=tz)
+        while current + duration <= end_of_search:
+            slot_end = current + duration
+            if not any(current < end and slot_end > start for start, end in intervals):
+                slots.append((current, slot_end))
+                current = slot_end
+            else:
+                current += timedelta(minutes=15)
+        day += timedelta(days=1)
+    return slots
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the free-slot planner against a per-slot scan on synthetic calendars'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, nargs='+', default=[1000, 10000, 50000])
+        parser.add_argument('--days', type=int, default=7, help='Length of the planned range')
+        parser.add_argument('--calendar-days', type=int, default=365, help='Span the synthetic events cover')
+        parser.add_argument('--duration', type=int, default=30)
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--skip-naive', action='store_true')
+
+    def handle(self, *args, **options):
+        tz = ZoneInfo(settings.TIME_ZONE)
+        start_date = date.today()
+        end_date = start_date + timedelta(days=options['days'] - 1)
+        duration = timedelta(minutes=options['duration'])
+
+        for count in options['events']:
+            events = synthetic_events(count, start_date, options['calendar_days'], tz, options['seed'])
+
+            planner_time = self._best_of(options['repeat'], lambda: find_free_slots(
+                busy_intervals(events, tz), start_date, end_date, time(9), time(17), duration, tz))
+            line = f'{count:>7} events  sweep {planner_time * 1000:9.2f} ms'
+
+            if not options['skip_naive']:
+                naive_time = self._best_of(1, lambda: naive_free_slots(
+                    events, start_date, end_date, time(9), time(17), duration, tz))
+                line += f'  per-slot scan {naive_time * 1000:9.2f} ms  ({naive_time / planner_time:.1f}x)'
+
+            self.stdout.write(line)
+
+    @staticmethod
+    def _best_of(repeat, func):
+        best = None
+        for _ in range(repeat):
+            started = timer.perf_counter()
+            func()
+            elapsed = timer.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best
@@ -0,0 +1,83 @@
+import random
+import time as timer
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from google_calendar.group_slots import Attendee, attendee_hours, find_group_slots, find_group_slots_python, np
+from google_calendar.planner import merge_intervals, working_windows
+
+TIME_ZONES = ('America/Los_Angeles', 'America/New_York', 'Europe/London', 'Europe/Berlin', 'Asia/Kolkata')
+
+
+def synthetic_attendees(count, start_date, days, events_per_day, seed):
+    rng = random.Random(seed)
+    attendees = []
+    for index in range(count):
+        tz = ZoneInfo(rng.choice(TIME_ZONES))
+        busy = []
+        for day in range(days):
+            for _ in range(events_per_day):
+                start = datetime.combine(start_date + timedelta(days=day), time(7), tzinfo=tz) + \
+                    timedelta(minutes=5 * rng.randrange(144))
+                busy.append((start.astimezone(timezone.utc),
+                             (start + timedelta(minutes=15 * rng.randint(1, 6))).astimezone(timezone.utc)))
+        hours = attendee_hours(start_date, start_date + timedelta(days=days - 1), time(9), time(17), tz)
+        attendees.append(Attendee(f'attendee-{index}@example.com', merge_intervals(busy), hours))
+    return attendees
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the NumPy bitmap group slot finder against the pure-Python interval merge'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--attendees', type=int, nargs='+', default=[5, 20, 50])
+        parser.add_argument('--days', type=int, default=14)
+        parser.add_argument('--events-per-day', type=int, default=3)
+        parser.add_argument('--duration', type=int, default=30)
+        parser.add_argument('--resolutions', type=int, nargs='+', default=[15, 1])
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if np is None:
+            raise CommandError('NumPy is not installed')
+
+        tz = ZoneInfo(settings.TIME_ZONE)
+        start_date = date.today()
+        end_date = start_date + timedelta(days=options['days'] - 1)
+        time_min = datetime.combine(start_date, time.min, tzinfo=tz).astimezone(timezone.utc)
+        time_max = datetime.combine(end_date + timedelta(days=1), time.min, tzinfo=tz).astimezone(timezone.utc)
+        # Search the whole day so attendees in other time zones can be met.
+        windows = working_windows(start_date, end_date, time(0), time(23, 59), tz)
+        duration = timedelta(minutes=options['duration'])
+
+        for count in options['attendees']:
+            attendees = synthetic_attendees(count, start_date, options['days'], options['events_per_day'],
+                                            options['seed'])
+            for minutes in options['resolutions']:
+                resolution = timedelta(minutes=minutes)
+                args = (attendees, windows, time_min, time_max, duration, resolution, tz)
+
+                bitmap_time, bitmap_slots = self._best_of(options['repeat'], lambda: find_group_slots(*args))
+                python_time, python_slots = self._best_of(options['repeat'], lambda: find_group_slots_python(*args))
+                if bitmap_slots != python_slots:
+                    raise CommandError(f'Results differ for {count} attendees at {minutes} min resolution')
+
+                self.stdout.write(
+                    f'{count:>3} attendees x {options["days"]} days @ {minutes:>2} min  '
+                    f'bitmap {bitmap_time * 1000:8.2f} ms  interval merge {python_time * 1000:8.2f} ms  '
+                    f'({python_time / bitmap_time:5.1f}x)  {len(bitmap_slots)} slots'
+                )
+
+    @staticmethod
+    def _best_of(repeat, func):
+        best = None
+        for _ in range(repeat):
+            started = timer.perf_counter()
+            result = func()
+            elapsed = timer.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
@@ -0,0 +1,58 @@
+import statistics
+import threading
+import time as timer
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from django.core.management.base import BaseCommand
+
+from core import google_client
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    body = b'{"kind": "calendar#events", "items": []}'
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = 'Compare per-request latency with and without connection reuse against a local stub server'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+
+    def handle(self, *args, **options):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f'http://127.0.0.1:{server.server_port}/calendar/v3/calendars/primary/events'
+
+        try:
+            self._report('new connection', self._measure(lambda: requests.get(url, timeout=5), options['requests']))
+            self._report('pooled session', self._measure(lambda: google_client.get(url), options['requests']))
+        finally:
+            server.shutdown()
+
+    @staticmethod
+    def _measure(send, count):
+        send()
+        samples = []
+        for _ in range(count):
+            started = timer.perf_counter()
+            send().content
+            samples.append((timer.perf_counter() - started) * 1000)
+        return sorted(samples)
+
+    def _report(self, label, samples):
+        p95 = samples[int(len(samples) * 0.95) - 1]
+        self.stdout.write(f'{label:<16} mean {statistics.mean(samples):7.3f} ms  '
+                          f'p50 {statistics.median(samples):7.3f} ms  p95 {p95:7.3f} ms')
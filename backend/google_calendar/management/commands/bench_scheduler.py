@@ -0,0 +1,59 @@
+import random
+import time as timer
+from datetime import date, datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from google_calendar.management.commands.bench_free_slots import synthetic_events
+from google_calendar.planner import busy_intervals
+from google_calendar.scheduler import Task, plan
+
+
+def synthetic_tasks(count, start_date, days, tz, seed):
+    rng = random.Random(seed)
+    tasks = []
+    for index in range(count):
+        deadline_day = start_date + timedelta(days=rng.randrange(1, days + 1))
+        tasks.append(Task(
+            id=str(index),
+            summary=f'Task {index}',
+            duration=timedelta(minutes=15 * rng.randint(1, 8)),
+            priority=rng.randint(0, 5),
+            deadline=None if rng.random() < 0.3 else datetime.combine(deadline_day, time(17), tzinfo=tz),
+            earliest_start=None,
+        ))
+    return tasks
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the task scheduler on synthetic task lists and busy calendars'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, nargs='+', default=[100, 500])
+        parser.add_argument('--events', type=int, nargs='+', default=[1000, 3000])
+        parser.add_argument('--days', type=int, default=90)
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=7)
+
+    def handle(self, *args, **options):
+        tz = ZoneInfo(settings.TIME_ZONE)
+        start_date = date.today()
+
+        for event_count in options['events']:
+            busy = busy_intervals(synthetic_events(event_count, start_date, options['days'], tz, options['seed']), tz)
+            for task_count in options['tasks']:
+                tasks = synthetic_tasks(task_count, start_date, options['days'], tz, options['seed'])
+
+                best = None
+                for _ in range(options['repeat']):
+                    started = timer.perf_counter()
+                    scheduled, unscheduled = plan(tasks, busy, start_date, options['days'], time(9), time(17), tz)
+                    elapsed = timer.perf_counter() - started
+                    best = elapsed if best is None else min(best, elapsed)
+
+                self.stdout.write(
+                    f'{task_count:>5} tasks  {event_count:>6} events  {best * 1000:8.2f} ms  '
+                    f'scheduled {len(scheduled):>5}  unscheduled {len(unscheduled):>5}'
+                )
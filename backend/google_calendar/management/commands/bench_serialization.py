@@ -0,0 +1,85 @@
+import gzip
+import json
+import time as timer
+from datetime import datetime, timedelta, timezone
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from bench.mock_google import synthetic_event
+from core.renderers import ORJSONRenderer
+from google_calendar.fetch import format_event, stream_month
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def copying_format_event(event):
+    return {
+        'id': event.get('id'),
+        'summary': event.get('summary'),
+        'description': event.get('description'),
+        'location': event.get('location'),
+        'start': event.get('start'),
+        'end': event.get('end'),
+        'status': event.get('status'),
+        'htmlLink': event.get('htmlLink'),
+        'creator': event.get('creator')
+    }
+
+
+def google_items(count):
+    window_start = datetime(2025, 3, 1, tzinfo=timezone.utc)
+    window_end = window_start + timedelta(days=31)
+    items = []
+    for index in range(count):
+        event = synthetic_event(index, window_start, window_end)
+        del event['etag'], event['updated']
+        items.append(event)
+    return items
+
+
+class Command(BaseCommand):
+    help = 'Compare event formatting, JSON rendering and compressed payload size for synthetic months'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, nargs='+', default=[100, 1000, 10000])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        period = {'year': 2025, 'month': 3, 'start': '2025-03-01T00:00:00Z', 'end': '2025-03-31T23:59:59Z'}
+
+        for count in options['events']:
+            raw = json.dumps({'items': google_items(count)})
+
+            baseline = self._best_of(options['repeat'], lambda: JSONRenderer().render(
+                {'events': [copying_format_event(event) for event in json.loads(raw)['items']], 'period': period}
+            ))
+            rendered = self._best_of(options['repeat'], lambda: ORJSONRenderer().render(
+                {'events': [format_event(event) for event in json.loads(raw)['items']], 'period': period}
+            ))
+            streamed = self._best_of(options['repeat'], lambda: b''.join(stream_month(
+                (format_event(event) for event in json.loads(raw)['items']), period
+            )))
+
+            body = ORJSONRenderer().render({'events': [format_event(e) for e in json.loads(raw)['items']],
+                                            'period': period})
+            sizes = f'raw {len(body) / 1024:8.1f} KiB  gzip {len(gzip.compress(body, 6)) / 1024:7.1f} KiB'
+            if brotli is not None:
+                sizes += f'  br {len(brotli.compress(body, quality=5)) / 1024:7.1f} KiB'
+
+            self.stdout.write(
+                f'{count:>6} events  copy+json {baseline:8.2f} ms  in-place+orjson {rendered:8.2f} ms  '
+                f'stream {streamed:8.2f} ms  ({baseline / rendered:4.1f}x)  {sizes}'
+            )
+
+    @staticmethod
+    def _best_of(repeat, run):
+        best = float('inf')
+        for _ in range(repeat):
+            started = timer.perf_counter()
+            run()
+            best = min(best, (timer.perf_counter() - started) * 1000)
+        return best
@@ -0,0 +1,82 @@
+import asyncio
+import statistics
+import time as timer
+from importlib import import_module
+
+import httpx
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test calendar endpoints at several concurrency levels. Start the app under WSGI '
+        '(e.g. gunicorn core.wsgi) and ASGI (e.g. uvicorn core.asgi:application) against run_mock_google, '
+        'with CALENDAR_CACHE_TTL=0, CALENDAR_SYNC_ENABLED=False and CALENDAR_PREFETCH_BACKEND= so every '
+        'request reaches Google, and GOOGLE_RATE_LIMIT_ENABLED=False so the virtual users, who share one '
+        'session, are not throttled by the per-user Google budget.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', action='append', required=True,
+                            help='label=url, e.g. wsgi=http://127.0.0.1:8000/api/calendar/')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[50, 200, 500])
+        parser.add_argument('--requests', type=int, default=5, help='Requests per virtual user')
+
+    def handle(self, *args, **options):
+        cookies = self._session_cookies()
+        targets = [target.split('=', 1) for target in options['target']]
+
+        for concurrency in options['concurrency']:
+            for label, url in targets:
+                result = asyncio.run(self._run(url, cookies, concurrency, options['requests']))
+                self.stdout.write(
+                    f"{label:<8} {concurrency:>4} users  {result['throughput']:8.1f} req/s  "
+                    f"p50 {result['p50']:8.1f} ms  p95 {result['p95']:8.1f} ms  errors {result['errors']}"
+                )
+
+    @staticmethod
+    def _session_cookies():
+        user, _ = get_user_model().objects.get_or_create(
+            username='loadtest@example.com', defaults={'email': 'loadtest@example.com'})
+
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+
+        return {settings.SESSION_COOKIE_NAME: session.session_key, 'access_token': 'loadtest'}
+
+    @staticmethod
+    async def _run(url, cookies, concurrency, requests_per_user):
+        latencies = []
+        errors = 0
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+        async with httpx.AsyncClient(cookies=cookies, limits=limits, timeout=60) as client:
+            async def user(index):
+                nonlocal errors
+                for request_number in range(requests_per_user):
+                    month = (index + request_number) % 12 + 1
+                    started = timer.perf_counter()
+                    try:
+                        response = await client.get(url, params={'year': 2025, 'month': month})
+                        if response.status_code != 200:
+                            errors += 1
+                    except httpx.HTTPError:
+                        errors += 1
+                    latencies.append((timer.perf_counter() - started) * 1000)
+
+            started = timer.perf_counter()
+            await asyncio.gather(*(user(index) for index in range(concurrency)))
+            elapsed = timer.perf_counter() - started
+
+        latencies.sort()
+        return {
+            'throughput': len(latencies) / elapsed,
+            'p50': statistics.median(latencies),
+            'p95': latencies[int(len(latencies) * 0.95) - 1],
+            'errors': errors,
+        }
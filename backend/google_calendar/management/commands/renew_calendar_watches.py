@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from google_calendar.watch import renew_expiring_channels
+
+
+class Command(BaseCommand):
+    help = (
+        'Replace calendar watch channels that are about to expire. Run it from cron more often than '
+        'CALENDAR_WATCH_RENEW_MARGIN, e.g. hourly.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--margin', type=int, default=None,
+                            help='Renew channels expiring within this many seconds')
+
+    def handle(self, *args, **options):
+        renewed, failed = renew_expiring_channels(options['margin'])
+        self.stdout.write(f'Renewed {renewed} channels, {failed} failed')
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from bench.mock_google import make_server
+
+
+class Command(BaseCommand):
+    help = 'Run a local mock of the Google Calendar and OAuth endpoints'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency', type=float, default=50, help='Added latency per call in milliseconds')
+        parser.add_argument('--events-per-month', type=int, default=100)
+        parser.add_argument('--error-rate', type=float, default=0.0,
+                            help='Share of calls answered with a 503, between 0 and 1')
+
+    def handle(self, *args, **options):
+        server = make_server(options['host'], options['port'], options['latency'] / 1000,
+                             options['events_per_month'], error_rate=options['error_rate'])
+        base_url = f"http://{options['host']}:{server.server_port}"
+        self.stdout.write(f'Mock Google listening on {base_url}')
+        self.stdout.write(f'Set GOOGLE_API_BASE_URL={base_url} and GOOGLE_OAUTH2_BASE_URL={base_url}')
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarSyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('calendar_id', models.CharField(max_length=255)),
+                ('sync_token', models.TextField(blank=True, default='')),
+                ('last_synced_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='calendar_sync_states', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'calendar_id'), name='unique_calendar_sync_state')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MirroredEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('calendar_id', models.CharField(max_length=255)),
+                ('event_id', models.CharField(max_length=1024)),
+                ('summary', models.TextField(blank=True, null=True)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('location', models.TextField(blank=True, null=True)),
+                ('status', models.CharField(blank=True, max_length=32, null=True)),
+                ('html_link', models.TextField(blank=True, null=True)),
+                ('creator', models.JSONField(blank=True, null=True)),
+                ('start', models.JSONField(blank=True, null=True)),
+                ('end', models.JSONField(blank=True, null=True)),
+                ('start_time', models.DateTimeField()),
+                ('end_time', models.DateTimeField()),
+                ('etag', models.CharField(blank=True, default='', max_length=255)),
+                ('updated', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mirrored_events', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'calendar_id', 'start_time'], name='mirrored_event_start_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'calendar_id', 'event_id'), name='unique_mirrored_event')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('google_calendar', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calendarsyncstate',
+            name='dirty',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.CreateModel(
+            name='CalendarWatchChannel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('calendar_id', models.CharField(max_length=255)),
+                ('channel_id', models.CharField(max_length=64, unique=True)),
+                ('resource_id', models.CharField(max_length=255)),
+                ('token', models.CharField(max_length=64)),
+                ('expiration', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='calendar_watch_channels', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['expiration'], name='watch_channel_expiration_idx'), models.Index(fields=['user', 'calendar_id'], name='watch_channel_calendar_idx')],
+            },
+        ),
+    ]
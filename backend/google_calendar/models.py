@@ -1,3 +1,82 @@
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+
+class CalendarSyncState(models.Model):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='calendar_sync_states')
+    calendar_id = models.CharField(max_length=255)
+    sync_token = models.TextField(blank=True, default='')
+    last_synced_at = models.DateTimeField(null=True, blank=True)
+    dirty = models.BooleanField(default=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'calendar_id'], name='unique_calendar_sync_state'),
+        ]
+
+    def __str__(self):
+        return f'{self.user} / {self.calendar_id}'
+
+
+class CalendarWatchChannel(models.Model):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+                             related_name='calendar_watch_channels')
+    calendar_id = models.CharField(max_length=255)
+    channel_id = models.CharField(max_length=64, unique=True)
+    resource_id = models.CharField(max_length=255)
+    token = models.CharField(max_length=64)
+    expiration = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['expiration'], name='watch_channel_expiration_idx'),
+            models.Index(fields=['user', 'calendar_id'], name='watch_channel_calendar_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user} / {self.calendar_id} ({self.channel_id})'
+
+
+class MirroredEvent(models.Model):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='mirrored_events')
+    calendar_id = models.CharField(max_length=255)
+    event_id = models.CharField(max_length=1024)
+
+    summary = models.TextField(null=True, blank=True)
+    description = models.TextField(null=True, blank=True)
+    location = models.TextField(null=True, blank=True)
+    status = models.CharField(max_length=32, null=True, blank=True)
+    html_link = models.TextField(null=True, blank=True)
+    creator = models.JSONField(null=True, blank=True)
+    start = models.JSONField(null=True, blank=True)
+    end = models.JSONField(null=True, blank=True)
+
+    start_time = models.DateTimeField()
+    end_time = models.DateTimeField()
+    etag = models.CharField(max_length=255, blank=True, default='')
+    updated = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'calendar_id', 'event_id'], name='unique_mirrored_event'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'calendar_id', 'start_time'], name='mirrored_event_start_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.summary} ({self.event_id})'
+
+    def as_event(self):
+        return {
+            'id': self.event_id,
+            'summary': self.summary,
+            'description': self.description,
+            'location': self.location,
+            'start': self.start,
+            'end': self.end,
+            'status': self.status,
+            'htmlLink': self.html_link,
+            'creator': self.creator
+        }
@@ -0,0 +1,127 @@
+from datetime import datetime, date, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+
+def parse_event_time(value, tz):
+    if not value:
+        return None
+
+    if value.get('dateTime'):
+        parsed = datetime.fromisoformat(value['dateTime'].replace('Z', '+00:00'))
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=ZoneInfo(value.get('timeZone')) if value.get('timeZone') else tz)
+        return parsed.astimezone(timezone.utc)
+
+    if value.get('date'):
+        return datetime.combine(date.fromisoformat(value['date']), time.min, tzinfo=tz).astimezone(timezone.utc)
+
+    return None
+
+
+def event_interval(event, tz):
+    if event.get('status') == 'cancelled' or event.get('transparency') == 'transparent':
+        return None
+
+    start = parse_event_time(event.get('start'), tz)
+    end = parse_event_time(event.get('end'), tz)
+    if start is None or end is None or end <= start:
+        return None
+
+    return start, end
+
+
+def merge_intervals(intervals):
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+
+    return [(start, end) for start, end in merged]
+
+
+def busy_intervals(events, tz):
+    intervals = []
+    for event in events:
+        interval = event_interval(event, tz)
+        if interval:
+            intervals.append(interval)
+
+    return merge_intervals(intervals)
+
+
+def working_windows(start_date, end_date, work_start, work_end, tz, weekdays=None):
+    windows = []
+    day = start_date
+    while day <= end_date:
+        if weekdays is None or day.weekday() in weekdays:
+            window_start = datetime.combine(day, work_start, tzinfo=tz).astimezone(timezone.utc)
+            window_end = datetime.combine(day, work_end, tzinfo=tz).astimezone(timezone.utc)
+            if window_end > window_start:
+                windows.append((window_start, window_end))
+        day += timedelta(days=1)
+
+    return windows
+
+
+def free_intervals(busy, windows):
+    """
+    Sweep the merged busy intervals against the working windows and return
+    the gaps. Both inputs must be sorted by start and in UTC; busy must be
+    merged.
+    """
+    gaps = []
+    index = 0
+
+    for window_start, window_end in windows:
+        while index < len(busy) and busy[index][1] <= window_start:
+            index += 1
+
+        cursor = window_start
+        position = index
+        while position < len(busy) and busy[position][0] < window_end:
+            busy_start, busy_end = busy[position]
+            if busy_start > cursor:
+                gaps.append((cursor, busy_start))
+            if busy_end > cursor:
+                cursor = busy_end
+            position += 1
+
+        if cursor < window_end:
+            gaps.append((cursor, window_end))
+
+    return gaps
+
+
+def split_into_slots(gaps, duration, tz):
+    slots = []
+    for gap_start, gap_end in gaps:
+        slot_start = gap_start
+        while slot_start + duration <= gap_end:
+            slots.append({
+                'start': slot_start.astimezone(tz),
+                'end': (slot_start + duration).astimezone(tz),
+                'gap_minutes': int((gap_end - gap_start).total_seconds() // 60),
+            })
+            slot_start += duration
+
+    return slots
+
+
+def rank_slots(slots, order='earliest'):
+    if order == 'roomiest':
+        return sorted(slots, key=lambda slot: (-slot['gap_minutes'], slot['start']))
+
+    return sorted(slots, key=lambda slot: slot['start'])
+
+
+def find_free_slots(busy, start_date, end_date, work_start, work_end, duration, tz,
+                    weekdays=None, order='earliest', limit=None):
+    windows = working_windows(start_date, end_date, work_start, work_end, tz, weekdays)
+    slots = rank_slots(split_into_slots(free_intervals(busy, windows), duration, tz), order)
+
+    if limit is not None:
+        return slots[:limit]
+    return slots
@@ -0,0 +1,153 @@
+import queue
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.utils.module_loading import import_string
+
+from core import metrics, rate_limit
+from core.rate_limit import RateLimited
+from google_auth.token_manager import get_access_token
+
+from .sync import sync_calendar
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+class ThreadPoolBackend:
+    """
+    In-process workers fed from a bounded queue. Jobs that do not fit are
+    dropped, since a prefetch that runs late is no better than none.
+    """
+
+    def __init__(self):
+        self.queue = queue.Queue(maxsize=settings.CALENDAR_PREFETCH_QUEUE_SIZE)
+        self.threads = [
+            threading.Thread(target=self._work, name=f'calendar-prefetch-{index}', daemon=True)
+            for index in range(settings.CALENDAR_PREFETCH_WORKERS)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, job):
+        try:
+            self.queue.put_nowait(job)
+            return True
+        except queue.Full:
+            return False
+
+    def _work(self):
+        while True:
+            job = self.queue.get()
+            close_old_connections()
+            try:
+                run_job(job)
+            finally:
+                close_old_connections()
+                self.queue.task_done()
+
+
+def get_backend():
+    """
+    Backend named by CALENDAR_PREFETCH_BACKEND, or None when prefetching is
+    off. A backend only needs submit(job) returning whether the job was
+    accepted; jobs are plain dicts, so a task queue backend can send them
+    to its workers and call run_job there.
+    """
+    global _backend
+    if not settings.CALENDAR_PREFETCH_BACKEND:
+        return None
+
+    with _backend_lock:
+        if _backend is None:
+            _backend = import_string(settings.CALENDAR_PREFETCH_BACKEND)()
+    return _backend
+
+
+def shift_month(year, month, delta):
+    index = year * 12 + month - 1 + delta
+    return index // 12, index % 12 + 1
+
+
+def prefetch_months(user_id, calendar_id, months):
+    backend = get_backend()
+    if backend is None:
+        return
+
+    for year, month in months:
+        dedup_key = f'calendar-prefetch:{user_id}:{calendar_id}:{year}:{month}'
+        if not cache.add(dedup_key, 1, settings.CALENDAR_PREFETCH_DEDUP_TTL):
+            metrics.prefetch_jobs.inc('deduplicated')
+            continue
+
+        job = {'user_id': user_id, 'calendar_id': calendar_id, 'year': year, 'month': month}
+        if backend.submit(job):
+            metrics.prefetch_jobs.inc('queued')
+        else:
+            cache.delete(dedup_key)
+            metrics.prefetch_jobs.inc('dropped')
+
+
+def prefetch_around(user_id, calendar_id, year, month, include_current=False):
+    """
+    Queue the months within CALENDAR_PREFETCH_RADIUS of year/month, nearest
+    first, so flipping to them is served from the cache.
+    """
+    deltas = [0] if include_current else []
+    for distance in range(1, settings.CALENDAR_PREFETCH_RADIUS + 1):
+        deltas += [distance, -distance]
+    prefetch_months(user_id, calendar_id, [shift_month(year, month, delta) for delta in deltas])
+
+
+def prefetch_beyond(user_id, calendar_id, months):
+    """
+    Queue the months within CALENDAR_PREFETCH_RADIUS before and after a
+    loaded range, nearest first.
+    """
+    first, last = min(months), max(months)
+    neighbours = []
+    for distance in range(1, settings.CALENDAR_PREFETCH_RADIUS + 1):
+        neighbours += [shift_month(*last, distance), shift_month(*first, -distance)]
+    prefetch_months(user_id, calendar_id, [month for month in neighbours if month not in months])
+
+
+def run_job(job):
+    """
+    Load one month into the event cache. Skipped while the user's or the
+    project's Google budget is below CALENDAR_PREFETCH_MIN_HEADROOM.
+    """
+    # views queues prefetches, so it can only be imported once loaded.
+    from .views import fetch_month, mirrored_month
+
+    user = get_user_model().objects.filter(pk=job['user_id']).first()
+    if user is None:
+        return
+
+    if rate_limit.headroom(user.pk) < settings.CALENDAR_PREFETCH_MIN_HEADROOM:
+        metrics.prefetch_jobs.inc('throttled')
+        return
+
+    calendar_id, year, month = job['calendar_id'], job['year'], job['month']
+    try:
+        access_token = get_access_token(user)
+        if not access_token:
+            metrics.prefetch_jobs.inc('failed')
+            return
+
+        with rate_limit.charged_to(user):
+            if settings.CALENDAR_SYNC_ENABLED:
+                # Waits for a sync the triggering request is running and
+                # then finds the mirror fresh.
+                sync_calendar(user, access_token, calendar_id, max_age=settings.CALENDAR_CACHE_TTL)
+                mirrored_month(user, calendar_id, year, month)
+            else:
+                fetch_month(user.pk, access_token, calendar_id, year, month)
+        metrics.prefetch_jobs.inc('done')
+    except RateLimited:
+        metrics.prefetch_jobs.inc('throttled')
+    except Exception as e:
+        print(f"Error prefetching {calendar_id} {year}-{month:02d}: {str(e)}")
+        metrics.prefetch_jobs.inc('failed')
@@ -0,0 +1,257 @@
+import hashlib
+import json
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core import metrics
+
+from .fetch import EVENT_FIELDS, FORMAT_FIELDS, format_event
+from .planner import parse_event_time
+
+try:
+    from dateutil.rrule import rruleset, rrulestr
+except ImportError:
+    rruleset = rrulestr = None
+
+SERIES_FIELDS = f'etag,nextPageToken,items({EVENT_FIELDS},recurrence,recurringEventId,originalStartTime)'
+
+
+class UnsupportedRecurrence(Exception):
+    pass
+
+
+def enabled():
+    return settings.CALENDAR_EXPAND_RECURRENCE and rrulestr is not None
+
+
+def _rfc3339(moment):
+    return moment.astimezone(timezone.utc).isoformat().replace('+00:00', 'Z')
+
+
+def series_params(window_start, window_end):
+    """
+    events.list parameters that return each recurring event once, with its
+    rules, next to its exceptions. The window is padded by
+    CALENDAR_RECURRENCE_PADDING_DAYS because Google matches exceptions by
+    their new time, and one moved out of the window still has to hide the
+    occurrence it replaced.
+    """
+    padding = timedelta(days=settings.CALENDAR_RECURRENCE_PADDING_DAYS)
+    return {
+        'timeMin': _rfc3339(window_start - padding),
+        'timeMax': _rfc3339(window_end + padding),
+    }
+
+
+def _moment(value, dtstart, tzid=None):
+    """
+    RFC 5545 DATE or DATE-TIME value as a datetime comparable with dtstart:
+    floating for all-day series, in dtstart's zone otherwise.
+    """
+    if 'T' not in value:
+        day = datetime.strptime(value, '%Y%m%d')
+        return day if dtstart.tzinfo is None else datetime.combine(day.date(), dtstart.timetz())
+
+    moment = datetime.strptime(value.rstrip('Z'), '%Y%m%dT%H%M%S')
+    if dtstart.tzinfo is None:
+        return datetime.combine(moment.date(), time.min)
+    if value.endswith('Z'):
+        return moment.replace(tzinfo=timezone.utc).astimezone(dtstart.tzinfo)
+    return moment.replace(tzinfo=ZoneInfo(tzid) if tzid else dtstart.tzinfo)
+
+
+def _with_until(rule, dtstart):
+    # dateutil only accepts UNTIL in UTC for zoned starts and floating for
+    # all-day ones, while Google passes on whatever the client sent.
+    parts = []
+    for part in rule.split(';'):
+        name, _, value = part.partition('=')
+        if name.upper() == 'UNTIL':
+            until = _moment(value, dtstart)
+            if until.tzinfo is not None:
+                value = until.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+            else:
+                value = until.strftime('%Y%m%dT%H%M%S')
+            part = f'{name}={value}'
+        parts.append(part)
+    return ';'.join(parts)
+
+
+def _rule_set(recurrence, dtstart):
+    rules = rruleset()
+    for line in recurrence:
+        head, _, value = line.partition(':')
+        name, *params = head.split(';')
+        params = {key.upper(): param for key, _, param in (param.partition('=') for param in params)}
+        name = name.upper()
+
+        if name == 'RRULE':
+            rules.rrule(rrulestr(_with_until(value, dtstart), dtstart=dtstart))
+        elif name in ('RDATE', 'EXDATE') and params.get('VALUE') != 'PERIOD':
+            add = rules.rdate if name == 'RDATE' else rules.exdate
+            for item in value.split(','):
+                add(_moment(item, dtstart, params.get('TZID')))
+        else:
+            raise UnsupportedRecurrence(line)
+    return rules
+
+
+def _series_zone(master):
+    name = master['start'].get('timeZone')
+    return ZoneInfo(name) if name else ZoneInfo(settings.TIME_ZONE)
+
+
+def _expand(master, window_start, window_end):
+    start, end = master['start'], master['end']
+
+    if start.get('dateTime'):
+        tz = _series_zone(master)
+        dtstart = datetime.fromisoformat(start['dateTime'].replace('Z', '+00:00')).astimezone(tz)
+        duration = parse_event_time(end, tz) - dtstart
+        after, before = window_start - duration, window_end
+    else:
+        # All-day series repeat on dates, which parse_event_time places at
+        # midnight in TIME_ZONE.
+        local = ZoneInfo(settings.TIME_ZONE)
+        dtstart = datetime.combine(date.fromisoformat(start['date']), time.min)
+        duration = datetime.combine(date.fromisoformat(end['date']), time.min) - dtstart
+        after = window_start.astimezone(local).replace(tzinfo=None) - duration
+        before = window_end.astimezone(local).replace(tzinfo=None)
+
+    moments = _rule_set(master['recurrence'], dtstart).between(after, before)
+    if dtstart.tzinfo is None:
+        return [moment.date().isoformat() for moment in moments]
+    # Round-tripping through UTC moves wall times skipped by a DST change to
+    # the instant they fall on, e.g. 03:30 to 04:30 when clocks go forward.
+    return [moment.astimezone(timezone.utc).astimezone(tz).isoformat() for moment in moments]
+
+
+def occurrences(user_id, calendar_id, master, window_start, window_end):
+    """
+    Start of every occurrence of a recurring event that overlaps the window,
+    before exceptions, as dates for all-day series and offset date-times in
+    the series' zone otherwise. Cached per series and window; the key covers
+    everything the expansion depends on, so entries never go stale.
+    """
+    digest = hashlib.sha1(json.dumps(
+        [master['start'], master['end'], master['recurrence'], window_start.isoformat(), window_end.isoformat()],
+        sort_keys=True
+    ).encode()).hexdigest()
+    key = f'calendar-occurrences:{user_id}:{calendar_id}:{master["id"]}:{digest}'
+
+    starts = cache.get(key)
+    metrics.record_cache('calendar_occurrences', starts is not None)
+    if starts is None:
+        try:
+            starts = _expand(master, window_start, window_end)
+        except (KeyError, TypeError, ValueError) as e:
+            raise UnsupportedRecurrence(f'{master["id"]}: {str(e)}')
+        cache.set(key, starts, settings.CALENDAR_OCCURRENCES_CACHE_TTL)
+    return starts
+
+
+def _instant(value):
+    if 'T' in value:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return date.fromisoformat(value)
+
+
+def _overlaps(event, window_start, window_end, tz):
+    start = parse_event_time(event.get('start'), tz)
+    end = parse_event_time(event.get('end'), tz) or start
+    return start is None or (start < window_end and end > window_start)
+
+
+def series_month(user_id, calendar_id, items, window_start, window_end):
+    """
+    Split events.list items fetched with series_params into the one-off
+    events of the window, the recurring series that occur in it and, per
+    series, the start of each occurrence. Exceptions count as one-off
+    events and drop the occurrence they replace or cancel. Raises
+    UnsupportedRecurrence when a series cannot be expanded locally.
+    """
+    tz = ZoneInfo(settings.TIME_ZONE)
+    events = []
+    series = []
+    replaced = set()
+
+    for item in items:
+        if item.get('recurringEventId'):
+            original = item.get('originalStartTime') or {}
+            if original.get('dateTime') or original.get('date'):
+                replaced.add((item['recurringEventId'], _instant(original.get('dateTime') or original.get('date'))))
+            if item.get('status') == 'cancelled':
+                continue
+        if item.get('recurrence'):
+            series.append(format_event(item))
+        elif _overlaps(item, window_start, window_end, tz):
+            events.append(format_event(item))
+
+    instances = {}
+    for master in series:
+        starts = [
+            start for start in occurrences(user_id, calendar_id, master, window_start, window_end)
+            if (master['id'], _instant(start)) not in replaced
+        ]
+        if starts:
+            instances[master['id']] = starts
+
+    events.sort(key=lambda event: parse_event_time(event.get('start'), tz) or window_end)
+    return {
+        'events': events,
+        'series': [master for master in series if master['id'] in instances],
+        'instances': instances,
+    }
+
+
+def _occurrence(master, start, duration, tz):
+    if 'T' in start:
+        moment = datetime.fromisoformat(start)
+        event_id = f'{master["id"]}_{moment.astimezone(timezone.utc):%Y%m%dT%H%M%SZ}'
+        zone = master['start'].get('timeZone') or settings.TIME_ZONE
+        start_time = {'dateTime': start, 'timeZone': zone}
+        end_time = {'dateTime': (moment + duration).astimezone(tz).isoformat(), 'timeZone': zone}
+    else:
+        day = date.fromisoformat(start)
+        event_id = f'{master["id"]}_{day:%Y%m%d}'
+        start_time = {'date': start}
+        end_time = {'date': (day + duration).isoformat()}
+
+    event = {field: master.get(field) for field in FORMAT_FIELDS}
+    event.update({
+        'id': event_id,
+        'start': start_time,
+        'end': end_time,
+        'recurringEventId': master['id'],
+        'originalStartTime': start_time,
+    })
+    return event
+
+
+def expand_series(payload):
+    """
+    Month payload with the occurrences of its series written out as events,
+    with the ids and times Google gives them under singleEvents. Payloads
+    without series are returned as they are.
+    """
+    if 'series' not in payload:
+        return payload
+
+    local = ZoneInfo(settings.TIME_ZONE)
+    events = list(payload['events'])
+    for master in payload['series']:
+        tz = _series_zone(master)
+        if master['start'].get('dateTime'):
+            duration = parse_event_time(master['end'], tz) - parse_event_time(master['start'], tz)
+        else:
+            duration = date.fromisoformat(master['end']['date']) - date.fromisoformat(master['start']['date'])
+        events += [_occurrence(master, start, duration, tz) for start in payload['instances'][master['id']]]
+
+    far_future = datetime.max.replace(tzinfo=timezone.utc)
+    events.sort(key=lambda event: parse_event_time(event.get('start'), local) or far_future)
+    expanded = {key: value for key, value in payload.items() if key not in ('series', 'instances')}
+    expanded['events'] = events
+    return expanded
@@ -0,0 +1,108 @@
+import heapq
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+from .planner import free_intervals, working_windows
+
+Task = namedtuple('Task', ['id', 'summary', 'duration', 'priority', 'deadline', 'earliest_start'])
+
+
+def _parse_datetime(value, tz):
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=tz)
+    return parsed.astimezone(timezone.utc)
+
+
+def parse_tasks(raw_tasks, tz):
+    tasks = []
+    for index, raw in enumerate(raw_tasks):
+        duration = int(raw['duration'])
+        if duration <= 0:
+            raise ValueError(f'Task {index} has a non-positive duration')
+
+        tasks.append(Task(
+            id=str(raw.get('id', index)),
+            summary=raw.get('summary') or f'Task {index + 1}',
+            duration=timedelta(minutes=duration),
+            priority=int(raw.get('priority', 0)),
+            deadline=_parse_datetime(raw.get('deadline'), tz),
+            earliest_start=_parse_datetime(raw.get('earliestStart'), tz),
+        ))
+    return tasks
+
+
+def schedule_tasks(tasks, gaps, horizon_start):
+    """
+    Place tasks into free gaps with a sweep over the gaps in time order and
+    a priority queue of released tasks. At each point the highest priority
+    task (earliest deadline on ties) that fits the rest of the gap and still
+    meets its deadline is placed. Gaps must be sorted, non-overlapping and
+    in UTC.
+    """
+    pending = sorted(
+        (task.earliest_start or horizon_start, order, task) for order, task in enumerate(tasks)
+    )
+    heap = []
+    next_pending = 0
+    scheduled = []
+    unscheduled = {}
+    far_future = datetime.max.replace(tzinfo=timezone.utc)
+
+    def release_until(moment):
+        nonlocal next_pending
+        while next_pending < len(pending) and pending[next_pending][0] <= moment:
+            _, order, task = pending[next_pending]
+            heapq.heappush(heap, (-task.priority, task.deadline or far_future, order, task))
+            next_pending += 1
+
+    for gap_start, gap_end in gaps:
+        cursor = gap_start
+        while cursor < gap_end:
+            release_until(cursor)
+
+            chosen = None
+            deferred = []
+            while heap:
+                entry = heapq.heappop(heap)
+                task = entry[3]
+                task_end = cursor + task.duration
+
+                if task.deadline and task_end > task.deadline:
+                    unscheduled[task.id] = 'deadline'
+                    continue
+                if task_end <= gap_end:
+                    chosen = task
+                    break
+                deferred.append(entry)
+
+            for entry in deferred:
+                heapq.heappush(heap, entry)
+
+            if chosen is None:
+                if next_pending < len(pending) and pending[next_pending][0] < gap_end:
+                    cursor = max(cursor, pending[next_pending][0])
+                    continue
+                break
+
+            scheduled.append({'task': chosen, 'start': cursor, 'end': cursor + chosen.duration})
+            unscheduled.pop(chosen.id, None)
+            cursor += chosen.duration
+
+    for entry in heap:
+        unscheduled.setdefault(entry[3].id, 'no_free_time')
+    for _, _, task in pending[next_pending:]:
+        unscheduled.setdefault(task.id, 'no_free_time')
+
+    return scheduled, unscheduled
+
+
+def plan(tasks, busy, start_date, days, work_start, work_end, tz, weekdays=None):
+    end_date = start_date + timedelta(days=days - 1)
+    windows = working_windows(start_date, end_date, work_start, work_end, tz, weekdays)
+    gaps = free_intervals(busy, windows)
+    horizon_start = windows[0][0] if windows else datetime.now(timezone.utc)
+
+    return schedule_tasks(tasks, gaps, horizon_start)
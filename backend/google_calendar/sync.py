@@ -0,0 +1,170 @@
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import cache as event_cache
+from .fetch import EVENT_FIELDS, GoogleAPIError, iter_pages
+from .models import CalendarSyncState, MirroredEvent
+from .planner import parse_event_time
+
+MIRROR_FIELDS = ['summary', 'description', 'location', 'status', 'html_link', 'creator', 'start', 'end',
+                 'start_time', 'end_time', 'etag', 'updated']
+SYNC_FIELDS = f'nextPageToken,nextSyncToken,items({EVENT_FIELDS},etag,updated)'
+
+
+def _mirror_row(user, calendar_id, event, tz):
+    start_time = parse_event_time(event.get('start'), tz)
+    end_time = parse_event_time(event.get('end'), tz) or start_time
+    if start_time is None:
+        return None
+
+    updated = event.get('updated')
+
+    return MirroredEvent(
+        user=user,
+        calendar_id=calendar_id,
+        event_id=event['id'],
+        summary=event.get('summary'),
+        description=event.get('description'),
+        location=event.get('location'),
+        status=event.get('status'),
+        html_link=event.get('htmlLink'),
+        creator=event.get('creator'),
+        start=event.get('start'),
+        end=event.get('end'),
+        start_time=start_time,
+        end_time=end_time,
+        etag=event.get('etag', ''),
+        updated=datetime.fromisoformat(updated.replace('Z', '+00:00')) if updated else None,
+    )
+
+
+def _apply_page(user, calendar_id, items, tz):
+    cancelled = []
+    rows = {}
+
+    for event in items:
+        if event.get('status') == 'cancelled':
+            cancelled.append(event['id'])
+            rows.pop(event['id'], None)
+            continue
+
+        row = _mirror_row(user, calendar_id, event, tz)
+        if row is not None:
+            rows[row.event_id] = row
+
+    if cancelled:
+        MirroredEvent.objects.filter(user=user, calendar_id=calendar_id, event_id__in=cancelled).delete()
+
+    if rows:
+        MirroredEvent.objects.bulk_create(
+            rows.values(),
+            update_conflicts=True,
+            unique_fields=['user', 'calendar_id', 'event_id'],
+            update_fields=MIRROR_FIELDS,
+        )
+
+
+def _fetch_changes(calendar_id, sync_token, access_token):
+    """
+    Pages of items changed since sync_token, or of the whole calendar
+    without one, and the token to send next time.
+    """
+    params = {
+        'singleEvents': True,
+    }
+    if sync_token:
+        params['syncToken'] = sync_token
+
+    pages = []
+    next_sync_token = ''
+    for page in iter_pages(access_token, calendar_id, params, SYNC_FIELDS):
+        pages.append(page.get('items', []))
+        next_sync_token = page.get('nextSyncToken', next_sync_token)
+
+    return pages, next_sync_token
+
+
+def _is_recent(state, max_age):
+    return bool(state.sync_token) and not state.dirty and state.last_synced_at is not None and \
+        timezone.now() - state.last_synced_at < timedelta(seconds=max_age)
+
+
+def sync_calendar(user, access_token, calendar_id='primary', max_age=None):
+    """
+    Bring the local mirror of a calendar up to date. The first call performs
+    a full sync; later calls send the stored syncToken and only apply the
+    delta. A 410 from Google means the token expired, so the mirror is
+    dropped and rebuilt from a full sync. While a watch channel is open and
+    Google has not notified a change since the last sync, Google is not
+    called at all; the same goes for mirrors synced within max_age seconds.
+
+    Google is paged outside any transaction. The sync state row is locked
+    only to apply the changes, and they are dropped if another sync moved
+    the token on in the meantime.
+    """
+    if event_cache.is_watched(user.id, calendar_id):
+        state = CalendarSyncState.objects.filter(
+            user=user, calendar_id=calendar_id, dirty=False
+        ).exclude(sync_token='').first()
+        if state is not None:
+            return state
+
+    tz = ZoneInfo(settings.TIME_ZONE)
+
+    state, _ = CalendarSyncState.objects.get_or_create(user=user, calendar_id=calendar_id)
+    if max_age is not None and _is_recent(state, max_age):
+        return state
+
+    # Cleared before fetching, so a change notified while Google is paged
+    # flags the mirror again instead of being lost.
+    started_from = state.sync_token
+    CalendarSyncState.objects.filter(pk=state.pk).update(dirty=False)
+    try:
+        full = not started_from
+        try:
+            pages, sync_token = _fetch_changes(calendar_id, started_from, access_token)
+        except GoogleAPIError as e:
+            if e.status_code != 410 or full:
+                raise
+            full = True
+            pages, sync_token = _fetch_changes(calendar_id, '', access_token)
+    except Exception:
+        CalendarSyncState.objects.filter(pk=state.pk).update(dirty=True)
+        raise
+
+    with transaction.atomic():
+        state = CalendarSyncState.objects.select_for_update().get(pk=state.pk)
+        if state.sync_token != started_from:
+            return state
+
+        if full:
+            MirroredEvent.objects.filter(user=user, calendar_id=calendar_id).delete()
+        for items in pages:
+            _apply_page(user, calendar_id, items, tz)
+
+        state.sync_token = sync_token
+        state.last_synced_at = timezone.now()
+        state.save(update_fields=['sync_token', 'last_synced_at'])
+
+    return state
+
+
+def _mirrored_window(user, calendar_id, time_min, time_max):
+    return MirroredEvent.objects.filter(
+        user=user,
+        calendar_id=calendar_id,
+        start_time__lt=time_max,
+        end_time__gt=time_min,
+    ).order_by('start_time', 'event_id')
+
+
+def mirrored_events(user, calendar_id, time_min, time_max):
+    return _mirrored_window(user, calendar_id, time_min, time_max).iterator(chunk_size=500)
+
+
+def mirrored_versions(user, calendar_id, time_min, time_max):
+    return _mirrored_window(user, calendar_id, time_min, time_max).values_list('event_id', 'etag', 'updated')
@@ -0,0 +1,1148 @@
+import json
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from types import SimpleNamespace
+from unittest import mock, skipIf
+from zoneinfo import ZoneInfo
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from core.rate_limit import RateLimited
+
+from . import cache as event_cache, prefetch
+from .batch import BATCH_LIMIT, BatchItem, build_batch_body, execute_batch, parse_batch_response, retry_after
+from .fetch import STREAM_CHUNK_EVENTS, GoogleAPIError, stream_month
+from .freebusy import FREEBUSY_MAX_CALENDARS, free_busy_by_calendar, query_free_busy
+from .group_slots import Attendee, find_group_slots, find_group_slots_python, np
+from .management.commands.bench_group_slots import synthetic_attendees
+from .models import CalendarSyncState, CalendarWatchChannel, MirroredEvent
+from .planner import find_free_slots, free_intervals, merge_intervals, split_into_slots, working_windows
+from .recurrence import UnsupportedRecurrence, expand_series, series_month
+from .scheduler import Task, parse_tasks, schedule_tasks
+from .sync import sync_calendar
+from .views import GROUP_SLOT_RESOLUTIONS, merge_calendars, month_payload, month_window
+
+SOFIA = ZoneInfo('Europe/Sofia')
+OCTOBER = (datetime(2026, 10, 1, tzinfo=SOFIA), datetime(2026, 11, 1, tzinfo=SOFIA))
+MARCH = (datetime(2026, 3, 1, tzinfo=SOFIA), datetime(2026, 4, 1, tzinfo=SOFIA))
+
+
+def series(recurrence, start='2026-10-20T09:00:00+03:00', end='2026-10-20T09:30:00+03:00', event_id='standup'):
+    return {
+        'id': event_id,
+        'summary': 'Standup',
+        'start': {'dateTime': start, 'timeZone': 'Europe/Sofia'},
+        'end': {'dateTime': end, 'timeZone': 'Europe/Sofia'},
+        'recurrence': recurrence,
+    }
+
+
+def exception(original, start, end, status='confirmed', event_id='standup_moved'):
+    return {
+        'id': event_id,
+        'summary': 'Standup',
+        'status': status,
+        'start': {'dateTime': start},
+        'end': {'dateTime': end},
+        'recurringEventId': 'standup',
+        'originalStartTime': {'dateTime': original},
+    }
+
+
+@override_settings(TIME_ZONE='Europe/Sofia', CALENDAR_EXPAND_RECURRENCE=True, CALENDAR_RECURRENCE_PADDING_DAYS=7)
+class SeriesMonthTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def starts(self, items, window=OCTOBER):
+        return series_month(1, 'primary', items, *window)['instances'].get('standup', [])
+
+    def test_keeps_wall_time_across_fall_back(self):
+        starts = self.starts([series(['RRULE:FREQ=DAILY;COUNT=7'])])
+
+        self.assertEqual(len(starts), 7)
+        self.assertIn('2026-10-24T09:00:00+03:00', starts)
+        self.assertIn('2026-10-25T09:00:00+02:00', starts)
+        self.assertEqual(starts[-1], '2026-10-26T09:00:00+02:00')
+
+    def test_ambiguous_wall_time_on_fall_back_takes_first_offset(self):
+        starts = self.starts([series(['RRULE:FREQ=DAILY;COUNT=3'],
+                                     start='2026-10-24T03:30:00+03:00', end='2026-10-24T04:00:00+03:00')])
+
+        self.assertEqual(starts, [
+            '2026-10-24T03:30:00+03:00',
+            '2026-10-25T03:30:00+03:00',
+            '2026-10-26T03:30:00+02:00',
+        ])
+
+    def test_moves_skipped_wall_time_on_spring_forward(self):
+        starts = self.starts([series(['RRULE:FREQ=DAILY;COUNT=3'],
+                                     start='2026-03-28T03:30:00+02:00', end='2026-03-28T04:00:00+02:00')],
+                             window=MARCH)
+
+        self.assertEqual(starts, [
+            '2026-03-28T03:30:00+02:00',
+            '2026-03-29T04:30:00+03:00',
+            '2026-03-30T03:30:00+03:00',
+        ])
+
+    def test_exdate_with_tzid(self):
+        starts = self.starts([series([
+            'RRULE:FREQ=DAILY;COUNT=5',
+            'EXDATE;TZID=Europe/Sofia:20261021T090000',
+            'EXDATE;TZID=UTC:20261023T060000',
+        ])])
+
+        self.assertEqual(starts, [
+            '2026-10-20T09:00:00+03:00',
+            '2026-10-22T09:00:00+03:00',
+            '2026-10-24T09:00:00+03:00',
+        ])
+
+    def test_until_forms(self):
+        for until in ('20261023', '20261023T090000', '20261023T060000Z'):
+            with self.subTest(until=until):
+                cache.clear()
+                starts = self.starts([series([f'RRULE:FREQ=DAILY;UNTIL={until}'])])
+
+                self.assertEqual(starts[-1], '2026-10-23T09:00:00+03:00')
+                self.assertEqual(len(starts), 4)
+
+    def test_moved_exception_replaces_occurrence(self):
+        month = series_month(1, 'primary', [
+            series(['RRULE:FREQ=DAILY;COUNT=3']),
+            exception('2026-10-21T06:00:00Z', '2026-10-21T11:00:00+03:00', '2026-10-21T11:30:00+03:00'),
+        ], *OCTOBER)
+
+        self.assertEqual(month['instances']['standup'], ['2026-10-20T09:00:00+03:00', '2026-10-22T09:00:00+03:00'])
+        self.assertEqual([event['id'] for event in month['events']], ['standup_moved'])
+
+    def test_exception_moved_out_of_window_still_hides_occurrence(self):
+        month = series_month(1, 'primary', [
+            series(['RRULE:FREQ=DAILY;COUNT=3'], start='2026-10-29T09:00:00+02:00', end='2026-10-29T09:30:00+02:00'),
+            exception('2026-10-31T09:00:00+02:00', '2026-11-02T09:00:00+02:00', '2026-11-02T09:30:00+02:00'),
+        ], *OCTOBER)
+
+        self.assertEqual(month['instances']['standup'], ['2026-10-29T09:00:00+02:00', '2026-10-30T09:00:00+02:00'])
+        self.assertEqual(month['events'], [])
+
+    def test_cancelled_exception_drops_occurrence(self):
+        month = series_month(1, 'primary', [
+            series(['RRULE:FREQ=DAILY;COUNT=3']),
+            exception('2026-10-20T09:00:00+03:00', '2026-10-20T09:00:00+03:00', '2026-10-20T09:30:00+03:00',
+                      status='cancelled', event_id='standup_20261020T060000Z'),
+        ], *OCTOBER)
+
+        self.assertEqual(month['instances']['standup'], ['2026-10-21T09:00:00+03:00', '2026-10-22T09:00:00+03:00'])
+        self.assertEqual(month['events'], [])
+
+    def test_series_without_occurrences_is_left_out(self):
+        month = series_month(1, 'primary', [series(['RRULE:FREQ=DAILY;COUNT=1'])], *MARCH)
+
+        self.assertEqual(month, {'events': [], 'series': [], 'instances': {}})
+
+    def test_unsupported_rule(self):
+        with self.assertRaises(UnsupportedRecurrence):
+            series_month(1, 'primary', [series(['RDATE;VALUE=PERIOD:20261021T090000Z/PT1H'])], *OCTOBER)
+
+
+@override_settings(TIME_ZONE='Europe/Sofia', CALENDAR_EXPAND_RECURRENCE=True, CALENDAR_RECURRENCE_PADDING_DAYS=7)
+class ExpandSeriesTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_occurrences_across_fall_back(self):
+        payload = series_month(1, 'primary', [
+            series(['RRULE:FREQ=DAILY;COUNT=2'], start='2026-10-24T03:00:00+03:00', end='2026-10-24T04:00:00+03:00'),
+        ], *OCTOBER)
+        events = expand_series(payload)['events']
+
+        self.assertEqual([event['id'] for event in events],
+                         ['standup_20261024T000000Z', 'standup_20261025T000000Z'])
+        self.assertEqual(events[1]['start'], {'dateTime': '2026-10-25T03:00:00+03:00', 'timeZone': 'Europe/Sofia'})
+        self.assertEqual(events[1]['end'], {'dateTime': '2026-10-25T03:00:00+02:00', 'timeZone': 'Europe/Sofia'})
+        self.assertEqual(events[1]['recurringEventId'], 'standup')
+
+    def test_all_day_series(self):
+        payload = series_month(1, 'primary', [{
+            'id': 'allday',
+            'summary': 'Offsite',
+            'start': {'date': '2026-10-15'},
+            'end': {'date': '2026-10-16'},
+            'recurrence': ['RRULE:FREQ=DAILY;UNTIL=20261016'],
+        }], *OCTOBER)
+        events = expand_series(payload)['events']
+
+        self.assertEqual([event['id'] for event in events], ['allday_20261015', 'allday_20261016'])
+        self.assertEqual(events[1]['end'], {'date': '2026-10-17'})
+
+    def test_interleaves_occurrences_with_one_off_events(self):
+        payload = series_month(1, 'primary', [
+            series(['RRULE:FREQ=DAILY;COUNT=2']),
+            {
+                'id': 'lunch',
+                'start': {'dateTime': '2026-10-20T12:00:00+03:00'},
+                'end': {'dateTime': '2026-10-20T13:00:00+03:00'},
+            },
+        ], *OCTOBER)
+        expanded = expand_series(payload)
+
+        self.assertEqual([event['id'] for event in expanded['events']],
+                         ['standup_20261020T060000Z', 'lunch', 'standup_20261021T060000Z'])
+        self.assertNotIn('series', expanded)
+        self.assertNotIn('instances', expanded)
+
+    def test_payload_without_series_is_unchanged(self):
+        payload = {'events': [], 'etag': 'x'}
+
+        self.assertIs(expand_series(payload), payload)
+
+
+def batch_response(statuses, boundary='batch_response'):
+    parts = [
+        f'--{boundary}\r\nContent-Type: application/http\r\nContent-ID: <response-item-{index}>\r\n\r\n'
+        f'HTTP/1.1 {status} OK\r\nContent-Type: application/json\r\n\r\n{{"id": "event-{index}"}}\r\n'
+        for index, status in enumerate(statuses)
+    ]
+    return SimpleNamespace(
+        status_code=200,
+        headers={'Content-Type': f'multipart/mixed; boundary={boundary}'},
+        content=(''.join(parts) + f'--{boundary}--\r\n').encode(),
+    )
+
+
+class ExecuteBatchTests(SimpleTestCase):
+    def items(self, count):
+        return [BatchItem('POST', '/calendar/v3/calendars/primary/events', {'summary': str(index)})
+                for index in range(count)]
+
+    def test_unsent_chunks_come_back_as_429_without_waiting(self):
+        sent = [batch_response([200] * BATCH_LIMIT), RateLimited(4.2)]
+
+        with mock.patch('google_calendar.batch._send_chunk', side_effect=sent) as send, \
+                mock.patch('time.sleep') as sleep:
+            results = execute_batch('access-token', self.items(BATCH_LIMIT * 2 + 10))
+
+        self.assertEqual(send.call_count, 2)
+        sleep.assert_not_called()
+        self.assertEqual(len(results), BATCH_LIMIT * 2 + 10)
+        self.assertEqual(results[0], (200, {'id': 'event-0'}))
+        self.assertEqual({status for status, _ in results[BATCH_LIMIT:]}, {429})
+        self.assertEqual(retry_after(results), 4.2)
+
+    def test_retry_after_is_none_when_everything_was_sent(self):
+        with mock.patch('google_calendar.batch._send_chunk', return_value=batch_response([200, 404])):
+            results = execute_batch('access-token', self.items(2))
+
+        self.assertEqual([status for status, _ in results], [200, 404])
+        self.assertIsNone(retry_after(results))
+
+
+class CalendarNotificationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='user@example.com', email='user@example.com')
+        CalendarSyncState.objects.create(user=self.user, calendar_id='primary', sync_token='token-1', dirty=False)
+        self.channel = CalendarWatchChannel.objects.create(
+            user=self.user,
+            calendar_id='primary',
+            channel_id='channel-1',
+            resource_id='resource-1',
+            token='secret',
+            expiration=timezone.now() + timedelta(days=7),
+        )
+        self.version = event_cache.calendar_version(self.user.id, 'primary')
+
+    def notify(self, state, channel_id='channel-1', token='secret', resource_id='resource-1'):
+        return self.client.post(
+            '/api/calendar/notifications',
+            HTTP_X_GOOG_CHANNEL_ID=channel_id,
+            HTTP_X_GOOG_CHANNEL_TOKEN=token,
+            HTTP_X_GOOG_RESOURCE_ID=resource_id,
+            HTTP_X_GOOG_RESOURCE_STATE=state,
+        )
+
+    def assertUnchanged(self):
+        self.assertFalse(CalendarSyncState.objects.get(user=self.user).dirty)
+        self.assertEqual(event_cache.calendar_version(self.user.id, 'primary'), self.version)
+
+    def test_change_marks_calendar_dirty_and_bumps_version(self):
+        response = self.notify('exists')
+
+        self.assertEqual(response.status_code, 204)
+        self.assertTrue(CalendarSyncState.objects.get(user=self.user).dirty)
+        self.assertGreater(event_cache.calendar_version(self.user.id, 'primary'), self.version)
+
+    def test_sync_handshake_changes_nothing(self):
+        response = self.notify('sync')
+
+        self.assertEqual(response.status_code, 204)
+        self.assertUnchanged()
+
+    def test_bad_token(self):
+        for token in ('wrong', None):
+            with self.subTest(token=token):
+                response = self.notify('exists', token=token)
+
+                self.assertEqual(response.status_code, 403)
+                self.assertUnchanged()
+
+    def test_resource_mismatch(self):
+        response = self.notify('exists', resource_id='resource-2')
+
+        self.assertEqual(response.status_code, 403)
+        self.assertUnchanged()
+
+    def test_unknown_channel(self):
+        response = self.notify('exists', channel_id='channel-2')
+
+        self.assertEqual(response.status_code, 404)
+        self.assertUnchanged()
+
+    def test_expired_channel(self):
+        self.channel.expiration = timezone.now() - timedelta(minutes=1)
+        self.channel.save(update_fields=['expiration'])
+
+        response = self.notify('exists')
+
+        self.assertEqual(response.status_code, 404)
+        self.assertUnchanged()
+
+
+def google_event(event_id, day, status='confirmed'):
+    return {
+        'id': event_id,
+        'summary': event_id,
+        'status': status,
+        'start': {'dateTime': f'2026-10-{day:02d}T09:00:00+03:00'},
+        'end': {'dateTime': f'2026-10-{day:02d}T10:00:00+03:00'},
+        'etag': f'"{event_id}"',
+        'updated': '2026-10-01T00:00:00Z',
+    }
+
+
+@override_settings(TIME_ZONE='Europe/Sofia')
+class SyncCalendarTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='user@example.com', email='user@example.com')
+        self.google = {}
+        patcher = mock.patch('google_calendar.sync.iter_pages', side_effect=self.iter_pages)
+        self.iter_pages_mock = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def iter_pages(self, access_token, calendar_id, params, fields=None, if_none_match=None):
+        pages = self.google[params.get('syncToken', '')]
+        if isinstance(pages, Exception):
+            raise pages
+        return iter(pages)
+
+    def mirrored(self):
+        return sorted(MirroredEvent.objects.filter(user=self.user).values_list('event_id', flat=True))
+
+    def state(self):
+        return CalendarSyncState.objects.get(user=self.user, calendar_id='primary')
+
+    def test_full_sync_then_delta(self):
+        self.google[''] = [
+            {'items': [google_event('a', 1), google_event('b', 2)], 'nextPageToken': 'page-2'},
+            {'items': [google_event('c', 3)], 'nextSyncToken': 'token-1'},
+        ]
+        sync_calendar(self.user, 'access-token')
+
+        self.assertEqual(self.mirrored(), ['a', 'b', 'c'])
+        self.assertEqual(self.state().sync_token, 'token-1')
+        self.assertFalse(self.state().dirty)
+
+        self.google['token-1'] = [{'items': [google_event('d', 4)], 'nextSyncToken': 'token-2'}]
+        sync_calendar(self.user, 'access-token')
+
+        self.assertEqual(self.mirrored(), ['a', 'b', 'c', 'd'])
+        self.assertEqual(self.state().sync_token, 'token-2')
+
+    def test_cancelled_events_are_deleted(self):
+        self.google[''] = [{'items': [google_event('a', 1), google_event('b', 2)], 'nextSyncToken': 'token-1'}]
+        self.google['token-1'] = [{
+            'items': [google_event('a', 1, status='cancelled'), google_event('never-mirrored', 5, 'cancelled')],
+            'nextSyncToken': 'token-2',
+        }]
+
+        sync_calendar(self.user, 'access-token')
+        sync_calendar(self.user, 'access-token')
+
+        self.assertEqual(self.mirrored(), ['b'])
+
+    def test_expired_sync_token_rebuilds_mirror(self):
+        self.google[''] = [{'items': [google_event('a', 1), google_event('b', 2)], 'nextSyncToken': 'token-1'}]
+        sync_calendar(self.user, 'access-token')
+
+        self.google['token-1'] = GoogleAPIError(410, 'Sync token is no longer valid')
+        self.google[''] = [{'items': [google_event('b', 2), google_event('c', 3)], 'nextSyncToken': 'token-2'}]
+        sync_calendar(self.user, 'access-token')
+
+        self.assertEqual(self.mirrored(), ['b', 'c'])
+        self.assertEqual(self.state().sync_token, 'token-2')
+
+    def test_failed_sync_leaves_mirror_dirty(self):
+        self.google[''] = [{'items': [google_event('a', 1)], 'nextSyncToken': 'token-1'}]
+        sync_calendar(self.user, 'access-token')
+        self.google['token-1'] = GoogleAPIError(500, 'backendError')
+
+        with self.assertRaises(GoogleAPIError):
+            sync_calendar(self.user, 'access-token')
+
+        self.assertTrue(self.state().dirty)
+        self.assertEqual(self.state().sync_token, 'token-1')
+        self.assertEqual(self.mirrored(), ['a'])
+
+    def test_change_notified_while_fetching_keeps_mirror_dirty(self):
+        def pages():
+            CalendarSyncState.objects.filter(user=self.user).update(dirty=True)
+            yield {'items': [google_event('a', 1)], 'nextSyncToken': 'token-1'}
+
+        self.google[''] = pages()
+        sync_calendar(self.user, 'access-token')
+
+        self.assertTrue(self.state().dirty)
+        self.assertEqual(self.mirrored(), ['a'])
+
+    def test_changes_are_dropped_when_another_sync_finished_first(self):
+        def pages():
+            CalendarSyncState.objects.filter(user=self.user).update(sync_token='token-other')
+            yield {'items': [google_event('a', 1)], 'nextSyncToken': 'token-1'}
+
+        self.google[''] = pages()
+        sync_calendar(self.user, 'access-token')
+
+        self.assertEqual(self.state().sync_token, 'token-other')
+        self.assertEqual(self.mirrored(), [])
+
+    def test_recent_mirror_is_not_synced(self):
+        self.google[''] = [{'items': [], 'nextSyncToken': 'token-1'}]
+        sync_calendar(self.user, 'access-token')
+        sync_calendar(self.user, 'access-token', max_age=60)
+
+        self.assertEqual(self.iter_pages_mock.call_count, 1)
+
+
+class StreamMonthTests(SimpleTestCase):
+    period = {'year': 2026, 'month': 10}
+
+    def events(self, count, error=None):
+        for index in range(count):
+            yield {'id': f'event-{index}'}
+        if error is not None:
+            raise error
+
+    def stream(self, events, buffer_limit=10000):
+        stored = []
+        body = b''.join(stream_month(events, self.period, stored.append, buffer_limit))
+        return json.loads(body), stored
+
+    def test_complete_month(self):
+        document, stored = self.stream(self.events(STREAM_CHUNK_EVENTS + 5))
+
+        self.assertEqual(len(document['events']), STREAM_CHUNK_EVENTS + 5)
+        self.assertEqual(document['period'], self.period)
+        self.assertNotIn('complete', document)
+        self.assertEqual(stored, [{'events': document['events'], 'period': self.period}])
+
+    def test_empty_month(self):
+        document, stored = self.stream(self.events(0))
+
+        self.assertEqual(document, {'events': [], 'period': self.period})
+        self.assertEqual(len(stored), 1)
+
+    def test_large_month_is_not_stored(self):
+        document, stored = self.stream(self.events(20), buffer_limit=10)
+
+        self.assertEqual(len(document['events']), 20)
+        self.assertEqual(stored, [])
+
+    def test_failure_mid_stream_closes_document_as_incomplete(self):
+        for error in (GoogleAPIError(500, 'backendError'), RateLimited(3), ConnectionError('reset'),
+                      KeyError('start')):
+            with self.subTest(error=type(error).__name__):
+                document, stored = self.stream(self.events(STREAM_CHUNK_EVENTS + 5, error))
+
+                self.assertEqual(len(document['events']), STREAM_CHUNK_EVENTS + 5)
+                self.assertEqual(document['period'], self.period)
+                self.assertIs(document['complete'], False)
+                self.assertEqual(stored, [])
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+                   GOOGLE_RATE_LIMIT_ENABLED=False, CALENDAR_SYNC_ENABLED=False, CALENDAR_EXPAND_RECURRENCE=False)
+class MonthETagTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='user@example.com', email='user@example.com')
+        self.client.force_login(self.user)
+        self.sent = []
+        for patcher in (
+            mock.patch('google_calendar.views.request_access_token', return_value='access-token'),
+            mock.patch('google_calendar.views.prefetch_around'),
+            mock.patch('core.google_client.get', side_effect=self.google_get),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def google_get(self, url, params=None, headers=None, **kwargs):
+        self.sent.append((headers or {}).get('If-None-Match'))
+        if self.sent[-1] == '"google-etag"':
+            return mock.Mock(status_code=304, headers={})
+        response = mock.Mock(status_code=200, headers={'ETag': '"google-etag"'})
+        response.json.return_value = {
+            'etag': '"google-etag"',
+            'nextSyncToken': 'token-1',
+            'items': [google_event('a', 15)],
+        }
+        return response
+
+    def get(self, if_none_match=None):
+        headers = {'HTTP_IF_NONE_MATCH': if_none_match} if if_none_match else {}
+        response = self.client.get('/api/calendar/', {'year': 2026, 'month': 10}, **headers)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def test_cache_hit_revalidates_against_stored_etag(self):
+        self.assertEqual(self.get()['ETag'], '"google-etag"')
+
+        for if_none_match in ('"google-etag"', 'W/"google-etag"', '"other", "google-etag"', '*'):
+            with self.subTest(if_none_match=if_none_match):
+                response = self.get(if_none_match)
+
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], '"google-etag"')
+                self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(len(self.sent), 1)
+
+    def test_google_revalidates_with_strong_single_etag(self):
+        self.assertEqual(self.get()['ETag'], '"google-etag"')
+
+        for if_none_match in ('"google-etag"', 'W/"google-etag"'):
+            with self.subTest(if_none_match=if_none_match):
+                cache.clear()
+                response = self.get(if_none_match)
+
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], '"google-etag"')
+                self.assertEqual(self.sent[-1], '"google-etag"')
+
+    def test_lists_and_wildcards_are_not_sent_to_google(self):
+        for if_none_match in ('"other", "google-etag"', '*'):
+            with self.subTest(if_none_match=if_none_match):
+                cache.clear()
+                response = self.get(if_none_match)
+
+                self.assertEqual(response.status_code, 200)
+                self.assertIsNone(self.sent[-1])
+
+    @override_settings(CALENDAR_SYNC_ENABLED=True)
+    def test_mirror_revalidates_against_month_etag(self):
+        with mock.patch('google_calendar.sync.iter_pages',
+                        side_effect=lambda *args, **kwargs: iter([self.google_get(None).json()])):
+            etag = self.get()['ETag']
+            cache.clear()
+            response = self.get(f'W/{etag}')
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+
+def utc(day, hour, minute=0):
+    return datetime(2026, 10, day, hour, minute, tzinfo=dt_timezone.utc)
+
+
+class FreeIntervalsTests(SimpleTestCase):
+    windows = [(utc(19, 9), utc(19, 17)), (utc(20, 9), utc(20, 17))]
+
+    def test_no_busy_time(self):
+        self.assertEqual(free_intervals([], self.windows), self.windows)
+
+    def test_busy_inside_window(self):
+        self.assertEqual(free_intervals([(utc(19, 10), utc(19, 11))], self.windows[:1]),
+                         [(utc(19, 9), utc(19, 10)), (utc(19, 11), utc(19, 17))])
+
+    def test_busy_touching_window_edges(self):
+        busy = [(utc(19, 8), utc(19, 9)), (utc(19, 17), utc(19, 18))]
+
+        self.assertEqual(free_intervals(busy, self.windows[:1]), self.windows[:1])
+
+    def test_busy_overlapping_window_edges(self):
+        busy = [(utc(19, 8), utc(19, 10)), (utc(19, 16), utc(19, 18))]
+
+        self.assertEqual(free_intervals(busy, self.windows[:1]), [(utc(19, 10), utc(19, 16))])
+
+    def test_busy_spanning_windows(self):
+        busy = [(utc(19, 12), utc(20, 12))]
+
+        self.assertEqual(free_intervals(busy, self.windows), [(utc(19, 9), utc(19, 12)), (utc(20, 12), utc(20, 17))])
+
+    def test_busy_covering_window(self):
+        self.assertEqual(free_intervals([(utc(19, 0), utc(20, 0))], self.windows), [self.windows[1]])
+
+    def test_back_to_back_busy_leaves_no_gap(self):
+        busy = merge_intervals([(utc(19, 10), utc(19, 11)), (utc(19, 11), utc(19, 12))])
+
+        self.assertEqual(busy, [(utc(19, 10), utc(19, 12))])
+        self.assertEqual(free_intervals(busy, self.windows[:1]),
+                         [(utc(19, 9), utc(19, 10)), (utc(19, 12), utc(19, 17))])
+
+    def test_busy_outside_windows(self):
+        busy = [(utc(18, 9), utc(18, 17)), (utc(21, 9), utc(21, 17))]
+
+        self.assertEqual(free_intervals(busy, self.windows), self.windows)
+
+
+class SplitIntoSlotsTests(SimpleTestCase):
+    def test_gap_of_exactly_one_slot(self):
+        slots = split_into_slots([(utc(19, 9), utc(19, 10))], timedelta(hours=1), SOFIA)
+
+        self.assertEqual(slots, [{'start': utc(19, 9).astimezone(SOFIA), 'end': utc(19, 10).astimezone(SOFIA),
+                                  'gap_minutes': 60}])
+
+    def test_remainder_is_dropped(self):
+        slots = split_into_slots([(utc(19, 9), utc(19, 10, 50))], timedelta(minutes=30), SOFIA)
+
+        self.assertEqual([slot['start'] for slot in slots],
+                         [utc(19, 9), utc(19, 9, 30), utc(19, 10)])
+        self.assertEqual({slot['gap_minutes'] for slot in slots}, {110})
+
+    def test_gap_shorter_than_duration(self):
+        self.assertEqual(split_into_slots([(utc(19, 9), utc(19, 9, 29))], timedelta(minutes=30), SOFIA), [])
+
+    def test_find_free_slots_orders_and_limits(self):
+        busy = [(utc(19, 7), utc(19, 7, 30))]
+        kwargs = dict(work_start=time(9), work_end=time(13), duration=timedelta(hours=1), tz=SOFIA)
+
+        earliest = find_free_slots(busy, date(2026, 10, 19), date(2026, 10, 19), limit=2, **kwargs)
+        roomiest = find_free_slots(busy, date(2026, 10, 19), date(2026, 10, 19), order='roomiest', **kwargs)
+
+        self.assertEqual([slot['start'] for slot in earliest], [utc(19, 6), utc(19, 7, 30)])
+        self.assertEqual([slot['start'] for slot in roomiest], [utc(19, 7, 30), utc(19, 8, 30), utc(19, 6)])
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+                   CALENDAR_CACHE_MAX_MONTHS=3)
+class MonthCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def store(self, *months, calendar_id='primary'):
+        for month in months:
+            event_cache.set_month(1, calendar_id, 2026, month, {'events': [], 'month': month}, f'"{month}"')
+
+    def cached(self, month, calendar_id='primary'):
+        return event_cache.get_month(1, calendar_id, 2026, month) is not None
+
+    def test_least_recently_used_month_is_evicted(self):
+        self.store(1, 2, 3)
+        self.assertTrue(self.cached(1))
+        self.store(4)
+
+        self.assertEqual([month for month in (1, 2, 3, 4) if self.cached(month)], [1, 3, 4])
+
+    def test_limit_is_shared_across_calendars(self):
+        self.store(1, 2)
+        self.store(1, 2, calendar_id='work')
+
+        self.assertEqual([self.cached(1), self.cached(2), self.cached(1, 'work'), self.cached(2, 'work')],
+                         [False, True, True, True])
+
+    def test_entry_keeps_its_etag(self):
+        self.store(1)
+
+        self.assertEqual(event_cache.get_month_entry(1, 'primary', 2026, 1), ({'events': [], 'month': 1}, '"1"'))
+
+    def test_invalidate_months_drops_them_and_bumps_version(self):
+        self.store(1, 2)
+        version = event_cache.calendar_version(1, 'primary')
+
+        event_cache.invalidate_months(1, 'primary', [(2026, 1)])
+
+        self.assertGreater(event_cache.calendar_version(1, 'primary'), version)
+        self.assertFalse(self.cached(1))
+        self.assertEqual(event_cache.get_stale_month(1, 'primary', 2026, 1), {'events': [], 'month': 1})
+
+    def test_month_stored_under_an_old_version_is_not_served(self):
+        version = event_cache.calendar_version(1, 'primary')
+        event_cache.invalidate_months(1, 'primary', [(2026, 1)])
+        event_cache.set_month(1, 'primary', 2026, 1, {'events': []}, version=version)
+
+        self.assertFalse(self.cached(1))
+
+    def test_invalidate_calendar_leaves_other_calendars(self):
+        self.store(1)
+        self.store(1, calendar_id='work')
+
+        event_cache.invalidate_calendar(1, 'primary')
+
+        self.assertFalse(self.cached(1))
+        self.assertTrue(self.cached(1, 'work'))
+
+    def test_lost_version_is_reseeded_from_the_clock(self):
+        version = event_cache.calendar_version(1, 'primary')
+        cache.delete('calendar-version:1:primary')
+
+        self.assertGreater(event_cache.calendar_version(1, 'primary'), version)
+
+
+def batch_part(index, status, body, boundary='batch_response'):
+    return (f'--{boundary}\r\nContent-Type: application/http\r\nContent-ID: <response-item-{index}>\r\n\r\n'
+            f'HTTP/1.1 {status} Reason\r\nContent-Type: application/json\r\n\r\n{body}\r\n')
+
+
+class ParseBatchResponseTests(SimpleTestCase):
+    content_type = 'multipart/mixed; boundary=batch_response'
+
+    def parse(self, *parts):
+        return parse_batch_response(self.content_type, (''.join(parts) + '--batch_response--\r\n').encode())
+
+    def test_parts_out_of_order(self):
+        results = self.parse(batch_part(2, 200, '{"id": "c"}'), batch_part(0, 200, '{"id": "a"}'),
+                             batch_part(1, 404, '{"error": {"code": 404}}'))
+
+        self.assertEqual(results, {0: (200, {'id': 'a'}), 1: (404, {'error': {'code': 404}}), 2: (200, {'id': 'c'})})
+
+    def test_missing_part(self):
+        results = self.parse(batch_part(0, 200, '{"id": "a"}'), batch_part(2, 204, ''))
+
+        self.assertEqual(results, {0: (200, {'id': 'a'}), 2: (204, None)})
+
+    def test_part_without_content_id_is_skipped(self):
+        part = batch_part(0, 200, '{"id": "a"}').replace('Content-ID: <response-item-0>\r\n', '')
+
+        self.assertEqual(self.parse(part, batch_part(1, 200, '{"id": "b"}')), {1: (200, {'id': 'b'})})
+
+    def test_non_json_body_is_kept_as_text(self):
+        self.assertEqual(self.parse(batch_part(0, 503, 'Service Unavailable')), {0: (503, 'Service Unavailable')})
+
+    def test_quoted_boundary(self):
+        body = (batch_part(0, 200, '{"id": "a"}') + '--batch_response--\r\n').encode()
+
+        self.assertEqual(parse_batch_response('multipart/mixed; boundary="batch_response"', body),
+                         {0: (200, {'id': 'a'})})
+
+    def test_missing_boundary(self):
+        self.assertEqual(parse_batch_response('application/json', b'{}'), {})
+
+    def test_missing_parts_become_502_in_execute_batch(self):
+        response = SimpleNamespace(status_code=200, headers={'Content-Type': self.content_type},
+                                   content=(batch_part(1, 200, '{"id": "b"}') + '--batch_response--\r\n').encode())
+        items = [BatchItem('DELETE', f'/calendar/v3/calendars/primary/events/{index}') for index in range(2)]
+
+        with mock.patch('google_calendar.batch._send_chunk', return_value=response):
+            results = execute_batch('access-token', items)
+
+        self.assertEqual(results, [(502, 'Missing batch response part'), (200, {'id': 'b'})])
+
+    def test_request_body_numbers_items(self):
+        body = build_batch_body([BatchItem('POST', '/events', {'summary': 'a'}), BatchItem('DELETE', '/events/b')],
+                                'boundary').decode()
+
+        self.assertIn('Content-ID: <item-0>\r\n\r\nPOST /events HTTP/1.1\r\nContent-Type: application/json', body)
+        self.assertIn('Content-ID: <item-1>\r\n\r\nDELETE /events/b HTTP/1.1', body)
+        self.assertTrue(body.endswith('--boundary--\r\n'))
+
+
+def task(id, minutes, priority=0, deadline=None, earliest_start=None):
+    return Task(id, id, timedelta(minutes=minutes), priority, deadline, earliest_start)
+
+
+class ScheduleTasksTests(SimpleTestCase):
+    gaps = [(utc(19, 9), utc(19, 11)), (utc(19, 13), utc(19, 14))]
+
+    def schedule(self, *tasks, gaps=None):
+        scheduled, unscheduled = schedule_tasks(list(tasks), gaps or self.gaps, utc(19, 9))
+        return [(entry['task'].id, entry['start'], entry['end']) for entry in scheduled], unscheduled
+
+    def test_higher_priority_goes_first(self):
+        scheduled, unscheduled = self.schedule(task('low', 60), task('high', 60, priority=2))
+
+        self.assertEqual(scheduled, [('high', utc(19, 9), utc(19, 10)), ('low', utc(19, 10), utc(19, 11))])
+        self.assertEqual(unscheduled, {})
+
+    def test_earliest_deadline_breaks_priority_ties(self):
+        scheduled, _ = self.schedule(task('later', 30, deadline=utc(20, 0)), task('sooner', 30, deadline=utc(19, 12)),
+                                     task('none', 30))
+
+        self.assertEqual([entry[0] for entry in scheduled], ['sooner', 'later', 'none'])
+
+    def test_input_order_breaks_full_ties(self):
+        scheduled, _ = self.schedule(task('a', 30), task('b', 30), task('c', 30))
+
+        self.assertEqual([entry[0] for entry in scheduled], ['a', 'b', 'c'])
+
+    def test_task_that_does_not_fit_waits_for_a_later_gap(self):
+        scheduled, _ = self.schedule(task('long', 90, priority=1), task('short', 60), gaps=[
+            (utc(19, 9), utc(19, 10)), (utc(19, 13), utc(19, 15)),
+        ])
+
+        self.assertEqual(scheduled, [('short', utc(19, 9), utc(19, 10)), ('long', utc(19, 13), utc(19, 14, 30))])
+
+    def test_missed_deadline_is_dropped(self):
+        scheduled, unscheduled = self.schedule(task('first', 120, priority=1), task('late', 30, deadline=utc(19, 11)))
+
+        self.assertEqual(scheduled, [('first', utc(19, 9), utc(19, 11))])
+        self.assertEqual(unscheduled, {'late': 'deadline'})
+
+    def test_no_free_time(self):
+        scheduled, unscheduled = self.schedule(task('a', 120), task('b', 60), task('c', 60))
+
+        self.assertEqual([entry[0] for entry in scheduled], ['a', 'b'])
+        self.assertEqual(unscheduled, {'c': 'no_free_time'})
+
+    def test_earliest_start_is_respected(self):
+        scheduled, _ = self.schedule(task('later', 30, priority=5, earliest_start=utc(19, 10)), task('now', 30))
+
+        self.assertEqual(scheduled, [('now', utc(19, 9), utc(19, 9, 30)), ('later', utc(19, 10), utc(19, 10, 30))])
+
+    def test_released_task_preempts_lower_priority_backlog(self):
+        scheduled, _ = self.schedule(task('low', 30), task('urgent', 30, priority=5, earliest_start=utc(19, 9, 30)),
+                                     task('filler', 30))
+
+        self.assertEqual([entry[0] for entry in scheduled], ['low', 'urgent', 'filler'])
+
+    def test_earliest_start_after_last_gap(self):
+        _, unscheduled = self.schedule(task('tomorrow', 30, earliest_start=utc(20, 9)))
+
+        self.assertEqual(unscheduled, {'tomorrow': 'no_free_time'})
+
+    def test_parse_tasks(self):
+        tasks = parse_tasks([
+            {'duration': 45, 'priority': '2', 'deadline': '2026-10-19T17:00:00'},
+            {'id': 'x', 'summary': 'Report', 'duration': '30', 'earliestStart': '2026-10-19T08:00:00Z'},
+        ], ZoneInfo('Europe/Sofia'))
+
+        self.assertEqual(tasks[0], task('0', 45, priority=2, deadline=utc(19, 14))._replace(summary='Task 1'))
+        self.assertEqual(tasks[1], task('x', 30, earliest_start=utc(19, 8))._replace(summary='Report'))
+
+    def test_parse_tasks_rejects_non_positive_duration(self):
+        with self.assertRaises(ValueError):
+            parse_tasks([{'duration': 0}], ZoneInfo('UTC'))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+                   FREEBUSY_CACHE_TTL=60)
+class FreeBusyTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.errors = {}
+        patcher = mock.patch('core.google_client.post', side_effect=self.serve_free_busy)
+        self.post = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def serve_free_busy(self, url, json=None, **kwargs):
+        calendars = {}
+        for item in json['items']:
+            if item['id'] in self.errors:
+                calendars[item['id']] = {'errors': [{'domain': 'global', 'reason': self.errors[item['id']]}]}
+            else:
+                calendars[item['id']] = {'busy': [
+                    {'start': '2026-10-19T10:00:00Z', 'end': '2026-10-19T11:00:00Z'},
+                    {'start': '2026-10-19T10:30:00Z', 'end': '2026-10-19T12:00:00Z'},
+                ]}
+        return SimpleNamespace(status_code=200, json=lambda: {'calendars': calendars}, text='')
+
+    def query(self, calendar_ids):
+        return free_busy_by_calendar(1, 'access-token', calendar_ids, utc(19, 0), utc(20, 0))
+
+    def test_calendars_are_queried_in_chunks(self):
+        calendar_ids = [f'calendar-{index}' for index in range(FREEBUSY_MAX_CALENDARS * 2 + 1)]
+
+        busy = self.query(calendar_ids)
+
+        chunks = [[item['id'] for item in call.kwargs['json']['items']] for call in self.post.call_args_list]
+        self.assertEqual([len(chunk) for chunk in chunks], [FREEBUSY_MAX_CALENDARS, FREEBUSY_MAX_CALENDARS, 1])
+        self.assertEqual(sum(chunks, []), calendar_ids)
+        self.assertEqual(list(busy), calendar_ids)
+        self.assertEqual(busy['calendar-100'], [(utc(19, 10), utc(19, 12))])
+
+    def test_unreadable_calendar_is_none(self):
+        self.errors['private@example.com'] = 'notFound'
+
+        busy = self.query(['primary', 'private@example.com'])
+
+        self.assertEqual(busy, {'primary': [(utc(19, 10), utc(19, 12))], 'private@example.com': None})
+
+    def test_merged_query_rejects_unreadable_calendar(self):
+        self.errors['private@example.com'] = 'notFound'
+
+        with self.assertRaises(GoogleAPIError):
+            query_free_busy(1, 'access-token', ['primary', 'private@example.com'], utc(19, 0), utc(20, 0))
+
+    def test_result_is_cached_until_invalidated(self):
+        self.query(['primary'])
+        self.query(['primary'])
+        self.assertEqual(self.post.call_count, 1)
+
+        event_cache.invalidate_free_busy(1)
+        self.query(['primary'])
+        self.assertEqual(self.post.call_count, 2)
+
+    def test_evicted_version_does_not_revive_old_entries(self):
+        self.query(['primary'])
+        event_cache.invalidate_free_busy(1)
+        self.query(['primary'])
+        cache.delete('freebusy-version:1')
+
+        self.query(['primary'])
+        self.assertEqual(self.post.call_count, 3)
+
+    def test_key_length_does_not_grow_with_calendars(self):
+        calendar_ids = [f'calendar-{index}@group.calendar.google.com' for index in range(100)]
+
+        key = event_cache._free_busy_key(1, calendar_ids, utc(19, 0).isoformat(), utc(20, 0).isoformat())
+
+        self.assertLess(len(key), 250)
+
+    def test_google_error(self):
+        self.post.side_effect = lambda url, **kwargs: SimpleNamespace(status_code=403, text='forbidden')
+
+        with self.assertRaises(GoogleAPIError):
+            self.query(['primary'])
+
+
+def timed(id, start):
+    return {'id': id, 'start': {'dateTime': start}}
+
+
+@override_settings(TIME_ZONE='Europe/Sofia')
+class MergeCalendarsTests(SimpleTestCase):
+    def merge(self, **streams):
+        return [(event['calendarId'], event['id']) for event in merge_calendars(streams.items())]
+
+    def test_interleaves_sorted_streams(self):
+        merged = self.merge(
+            primary=[timed('a', '2026-10-19T09:00:00+03:00'), timed('c', '2026-10-19T11:00:00+03:00')],
+            work=[timed('b', '2026-10-19T10:00:00+03:00'), timed('d', '2026-10-19T12:00:00+03:00')],
+        )
+
+        self.assertEqual(merged, [('primary', 'a'), ('work', 'b'), ('primary', 'c'), ('work', 'd')])
+
+    def test_compares_instants_across_offsets(self):
+        merged = self.merge(
+            primary=[timed('sofia', '2026-10-19T09:00:00+03:00')],
+            work=[timed('utc', '2026-10-19T05:30:00Z')],
+        )
+
+        self.assertEqual(merged, [('work', 'utc'), ('primary', 'sofia')])
+
+    def test_all_day_events_start_at_local_midnight(self):
+        merged = self.merge(
+            primary=[timed('late', '2026-10-19T20:30:00Z'), timed('next', '2026-10-19T21:30:00Z')],
+            holidays=[{'id': 'holiday', 'start': {'date': '2026-10-20'}}],
+        )
+
+        self.assertEqual(merged, [('primary', 'late'), ('holidays', 'holiday'), ('primary', 'next')])
+
+    def test_ties_keep_calendar_order(self):
+        merged = self.merge(
+            primary=[timed('a', '2026-10-19T09:00:00+03:00')],
+            work=[timed('b', '2026-10-19T09:00:00+03:00')],
+            team=[timed('c', '2026-10-19T06:00:00Z')],
+        )
+
+        self.assertEqual(merged, [('primary', 'a'), ('work', 'b'), ('team', 'c')])
+
+    def test_events_without_start_go_last(self):
+        merged = self.merge(
+            primary=[timed('a', '2026-10-19T09:00:00+03:00'), {'id': 'broken'}],
+            work=[timed('b', '2026-10-19T10:00:00+03:00')],
+        )
+
+        self.assertEqual(merged, [('primary', 'a'), ('work', 'b'), ('primary', 'broken')])
+
+    def test_empty_streams(self):
+        self.assertEqual(self.merge(primary=[], work=[timed('a', '2026-10-19T09:00:00+03:00')]), [('work', 'a')])
+
+    def test_events_are_not_mutated(self):
+        event = timed('a', '2026-10-19T09:00:00+03:00')
+        merge_calendars([('primary', [event])])
+
+        self.assertNotIn('calendarId', event)
+
+
+class RecordingBackend:
+    def __init__(self, accept=True):
+        self.accept = accept
+        self.jobs = []
+
+    def submit(self, job):
+        if self.accept:
+            self.jobs.append((job['year'], job['month']))
+        return self.accept
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+                   CALENDAR_PREFETCH_BACKEND='google_calendar.tests.RecordingBackend',
+                   CALENDAR_PREFETCH_RADIUS=2, CALENDAR_PREFETCH_DEDUP_TTL=60)
+class PrefetchAroundTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.backend = RecordingBackend()
+        patcher = mock.patch.object(prefetch, '_backend', self.backend)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_nearest_months_first_across_years(self):
+        prefetch.prefetch_around(1, 'primary', 2026, 12)
+
+        self.assertEqual(self.backend.jobs, [(2027, 1), (2026, 11), (2027, 2), (2026, 10)])
+
+    def test_include_current(self):
+        prefetch.prefetch_around(1, 'primary', 2026, 1, include_current=True)
+
+        self.assertEqual(self.backend.jobs, [(2026, 1), (2026, 2), (2025, 12), (2026, 3), (2025, 11)])
+
+    def test_repeated_requests_are_deduplicated(self):
+        prefetch.prefetch_around(1, 'primary', 2026, 10)
+        prefetch.prefetch_around(1, 'primary', 2026, 11)
+
+        self.assertEqual(self.backend.jobs, [(2026, 11), (2026, 9), (2026, 12), (2026, 8), (2026, 10), (2027, 1)])
+
+    def test_dedup_is_per_user_and_calendar(self):
+        prefetch.prefetch_around(1, 'primary', 2026, 10)
+        prefetch.prefetch_around(1, 'work', 2026, 10)
+        prefetch.prefetch_around(2, 'primary', 2026, 10)
+
+        self.assertEqual(len(self.backend.jobs), 12)
+
+    def test_dedup_expires(self):
+        prefetch.prefetch_around(1, 'primary', 2026, 10)
+        cache.delete('calendar-prefetch:1:primary:2026:11')
+        prefetch.prefetch_around(1, 'primary', 2026, 10)
+
+        self.assertEqual(self.backend.jobs[4:], [(2026, 11)])
+
+    def test_dropped_job_can_be_queued_again(self):
+        self.backend.accept = False
+        prefetch.prefetch_around(1, 'primary', 2026, 10)
+        self.backend.accept = True
+        prefetch.prefetch_around(1, 'primary', 2026, 10)
+
+        self.assertEqual(self.backend.jobs, [(2026, 11), (2026, 9), (2026, 12), (2026, 8)])
+
+    @override_settings(CALENDAR_PREFETCH_BACKEND='')
+    def test_disabled(self):
+        prefetch.prefetch_around(1, 'primary', 2026, 10)
+
+        self.assertEqual(self.backend.jobs, [])
+        self.assertIsNone(cache.get('calendar-prefetch:1:primary:2026:11'))
+
+
+@skipIf(np is None, 'NumPy is not installed')
+class GroupSlotsTests(SimpleTestCase):
+    def search(self, attendees, duration, resolution, finder=find_group_slots, limit=10):
+        time_min = datetime(2026, 10, 18, 21, tzinfo=dt_timezone.utc)
+        windows = working_windows(date(2026, 10, 19), date(2026, 10, 25), time(0), time(23, 59), SOFIA)
+        return finder(attendees, windows, time_min, time_min + timedelta(days=7), timedelta(minutes=duration),
+                      timedelta(minutes=resolution), SOFIA, limit)
+
+    def test_matches_interval_merge_at_every_resolution(self):
+        attendees = synthetic_attendees(8, date(2026, 10, 19), 7, 4, seed=7)
+
+        for resolution in GROUP_SLOT_RESOLUTIONS:
+            for duration in (resolution, 2 * resolution, 60 if resolution < 60 else 120):
+                with self.subTest(resolution=resolution, duration=duration):
+                    bitmap = self.search(attendees, duration, resolution, limit=25)
+
+                    self.assertEqual(bitmap, self.search(attendees, duration, resolution, find_group_slots_python, 25))
+                    self.assertTrue(bitmap)
+
+    def test_ranks_by_attendees_in_hours_then_start(self):
+        attendees = [
+            Attendee('a', [(utc(19, 7), utc(19, 8, 7))], [(utc(19, 6), utc(19, 14))]),
+            Attendee('b', [], [(utc(19, 9), utc(19, 17))]),
+        ]
+
+        slots = self.search(attendees, 60, 15, limit=3)
+
+        self.assertEqual([(slot['start'], slot['in_hours']) for slot in slots], [
+            (utc(19, 9), 2), (utc(19, 10), 2), (utc(19, 11), 2),
+        ])
+        self.assertEqual(slots[0]['start'].tzinfo, SOFIA)
+
+    def test_busy_interval_blocks_every_cell_it_touches(self):
+        attendees = [Attendee('a', [(utc(19, 9, 1), utc(19, 9, 59))], [(utc(19, 9), utc(19, 11))])]
+
+        slots = self.search(attendees, 60, 60, limit=1)
+
+        self.assertEqual(slots[0]['start'], utc(19, 10))
+
+    def test_duration_longer_than_range(self):
+        self.assertEqual(self.search([Attendee('a', [], [])], 8 * 24 * 60, 60), [])
+
+    def test_falls_back_without_numpy(self):
+        attendees = synthetic_attendees(3, date(2026, 10, 19), 7, 4, seed=1)
+
+        with mock.patch('google_calendar.group_slots.np', None):
+            fallback = self.search(attendees, 30, 15)
+
+        self.assertEqual(fallback, self.search(attendees, 30, 15))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+                   GOOGLE_RATE_LIMIT_ENABLED=False, CALENDAR_SYNC_ENABLED=False, CALENDAR_EXPAND_RECURRENCE=False,
+                   CALENDAR_MAX_CALENDARS=3)
+class AllCalendarsTests(TestCase):
+    calendar_list = [
+        {'id': 'team@group.calendar.google.com'},
+        {'id': 'holidays@group.v.calendar.google.com'},
+        {'id': 'user@example.com', 'primary': True},
+        {'id': 'birthdays@group.v.calendar.google.com'},
+        {'id': 'shared@example.com'},
+    ]
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='user@example.com', email='user@example.com')
+        self.client.force_login(self.user)
+        for patcher in (
+            mock.patch('google_calendar.views.request_access_token', return_value='access-token'),
+            mock.patch('google_calendar.views.prefetch_around'),
+            mock.patch('google_calendar.views.prefetch_beyond'),
+            mock.patch('google_calendar.views.list_calendars', return_value=self.calendar_list),
+            mock.patch('google_calendar.views.fetch_month', side_effect=self.fetch_month),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def fetch_month(user_id, access_token, calendar_id, year, month):
+        _, _, time_min, time_max = month_window(year, month)
+        return month_payload(year, month, [timed(calendar_id, '2026-10-19T09:00:00Z')], time_min, time_max)
+
+    def test_month_is_cut_to_the_first_calendars_primary_first(self):
+        response = self.client.get('/api/calendar/', {'year': 2026, 'month': 10, 'calendars': 'all'})
+
+        self.assertEqual(response.status_code, 200)
+        calendars = ['user@example.com', 'team@group.calendar.google.com', 'holidays@group.v.calendar.google.com']
+        self.assertEqual(response.json()['calendars'], calendars)
+        self.assertIs(response.json()['calendarsTruncated'], True)
+        self.assertEqual([event['calendarId'] for event in response.json()['events']], calendars)
+
+    def test_range_is_cut_too(self):
+        response = self.client.get('/api/calendar/range/', {'start': '2026-10', 'end': '2026-11', 'calendars': 'all'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['calendars']), 3)
+        self.assertIs(response.json()['calendarsTruncated'], True)
+
+    @override_settings(CALENDAR_MAX_CALENDARS=5)
+    def test_not_truncated_when_all_fit(self):
+        response = self.client.get('/api/calendar/', {'year': 2026, 'month': 10, 'calendars': 'all'})
+
+        self.assertEqual(len(response.json()['calendars']), 5)
+        self.assertIs(response.json()['calendarsTruncated'], False)
+
+    def test_explicit_list_over_the_limit_is_rejected(self):
+        calendars = ','.join(entry['id'] for entry in self.calendar_list)
+
+        response = self.client.get('/api/calendar/', {'year': 2026, 'month': 10, 'calendars': calendars})
+
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,23 @@
+from django.urls import path
+from .async_views import AsyncCalendarEventListView, AsyncCalendarAddEventView, AsyncDeleteCalendarEvent
+from .views import (
+    CalendarEventListView, CalendarEventRangeView, CalendarAddAutoEventView, DeleteCalendarEvent, FreeSlotsView,
+    BatchAddEventsView, BatchDeleteEventsView, AutoPlanView, GroupSlotsView, WatchCalendarView, CalendarNotificationView
+)
+
+urlpatterns = [
+    path('', CalendarEventListView.as_view(), name='calendar_events'),
+    path('range/', CalendarEventRangeView.as_view(), name='calendar_events_range'),
+    path('add-event', CalendarAddAutoEventView.as_view(), name='add_event'),
+    path('delete-event/<str:event_id>', DeleteCalendarEvent.as_view(), name='delete_event'),
+    path('batch/add-events', BatchAddEventsView.as_view(), name='batch_add_events'),
+    path('batch/delete-events', BatchDeleteEventsView.as_view(), name='batch_delete_events'),
+    path('auto-plan/', AutoPlanView.as_view(), name='auto_plan'),
+    path('free-slots/', FreeSlotsView.as_view(), name='free_slots'),
+    path('group-slots/', GroupSlotsView.as_view(), name='group_slots'),
+    path('watch', WatchCalendarView.as_view(), name='watch_calendar'),
+    path('notifications', CalendarNotificationView.as_view(), name='calendar_notifications'),
+    path('async/', AsyncCalendarEventListView.as_view(), name='calendar_events_async'),
+    path('async/add-event', AsyncCalendarAddEventView.as_view(), name='add_event_async'),
+    path('async/delete-event/<str:event_id>', AsyncDeleteCalendarEvent.as_view(), name='delete_event_async'),
+]
@@ -1,85 +1,564 @@
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.views import APIView
 from rest_framework.response import Response
-import requests
-from datetime import datetime, date
+from datetime import datetime, date, time, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 import calendar
+import contextvars
+import heapq
+import math
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 
+from django.conf import settings
+from django.db import connection
+from django.http import StreamingHttpResponse
+from django.utils import timezone as django_timezone
+from django.utils.decorators import method_decorator
+from django.utils.http import parse_etags
 
+from core import google_client
+from core.compression import compress_page
+from core.rate_limit import RateLimited
+from google_auth.token_manager import request_access_token
+
+from . import cache as event_cache
+from . import recurrence
+from .batch import BatchItem, events_path, execute_batch, retry_after
+from .fetch import (
+    GoogleAPIError, NotModified, events_url, format_event, iter_pages, list_calendars, month_etag, page_etag,
+    stream_month
+)
+from .freebusy import free_busy_by_calendar, query_free_busy
+from .group_slots import Attendee, attendee_hours, find_group_slots
+from .models import CalendarWatchChannel
+from .planner import find_free_slots, parse_event_time, working_windows
+from .prefetch import prefetch_around, prefetch_beyond
+from .scheduler import parse_tasks, plan
+from .sync import mirrored_events, mirrored_versions, sync_calendar
+from .watch import ChannelMismatch, UnknownChannel, handle_notification, mark_changed, stop_channel, watch_calendar
+
+
+def requested_month(query_params):
+    year = query_params.get('year')
+    month = query_params.get('month')
+
+    if year and month:
+        return int(year), int(month)
+
+    today = datetime.today()
+    return today.year, today.month
+
+
+def month_window(year, month):
+    first_day = date(year, month, 1)
+    last_day_of_month = calendar.monthrange(year, month)[1]
+    last_day = date(year, month, last_day_of_month)
+
+    time_min = datetime.combine(
+        first_day, datetime.min.time()).isoformat() + 'Z'
+    time_max = datetime.combine(
+        last_day, datetime.max.time()).isoformat() + 'Z'
+
+    return first_day, last_day, time_min, time_max
+
+
+def month_payload(year, month, events, time_min, time_max):
+    return {
+        'events': events,
+        'period': {
+            'year': year,
+            'month': month,
+            'start': time_min,
+            'end': time_max
+        }
+    }
+
+
+def series_payload(user_id, calendar_id, items, year, month):
+    """
+    Month payload with recurring events as series plus the start of each of
+    their occurrences, from items fetched with recurrence.series_params, or
+    None when a series has to be expanded by Google instead.
+    """
+    first_day, last_day, time_min, time_max = month_window(year, month)
+    window_start = datetime.combine(first_day, time.min, tzinfo=timezone.utc)
+    window_end = datetime.combine(last_day, time.max, tzinfo=timezone.utc)
+    try:
+        month_series = recurrence.series_month(user_id, calendar_id, items, window_start, window_end)
+    except recurrence.UnsupportedRecurrence as e:
+        print(f"Error expanding recurring events of {calendar_id}: {str(e)}")
+        return None
+
+    payload = month_payload(year, month, month_series['events'], time_min, time_max)
+    payload.update(series=month_series['series'], instances=month_series['instances'])
+    return payload
+
+
+def load_series_month(user_id, access_token, calendar_id, year, month, if_none_match=None):
+    """
+    (payload, etag) of a month fetched with one item per recurring event
+    instead of one per instance, or None when it has to be fetched with
+    singleEvents after all.
+    """
+    first_day, last_day, time_min, time_max = month_window(year, month)
+    params = recurrence.series_params(datetime.combine(first_day, time.min, tzinfo=timezone.utc),
+                                      datetime.combine(last_day, time.max, tzinfo=timezone.utc))
+    items = []
+    etag = None
+    pages = iter_pages(access_token, calendar_id, params, recurrence.SERIES_FIELDS, if_none_match)
+    for index, page in enumerate(pages):
+        etag = page_etag(page) if index == 0 else None
+        items += page.get('items', [])
+
+    payload = series_payload(user_id, calendar_id, items, year, month)
+    return None if payload is None else (payload, etag)
+
+
+def month_response(payload, query_params):
+    """
+    A stored month as sent to the client: recurring events stay compact as
+    series and instances when it asks for recurrence=series and are written
+    out as single events otherwise.
+    """
+    if query_params.get('recurrence') == 'series':
+        return payload
+    return recurrence.expand_series(payload)
+
+
+def fetch_month(user_id, access_token, calendar_id, year, month):
+    """
+    Buffered month payload for callers that combine several months, served
+    from the month cache when possible and from Google otherwise.
+    """
+    version = event_cache.calendar_version(user_id, calendar_id)
+    cached = event_cache.get_month(user_id, calendar_id, year, month, version)
+    if cached is not None:
+        return cached
+
+    loaded = None
+    if recurrence.enabled():
+        loaded = load_series_month(user_id, access_token, calendar_id, year, month)
+
+    if loaded is not None:
+        payload, etag = loaded
+    else:
+        first_day, last_day, time_min, time_max = month_window(year, month)
+        params = {
+            'timeMin': time_min,
+            'timeMax': time_max,
+            'singleEvents': True,
+            'orderBy': 'startTime'
+        }
+        events = []
+        etag = None
+        for index, page in enumerate(iter_pages(access_token, calendar_id, params)):
+            etag = page_etag(page) if index == 0 else None
+            events += [format_event(event) for event in page.get('items', [])]
+        payload = month_payload(year, month, events, time_min, time_max)
+
+    event_cache.set_month(user_id, calendar_id, year, month, payload, etag, version)
+    return payload
+
+
+def mirrored_month(user, calendar_id, year, month):
+    version = event_cache.calendar_version(user.id, calendar_id)
+    cached = event_cache.get_month(user.id, calendar_id, year, month, version)
+    if cached is not None:
+        return cached
+
+    first_day, last_day, time_min, time_max = month_window(year, month)
+    window_start = datetime.combine(first_day, time.min, tzinfo=timezone.utc)
+    window_end = datetime.combine(last_day, time.max, tzinfo=timezone.utc)
+    rows = list(mirrored_events(user, calendar_id, window_start, window_end))
+    events = [event.as_event() for event in rows]
+
+    payload = month_payload(year, month, events, time_min, time_max)
+    event_cache.set_month(user.id, calendar_id, year, month, payload,
+                          month_etag((row.event_id, row.etag, row.updated) for row in rows), version)
+    return payload
+
+
+def parse_month(value):
+    year, month = value.split('-')
+    year, month = int(year), int(month)
+    if not 1 <= month <= 12:
+        raise ValueError(value)
+    return year, month
+
+
+def requested_months(query_params):
+    if query_params.get('months'):
+        months = [parse_month(value) for value in query_params['months'].split(',') if value]
+        return sorted(set(months))
+
+    start = parse_month(query_params['start'])
+    end = parse_month(query_params.get('end', query_params['start']))
+
+    months = []
+    year, month = start
+    while (year, month) <= end and len(months) <= settings.CALENDAR_RANGE_MAX_MONTHS:
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def event_start(event, tz=None):
+    tz = tz or ZoneInfo(settings.TIME_ZONE)
+    return parse_event_time(event.get('start'), tz) or datetime.max.replace(tzinfo=timezone.utc)
+
+
+def merge_months(payloads):
+    tz = ZoneInfo(settings.TIME_ZONE)
+    events = {}
+    months = {}
+
+    for payload in map(recurrence.expand_series, payloads):
+        period = payload['period']
+        months[f"{period['year']}-{period['month']}"] = [event['id'] for event in payload['events']]
+        for event in payload['events']:
+            events.setdefault((event.get('calendarId'), event['id']), event)
+
+    return sorted(events.values(), key=lambda event: event_start(event, tz)), months
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return etag.removeprefix('W/') in [tag.removeprefix('W/') for tag in parse_etags(if_none_match)]
+
+
+def with_etag(response, etag):
+    """
+    Ask the browser to revalidate every time so re-fetching an unchanged
+    month costs a 304 instead of the full payload.
+    """
+    if etag:
+        response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def requested_calendars(user_id, access_token, value):
+    """
+    (calendar IDs, truncated) from a comma separated string or list, or for
+    'all' the user's calendarList, primary first, cut to the first
+    CALENDAR_MAX_CALENDARS with truncated set. (None, False) when nothing
+    was requested.
+    """
+    if not value:
+        return None, False
+
+    if value == 'all':
+        calendars = event_cache.get_calendar_list(user_id)
+        if calendars is None:
+            calendars = list_calendars(access_token)
+            event_cache.set_calendar_list(user_id, calendars)
+        calendar_ids = [entry['id'] for entry in sorted(calendars, key=lambda entry: not entry.get('primary'))]
+        return calendar_ids[:settings.CALENDAR_MAX_CALENDARS], len(calendar_ids) > settings.CALENDAR_MAX_CALENDARS
+
+    if isinstance(value, str):
+        value = value.split(',')
+    return list(dict.fromkeys(calendar_id.strip() for calendar_id in value if calendar_id.strip())), False
+
+
+def rate_limited(error):
+    response = Response({'error': 'Google Calendar rate limit reached, please try again shortly'}, status=429)
+    response['Retry-After'] = str(math.ceil(error.retry_after))
+    return response
+
+
+def batch_response(data, results):
+    """
+    Response for a batch write, with Retry-After set when some items were
+    held back for the Google budget.
+    """
+    response = Response(data)
+    delay = retry_after(results)
+    if delay is not None:
+        response['Retry-After'] = str(math.ceil(delay))
+    return response
+
+
+def in_request_context(function):
+    """
+    Run function in pool threads with a copy of the request's context so
+    Google calls stay charged to the requesting user.
+    """
+    context = contextvars.copy_context()
+    return lambda *args: context.copy().run(function, *args)
+
+
+def sync_or_stale(user, access_token, calendar_id):
+    """
+    Sync the mirror and return True, or return False when the Google budget
+    is exhausted and the mirror has to be served as it is.
+    """
+    try:
+        sync_calendar(user, access_token, calendar_id)
+        return True
+    except RateLimited as e:
+        print(f"Serving stale mirror for {calendar_id}: {str(e)}")
+        return False
+
+
+def _sync_in_thread(user, access_token, calendar_id):
+    try:
+        return sync_or_stale(user, access_token, calendar_id)
+    finally:
+        connection.close()
+
+
+def load_calendar_months(user, access_token, calendar_ids, months):
+    """
+    Return {calendar_id: [payload per month]} for every calendar and month,
+    fetching them concurrently so extra calendars do not add up serially.
+    With the mirror enabled each calendar is synced once and its months are
+    then read locally.
+    """
+    workers = min(len(calendar_ids) * len(months), settings.CALENDAR_RANGE_WORKERS)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        if settings.CALENDAR_SYNC_ENABLED:
+            list(pool.map(
+                in_request_context(lambda calendar_id: _sync_in_thread(user, access_token, calendar_id)),
+                calendar_ids
+            ))
+            return {
+                calendar_id: [mirrored_month(user, calendar_id, year, month) for year, month in months]
+                for calendar_id in calendar_ids
+            }
+
+        pairs = [(calendar_id, year, month) for calendar_id in calendar_ids for year, month in months]
+        payloads = pool.map(in_request_context(lambda pair: fetch_month(user.id, access_token, *pair)), pairs)
+
+        loaded = {calendar_id: [] for calendar_id in calendar_ids}
+        for (calendar_id, _, _), payload in zip(pairs, payloads):
+            loaded[calendar_id].append(payload)
+        return loaded
+
+
+def _tagged(calendar_id, events):
+    for event in events:
+        yield {**event, 'calendarId': calendar_id}
+
+
+def merge_calendars(streams):
+    """
+    k-way merge of (calendar_id, events) streams that are each already
+    sorted by start time, tagging every event with its calendar.
+    """
+    tz = ZoneInfo(settings.TIME_ZONE)
+    return list(heapq.merge(
+        *(_tagged(calendar_id, events) for calendar_id, events in streams),
+        key=lambda event: event_start(event, tz)
+    ))
+
+
+def merged_month_payloads(loaded, calendar_ids, months):
+    payloads = []
+    for index, (year, month) in enumerate(months):
+        first_day, last_day, time_min, time_max = month_window(year, month)
+        events = merge_calendars(
+            (calendar_id, recurrence.expand_series(loaded[calendar_id][index])['events'])
+            for calendar_id in calendar_ids
+        )
+        payloads.append(month_payload(year, month, events, time_min, time_max))
+    return payloads
+
+
+def too_many_calendars(calendar_ids):
+    if calendar_ids is not None and not 0 < len(calendar_ids) <= settings.CALENDAR_MAX_CALENDARS:
+        return Response({'error': f'Request between 1 and {settings.CALENDAR_MAX_CALENDARS} calendars'},
+                        status=400)
+    return None
+
+
+@method_decorator(compress_page, name='dispatch')
 class CalendarEventListView(APIView):
     def get(self, request):
         if not request.user.is_authenticated:
             return Response({'error': 'Authentication required'}, status=401)
 
         try:
-            access_token = request.COOKIES.get('access_token')
+            access_token = request_access_token(request)
             calendar_id = 'primary'
 
-            year = request.query_params.get('year')
-            month = request.query_params.get('month')
+            year, month = requested_month(request.query_params)
+
+            calendar_ids, truncated = requested_calendars(
+                request.user.id, access_token, request.query_params.get('calendars'))
+            if calendar_ids is not None:
+                error = too_many_calendars(calendar_ids)
+                if error:
+                    return error
 
-            if year and month:
-                year = int(year)
-                month = int(month)
+                loaded = load_calendar_months(request.user, access_token, calendar_ids, [(year, month)])
+                payload = merged_month_payloads(loaded, calendar_ids, [(year, month)])[0]
+                return Response({**payload, 'calendars': calendar_ids, 'calendarsTruncated': truncated})
+
+            prefetch_around(request.user.id, calendar_id, year, month)
+            if_none_match = request.headers.get('If-None-Match')
+
+            version = event_cache.calendar_version(request.user.id, calendar_id)
+            cached = event_cache.get_month_entry(request.user.id, calendar_id, year, month, version)
+            if cached is not None:
+                payload, etag = cached
+                if etag_matches(if_none_match, etag):
+                    response = Response(status=304)
+                else:
+                    response = Response(month_response(payload, request.query_params))
+                response['X-Cache'] = 'HIT'
+                return with_etag(response, etag)
+
+            if not settings.CALENDAR_SYNC_ENABLED and recurrence.enabled():
+                try:
+                    loaded = load_series_month(request.user.id, access_token, calendar_id, year, month,
+                                               if_none_match)
+                except NotModified as e:
+                    return with_etag(Response(status=304), e.etag)
+                if loaded is not None:
+                    payload, etag = loaded
+                    event_cache.set_month(request.user.id, calendar_id, year, month, payload, etag, version)
+                    response = Response(month_response(payload, request.query_params))
+                    response['X-Cache'] = 'MISS'
+                    return with_etag(response, etag)
+
+            first_day, last_day, time_min, time_max = month_window(year, month)
+
+            stale = False
+            if settings.CALENDAR_SYNC_ENABLED:
+                stale = not sync_or_stale(request.user, access_token, calendar_id)
+
+                window_start = datetime.combine(first_day, time.min, tzinfo=timezone.utc)
+                window_end = datetime.combine(last_day, time.max, tzinfo=timezone.utc)
+                etag = month_etag(mirrored_versions(request.user, calendar_id, window_start, window_end))
+                if etag_matches(if_none_match, etag):
+                    return with_etag(Response(status=304), etag)
+
+                events = (
+                    event.as_event()
+                    for event in mirrored_events(request.user, calendar_id, window_start, window_end)
+                )
             else:
-                today = datetime.today()
-                year = today.year
-                month = today.month
-
-            first_day = date(year, month, 1)
-            last_day_of_month = calendar.monthrange(year, month)[1]
-            last_day = date(year, month, last_day_of_month)
-
-            time_min = datetime.combine(
-                first_day, datetime.min.time()).isoformat() + 'Z'
-            time_max = datetime.combine(
-                last_day, datetime.max.time()).isoformat() + 'Z'
-
-            url = f'https://www.googleapis.com/calendar/v3/calendars/{calendar_id}/events'
-            params = {
-                'timeMin': time_min,
-                'timeMax': time_max,
-                'singleEvents': True,
-                'orderBy': 'startTime'
-            }
-            headers = {
-                'Authorization': f'Bearer {access_token}'
+                params = {
+                    'timeMin': time_min,
+                    'timeMax': time_max,
+                    'singleEvents': True,
+                    'orderBy': 'startTime'
+                }
+                pages = iter_pages(access_token, calendar_id, params, if_none_match=if_none_match)
+                try:
+                    first_page = next(pages)
+                except NotModified as e:
+                    return with_etag(Response(status=304), e.etag)
+                etag = page_etag(first_page)
+
+                events = (
+                    format_event(event)
+                    for page in chain([first_page], pages)
+                    for event in page.get('items', [])
+                )
+
+            period = {
+                'year': year,
+                'month': month,
+                'start': time_min,
+                'end': time_max
             }
 
-            response = requests.get(url, params=params, headers=headers)
+            def store(payload):
+                event_cache.set_month(request.user.id, calendar_id, year, month, payload, etag, version)
 
-            if response.status_code == 200:
-                calendar_data = response.json()
-                events = calendar_data.get('items', [])
-
-                formatted_events = []
-                for event in events:
-                    event_data = {
-                        'id': event.get('id'),
-                        'summary': event.get('summary'),
-                        'description': event.get('description'),
-                        'location': event.get('location'),
-                        'start': event.get('start'),
-                        'end': event.get('end'),
-                        'status': event.get('status'),
-                        'htmlLink': event.get('htmlLink'),
-                        'creator': event.get('creator')
-                    }
-                    formatted_events.append(event_data)
-
-                return Response({
-                    'events': formatted_events,
-                    'period': {
-                        'year': year,
-                        'month': month,
-                        'start': time_min,
-                        'end': time_max
-                    }
-                })
+            response = StreamingHttpResponse(
+                stream_month(events, period, None if stale else store, settings.CALENDAR_CACHE_MAX_EVENTS),
+                content_type='application/json'
+            )
+            response['X-Cache'] = 'STALE' if stale else 'MISS'
+            return with_etag(response, etag)
+        except RateLimited as e:
+            payload = None
+            if not request.query_params.get('calendars'):
+                payload = event_cache.get_stale_month(request.user.id, calendar_id, year, month)
+            if payload is None:
+                return rate_limited(e)
+            response = Response(month_response(payload, request.query_params))
+            response['X-Cache'] = 'STALE'
+            return response
+        except GoogleAPIError as e:
+            return Response({'error': f'Failed to fetch calendar events: {e.text}'}, status=e.status_code)
+        except Exception as e:
+            return Response({'error': 'Failed to fetch calendar events'}, status=500)
+
+
+@method_decorator(compress_page, name='dispatch')
+class CalendarEventRangeView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        access_token = request_access_token(request)
+
+        if not access_token:
+            return Response({'error': 'Missing access token'}, status=401)
+
+        try:
+            months = requested_months(request.query_params)
+        except (KeyError, ValueError):
+            return Response({'error': 'Provide start/end as YYYY-MM or months=YYYY-MM,...'}, status=400)
+
+        if not months or len(months) > settings.CALENDAR_RANGE_MAX_MONTHS:
+            return Response({'error': f'Request between 1 and {settings.CALENDAR_RANGE_MAX_MONTHS} months'},
+                            status=400)
+
+        try:
+            calendar_id = 'primary'
+            calendar_ids, truncated = requested_calendars(
+                request.user.id, access_token, request.query_params.get('calendars'))
+            error = too_many_calendars(calendar_ids)
+            if error:
+                return error
+
+            for prefetched_id in calendar_ids or [calendar_id]:
+                prefetch_beyond(request.user.id, prefetched_id, months)
+
+            if calendar_ids is not None:
+                loaded = load_calendar_months(request.user, access_token, calendar_ids, months)
+                payloads = merged_month_payloads(loaded, calendar_ids, months)
+            elif settings.CALENDAR_SYNC_ENABLED:
+                sync_or_stale(request.user, access_token, calendar_id)
+                payloads = [mirrored_month(request.user, calendar_id, year, month) for year, month in months]
             else:
-                return Response({'error': f'Failed to fetch calendar events: {response.text}'},
-                                status=response.status_code)
+                workers = min(len(months), settings.CALENDAR_RANGE_WORKERS)
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    payloads = list(pool.map(
+                        in_request_context(
+                            lambda year_month: fetch_month(request.user.id, access_token, calendar_id, *year_month)
+                        ),
+                        months
+                    ))
+
+            events, month_ids = merge_months(payloads)
+
+            response_data = {
+                'events': events,
+                'months': month_ids,
+                'period': {
+                    'start': payloads[0]['period']['start'],
+                    'end': payloads[-1]['period']['end']
+                }
+            }
+            if calendar_ids is not None:
+                response_data['calendars'] = calendar_ids
+                response_data['calendarsTruncated'] = truncated
+            return Response(response_data)
+        except GoogleAPIError as e:
+            return Response({'error': f'Failed to fetch calendar events: {e.text}'}, status=e.status_code)
+        except RateLimited as e:
+            return rate_limited(e)
         except Exception as e:
+            print(f"Error fetching calendar range: {str(e)}")
             return Response({'error': 'Failed to fetch calendar events'}, status=500)
 
 
@@ -90,7 +569,7 @@ class CalendarAddAutoEventView(APIView):
         if not request.user.is_authenticated:
             return Response({'error': 'Authentication required'}, status=401)
 
-        access_token = request.COOKIES.get('access_token')
+        access_token = request_access_token(request)
 
         if not access_token:
             return Response({'error': 'Missing access token'}, status=401)
@@ -99,19 +578,20 @@ class CalendarAddAutoEventView(APIView):
             calendar_id = 'primary'
             event_data = request.data
 
-            url = f'https://www.googleapis.com/calendar/v3/calendars/{calendar_id}/events'
+            url = events_url(calendar_id)
             headers = {
                 'Authorization': f'Bearer {access_token}',
                 'Content-Type': 'application/json'
             }
-            response = requests.post(
-                url, json=event_data, headers=headers, timeout=5)
-            print(response.text)
+            response = google_client.post(url, json=event_data, headers=headers)
             if response.status_code == 200:
+                mark_changed(request.user.id, calendar_id, event_cache.months_for_event(event_data))
                 return Response({'message': 'Event added successfully'})
             else:
                 return Response({'error': f'Failed to add event: {response.text}'}, status=response.status_code)
 
+        except RateLimited as e:
+            return rate_limited(e)
         except Exception as e:
             return Response({'error': 'Failed to add event'}, status=500)
 
@@ -123,7 +603,7 @@ class DeleteCalendarEvent(APIView):
         if not request.user.is_authenticated:
             return Response({'error': 'Authentication required'}, status=401)
 
-        access_token = request.COOKIES.get('access_token')
+        access_token = request_access_token(request)
 
         if not access_token:
             return Response({'error': 'Missing access token'}, status=401)
@@ -131,16 +611,478 @@ class DeleteCalendarEvent(APIView):
         try:
             calendar_id = 'primary'
 
-            url = f'https://www.googleapis.com/calendar/v3/calendars/{calendar_id}/events/{event_id}'
+            url = f'{events_url(calendar_id)}/{event_id}'
             headers = {
                 'Authorization': f'Bearer {access_token}'
             }
-            response = requests.delete(url, headers=headers, timeout=5)
+            response = google_client.delete(url, headers=headers)
 
-            if response.status_code == 200:
+            if response.status_code in (200, 204):
+                mark_changed(request.user.id, calendar_id)
                 return Response({'message': 'Event deleted successfully'})
             else:
                 return Response({'error': f'Failed to delete event: {response.text}'}, status=response.status_code)
 
+        except RateLimited as e:
+            return rate_limited(e)
         except Exception as e:
             return Response({'error': 'Failed to delete event'}, status=500)
+
+
+class FreeSlotsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        access_token = request_access_token(request)
+
+        if not access_token:
+            return Response({'error': 'Missing access token'}, status=401)
+
+        try:
+            tz = ZoneInfo(request.query_params.get('timezone', settings.TIME_ZONE))
+            start_date = date.fromisoformat(request.query_params.get('start', date.today().isoformat()))
+            end_date = date.fromisoformat(request.query_params.get('end', start_date.isoformat()))
+            work_start = time.fromisoformat(request.query_params.get('work_start', '09:00'))
+            work_end = time.fromisoformat(request.query_params.get('work_end', '17:00'))
+            duration = int(request.query_params.get('duration', 60))
+            order = request.query_params.get('order', 'earliest')
+            limit = request.query_params.get('limit')
+            limit = int(limit) if limit else None
+        except (ValueError, ZoneInfoNotFoundError):
+            return Response({'error': 'Invalid free slot query'}, status=400)
+
+        if end_date < start_date or duration <= 0 or work_end <= work_start:
+            return Response({'error': 'Invalid free slot query'}, status=400)
+
+        if (end_date - start_date).days > settings.FREE_SLOTS_MAX_DAYS:
+            return Response({'error': f'Range cannot exceed {settings.FREE_SLOTS_MAX_DAYS} days'}, status=400)
+
+        try:
+            calendar_id = 'primary'
+            time_min = datetime.combine(start_date, time.min, tzinfo=tz)
+            time_max = datetime.combine(end_date + timedelta(days=1), time.min, tzinfo=tz)
+
+            calendar_ids, truncated = requested_calendars(
+                request.user.id, access_token, request.query_params.get('calendars'))
+            calendar_ids = calendar_ids or [calendar_id]
+            error = too_many_calendars(calendar_ids)
+            if error:
+                return error
+
+            busy = query_free_busy(request.user.id, access_token, calendar_ids, time_min, time_max)
+
+            slots = find_free_slots(
+                busy,
+                start_date,
+                end_date,
+                work_start,
+                work_end,
+                timedelta(minutes=duration),
+                tz,
+                order=order,
+                limit=limit,
+            )
+
+            return Response({
+                'slots': [
+                    {
+                        'start': slot['start'].isoformat(),
+                        'end': slot['end'].isoformat(),
+                        'gapMinutes': slot['gap_minutes'],
+                    }
+                    for slot in slots
+                ],
+                'period': {
+                    'start': start_date.isoformat(),
+                    'end': end_date.isoformat(),
+                    'workStart': work_start.strftime('%H:%M'),
+                    'workEnd': work_end.strftime('%H:%M'),
+                    'duration': duration,
+                    'timeZone': str(tz),
+                    'calendars': calendar_ids,
+                    'calendarsTruncated': truncated,
+                }
+            })
+        except GoogleAPIError as e:
+            return Response({'error': f'Failed to fetch free/busy: {e.text}'}, status=e.status_code)
+        except RateLimited as e:
+            return rate_limited(e)
+        except Exception as e:
+            print(f"Error finding free slots: {str(e)}")
+            return Response({'error': 'Failed to find free slots'}, status=500)
+
+
+GROUP_SLOT_RESOLUTIONS = (1, 5, 10, 15, 30, 60)
+
+
+def parse_attendee(value, tz, work_start, work_end):
+    """
+    An attendee is a calendar ID (usually an email address), optionally with
+    its own time zone and working hours.
+    """
+    if isinstance(value, str):
+        return value, tz, work_start, work_end
+    return (
+        value['email'],
+        ZoneInfo(value['timezone']) if value.get('timezone') else tz,
+        time.fromisoformat(value['work_start']) if value.get('work_start') else work_start,
+        time.fromisoformat(value['work_end']) if value.get('work_end') else work_end,
+    )
+
+
+class GroupSlotsView(APIView):
+    """
+    Common free time for the user and a list of attendees, ranked by how
+    many of them have the slot inside their working hours.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        access_token = request_access_token(request)
+
+        if not access_token:
+            return Response({'error': 'Missing access token'}, status=401)
+
+        try:
+            data = request.data
+            tz = ZoneInfo(data.get('timezone', settings.TIME_ZONE))
+            start_date = date.fromisoformat(data.get('start', date.today().isoformat()))
+            end_date = date.fromisoformat(data.get('end', start_date.isoformat()))
+            work_start = time.fromisoformat(data.get('work_start', '09:00'))
+            work_end = time.fromisoformat(data.get('work_end', '17:00'))
+            duration = int(data.get('duration', 60))
+            resolution = int(data.get('resolution', 15))
+            limit = int(data.get('limit', 10))
+            if not isinstance(data.get('attendees'), list):
+                return Response({'error': 'attendees must be a list'}, status=400)
+            attendees = [('primary', tz, work_start, work_end)] + [
+                parse_attendee(value, tz, work_start, work_end) for value in data['attendees']
+            ]
+        except (KeyError, TypeError, ValueError, ZoneInfoNotFoundError):
+            return Response({'error': 'Invalid group slot query'}, status=400)
+
+        if end_date < start_date or work_end <= work_start or limit <= 0 or \
+                resolution not in GROUP_SLOT_RESOLUTIONS or duration <= 0 or duration % resolution:
+            return Response({'error': 'Invalid group slot query'}, status=400)
+
+        if not 1 < len(attendees) <= settings.GROUP_SLOTS_MAX_ATTENDEES + 1:
+            return Response({'error': f'Request between 1 and {settings.GROUP_SLOTS_MAX_ATTENDEES} attendees'},
+                            status=400)
+
+        if (end_date - start_date).days > settings.FREE_SLOTS_MAX_DAYS:
+            return Response({'error': f'Range cannot exceed {settings.FREE_SLOTS_MAX_DAYS} days'}, status=400)
+
+        try:
+            time_min = datetime.combine(start_date, time.min, tzinfo=tz).astimezone(timezone.utc)
+            time_max = datetime.combine(end_date + timedelta(days=1), time.min, tzinfo=tz).astimezone(timezone.utc)
+
+            calendar_ids = list(dict.fromkeys(calendar_id for calendar_id, _, _, _ in attendees))
+            busy = free_busy_by_calendar(request.user.id, access_token, calendar_ids, time_min, time_max)
+
+            group = [
+                Attendee(calendar_id, busy[calendar_id],
+                         attendee_hours(start_date, end_date, attendee_start, attendee_end, attendee_tz))
+                for calendar_id, attendee_tz, attendee_start, attendee_end in attendees
+                if busy.get(calendar_id) is not None
+            ]
+            slots = find_group_slots(
+                group,
+                working_windows(start_date, end_date, work_start, work_end, tz),
+                time_min,
+                time_max,
+                timedelta(minutes=duration),
+                timedelta(minutes=resolution),
+                tz,
+                limit=limit,
+            )
+
+            return Response({
+                'slots': [
+                    {
+                        'start': slot['start'].isoformat(),
+                        'end': slot['end'].isoformat(),
+                        'attendeesInHours': slot['in_hours'],
+                    }
+                    for slot in slots
+                ],
+                'attendees': [attendee.calendar_id for attendee in group],
+                'unavailable': [calendar_id for calendar_id in calendar_ids if busy.get(calendar_id) is None],
+                'period': {
+                    'start': start_date.isoformat(),
+                    'end': end_date.isoformat(),
+                    'workStart': work_start.strftime('%H:%M'),
+                    'workEnd': work_end.strftime('%H:%M'),
+                    'duration': duration,
+                    'resolution': resolution,
+                    'timeZone': str(tz),
+                }
+            })
+        except GoogleAPIError as e:
+            return Response({'error': f'Failed to fetch free/busy: {e.text}'}, status=e.status_code)
+        except RateLimited as e:
+            return rate_limited(e)
+        except Exception as e:
+            print(f"Error finding group slots: {str(e)}")
+            return Response({'error': 'Failed to find group slots'}, status=500)
+
+
+def batch_results(items, results, id_key='id'):
+    output = []
+    for index, (status_code, payload) in enumerate(results):
+        result = {'index': index, 'status': status_code}
+        if 200 <= status_code < 300:
+            result[id_key] = payload.get('id') if isinstance(payload, dict) else items[index]
+        else:
+            result['error'] = payload
+        output.append(result)
+    return output
+
+
+class BatchAddEventsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        access_token = request_access_token(request)
+
+        if not access_token:
+            return Response({'error': 'Missing access token'}, status=401)
+
+        events = request.data.get('events')
+        if not isinstance(events, list) or not events:
+            return Response({'error': 'Provide a non-empty list of events'}, status=400)
+
+        if len(events) > settings.CALENDAR_BATCH_MAX_ITEMS:
+            return Response({'error': f'Cannot add more than {settings.CALENDAR_BATCH_MAX_ITEMS} events at once'},
+                            status=400)
+
+        try:
+            calendar_id = 'primary'
+            items = [BatchItem('POST', events_path(calendar_id), event) for event in events]
+            results = execute_batch(access_token, items)
+
+            months = set()
+            for event, (status_code, _) in zip(events, results):
+                if 200 <= status_code < 300:
+                    months.update(event_cache.months_for_event(event))
+            if months:
+                mark_changed(request.user.id, calendar_id, months)
+
+            return batch_response({'results': batch_results(events, results)}, results)
+        except RateLimited as e:
+            return rate_limited(e)
+        except Exception as e:
+            print(f"Error adding events in batch: {str(e)}")
+            return Response({'error': 'Failed to add events'}, status=500)
+
+
+class BatchDeleteEventsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        access_token = request_access_token(request)
+
+        if not access_token:
+            return Response({'error': 'Missing access token'}, status=401)
+
+        event_ids = request.data.get('eventIds')
+        if not isinstance(event_ids, list) or not event_ids:
+            return Response({'error': 'Provide a non-empty list of eventIds'}, status=400)
+
+        if len(event_ids) > settings.CALENDAR_BATCH_MAX_ITEMS:
+            return Response({'error': f'Cannot delete more than {settings.CALENDAR_BATCH_MAX_ITEMS} events at once'},
+                            status=400)
+
+        try:
+            calendar_id = 'primary'
+            items = [BatchItem('DELETE', f'{events_path(calendar_id)}/{event_id}') for event_id in event_ids]
+            results = execute_batch(access_token, items)
+
+            if any(200 <= status_code < 300 for status_code, _ in results):
+                mark_changed(request.user.id, calendar_id)
+
+            return batch_response({'results': batch_results(event_ids, results)}, results)
+        except RateLimited as e:
+            return rate_limited(e)
+        except Exception as e:
+            print(f"Error deleting events in batch: {str(e)}")
+            return Response({'error': 'Failed to delete events'}, status=500)
+
+
+class AutoPlanView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        access_token = request_access_token(request)
+
+        if not access_token:
+            return Response({'error': 'Missing access token'}, status=401)
+
+        try:
+            tz = ZoneInfo(request.data.get('timezone', settings.TIME_ZONE))
+            start_date = date.fromisoformat(request.data.get('start', date.today().isoformat()))
+            days = int(request.data.get('days', 7))
+            work_start = time.fromisoformat(request.data.get('workStart', '09:00'))
+            work_end = time.fromisoformat(request.data.get('workEnd', '17:00'))
+            weekdays = request.data.get('weekdays')
+            weekdays = set(int(day) for day in weekdays) if weekdays is not None else None
+            tasks = parse_tasks(request.data.get('tasks') or [], tz)
+        except (KeyError, TypeError, ValueError, ZoneInfoNotFoundError):
+            return Response({'error': 'Invalid planning request'}, status=400)
+
+        if not tasks or not 0 < days <= settings.FREE_SLOTS_MAX_DAYS or work_end <= work_start:
+            return Response({'error': 'Invalid planning request'}, status=400)
+
+        if len(tasks) > settings.CALENDAR_BATCH_MAX_ITEMS:
+            return Response({'error': f'Cannot plan more than {settings.CALENDAR_BATCH_MAX_ITEMS} tasks at once'},
+                            status=400)
+
+        try:
+            calendar_id = 'primary'
+            time_min = datetime.combine(start_date, time.min, tzinfo=tz)
+            time_max = datetime.combine(start_date + timedelta(days=days), time.min, tzinfo=tz)
+            calendar_ids, truncated = requested_calendars(
+                request.user.id, access_token, request.data.get('calendars'))
+            calendar_ids = calendar_ids or [calendar_id]
+            error = too_many_calendars(calendar_ids)
+            if error:
+                return error
+
+            busy = query_free_busy(request.user.id, access_token, calendar_ids, time_min, time_max)
+
+            scheduled, unscheduled = plan(tasks, busy, start_date, days, work_start, work_end, tz, weekdays)
+
+            planned_events = [
+                {
+                    'summary': item['task'].summary,
+                    'start': {'dateTime': item['start'].astimezone(tz).isoformat(), 'timeZone': str(tz)},
+                    'end': {'dateTime': item['end'].astimezone(tz).isoformat(), 'timeZone': str(tz)},
+                }
+                for item in scheduled
+            ]
+
+            committed = None
+            results = []
+            if request.data.get('commit') and planned_events:
+                results = execute_batch(
+                    access_token,
+                    [BatchItem('POST', events_path(calendar_id), event) for event in planned_events]
+                )
+                months = set()
+                for event, (status_code, _) in zip(planned_events, results):
+                    if 200 <= status_code < 300:
+                        months.update(event_cache.months_for_event(event))
+                if months:
+                    mark_changed(request.user.id, calendar_id, months)
+                committed = batch_results(planned_events, results)
+
+            return batch_response({
+                'scheduled': [
+                    {'id': item['task'].id, **event}
+                    for item, event in zip(scheduled, planned_events)
+                ],
+                'unscheduled': [{'id': task_id, 'reason': reason} for task_id, reason in unscheduled.items()],
+                'committed': committed,
+                'calendarsTruncated': truncated,
+            }, results)
+        except GoogleAPIError as e:
+            return Response({'error': f'Failed to fetch free/busy: {e.text}'}, status=e.status_code)
+        except RateLimited as e:
+            return rate_limited(e)
+        except Exception as e:
+            print(f"Error planning tasks: {str(e)}")
+            return Response({'error': 'Failed to plan tasks'}, status=500)
+
+
+def channel_data(channel):
+    return {
+        'calendarId': channel.calendar_id,
+        'channelId': channel.channel_id,
+        'expiration': channel.expiration.isoformat(),
+    }
+
+
+class WatchCalendarView(APIView):
+    """
+    Open push notification channels for the user's calendars so their
+    cached months are kept until Google reports a change, or close them.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        if not settings.CALENDAR_WEBHOOK_URL:
+            return Response({'error': 'Push notifications are not configured'}, status=503)
+        if not event_cache.is_shared():
+            return Response({'error': 'Push notifications need a cache shared by all workers (REDIS_URL)'},
+                            status=503)
+
+        access_token = request_access_token(request)
+        if not access_token:
+            return Response({'error': 'Missing access token'}, status=401)
+
+        try:
+            calendar_ids, truncated = requested_calendars(
+                request.user.id, access_token, request.data.get('calendars'))
+            calendar_ids = calendar_ids or ['primary']
+            error = too_many_calendars(calendar_ids)
+            if error:
+                return error
+
+            renew_before = django_timezone.now() + timedelta(seconds=settings.CALENDAR_WATCH_RENEW_MARGIN)
+            channels = []
+            for calendar_id in calendar_ids:
+                channel = CalendarWatchChannel.objects.filter(
+                    user=request.user, calendar_id=calendar_id, expiration__gt=renew_before
+                ).first()
+                channels.append(channel or watch_calendar(request.user, access_token, calendar_id))
+
+            return Response({
+                'channels': [channel_data(channel) for channel in channels],
+                'calendarsTruncated': truncated,
+            })
+        except GoogleAPIError as e:
+            return Response({'error': f'Failed to watch calendar: {e.text}'}, status=e.status_code)
+        except RateLimited as e:
+            return rate_limited(e)
+        except Exception as e:
+            print(f"Error watching calendar: {str(e)}")
+            return Response({'error': 'Failed to watch calendar'}, status=500)
+
+    def delete(self, request):
+        access_token = request_access_token(request)
+        if not access_token:
+            return Response({'error': 'Missing access token'}, status=401)
+
+        try:
+            for channel in CalendarWatchChannel.objects.filter(user=request.user):
+                stop_channel(channel, access_token)
+            return Response({'message': 'Calendar notifications stopped'})
+        except GoogleAPIError as e:
+            return Response({'error': f'Failed to stop notifications: {e.text}'}, status=e.status_code)
+        except RateLimited as e:
+            return rate_limited(e)
+        except Exception as e:
+            print(f"Error stopping calendar notifications: {str(e)}")
+            return Response({'error': 'Failed to stop notifications'}, status=500)
+
+
+class CalendarNotificationView(APIView):
+    """
+    Webhook Google posts to when a watched calendar changes. Requests are
+    matched to a channel by its ID, resource ID and secret token.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        try:
+            handle_notification(
+                request.headers.get('X-Goog-Channel-ID'),
+                request.headers.get('X-Goog-Channel-Token'),
+                request.headers.get('X-Goog-Resource-ID'),
+                request.headers.get('X-Goog-Resource-State'),
+            )
+        except UnknownChannel:
+            return Response({'error': 'Unknown channel'}, status=404)
+        except ChannelMismatch:
+            return Response({'error': 'Invalid channel token'}, status=403)
+        return Response(status=204)
@@ -0,0 +1,146 @@
+import hmac
+import secrets
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+
+from core import google_client
+from google_auth.token_manager import get_access_token
+
+from . import cache as event_cache
+from .fetch import GoogleAPIError, events_url
+from .models import CalendarSyncState, CalendarWatchChannel
+
+# 'sync' is the handshake Google sends when a channel opens; the other
+# states mean something in the calendar changed.
+CHANGE_STATES = ('exists', 'not_exists')
+
+
+class UnknownChannel(Exception):
+    pass
+
+
+class ChannelMismatch(Exception):
+    pass
+
+
+def watch_calendar(user, access_token, calendar_id):
+    """
+    Open an events.watch channel that makes Google notify the webhook
+    whenever the calendar changes.
+    """
+    channel_id = uuid.uuid4().hex
+    token = secrets.token_urlsafe(32)
+
+    response = google_client.post(
+        f'{events_url(calendar_id)}/watch',
+        json={
+            'id': channel_id,
+            'type': 'web_hook',
+            'address': settings.CALENDAR_WEBHOOK_URL,
+            'token': token,
+            'params': {'ttl': str(settings.CALENDAR_WATCH_TTL)},
+        },
+        headers={'Authorization': f'Bearer {access_token}'}
+    )
+    if response.status_code != 200:
+        raise GoogleAPIError(response.status_code, response.text)
+
+    data = response.json()
+    already_watched = CalendarWatchChannel.objects.filter(user=user, calendar_id=calendar_id).exists()
+    channel = CalendarWatchChannel.objects.create(
+        user=user,
+        calendar_id=calendar_id,
+        channel_id=channel_id,
+        resource_id=data['resourceId'],
+        token=token,
+        expiration=datetime.fromtimestamp(int(data['expiration']) / 1000, tz=dt_timezone.utc),
+    )
+
+    # Changes made before the channel opened were never notified.
+    if not already_watched:
+        mark_changed(user.id, calendar_id)
+    event_cache.mark_watched(user.id, calendar_id, channel.expiration.timestamp())
+    return channel
+
+
+def stop_channel(channel, access_token):
+    response = google_client.post(
+        google_client.api_url('/calendar/v3/channels/stop'),
+        json={'id': channel.channel_id, 'resourceId': channel.resource_id},
+        headers={'Authorization': f'Bearer {access_token}'}
+    )
+    # 404 means Google already dropped the channel, e.g. after it expired.
+    if response.status_code not in (200, 204, 404):
+        raise GoogleAPIError(response.status_code, response.text)
+
+    channel.delete()
+    if not CalendarWatchChannel.objects.filter(user_id=channel.user_id, calendar_id=channel.calendar_id).exists():
+        event_cache.unmark_watched(channel.user_id, channel.calendar_id)
+        event_cache.invalidate_calendar(channel.user_id, channel.calendar_id)
+
+
+def mark_changed(user_id, calendar_id, months=None):
+    """
+    Record that a calendar changed, at Google or through one of our writes:
+    flag its mirror for the next sync, which would otherwise be skipped
+    while the calendar is watched, and drop its cached months, or only
+    months when given.
+    """
+    CalendarSyncState.objects.filter(user_id=user_id, calendar_id=calendar_id).update(dirty=True)
+    if months is None:
+        event_cache.invalidate_calendar(user_id, calendar_id)
+    else:
+        event_cache.invalidate_months(user_id, calendar_id, months)
+
+
+def handle_notification(channel_id, token, resource_id, resource_state):
+    """
+    Apply a push notification. Raises UnknownChannel for channels we never
+    opened or that have expired, and ChannelMismatch when the resource ID or
+    secret token does not match the channel.
+    """
+    channel = CalendarWatchChannel.objects.filter(channel_id=channel_id).first()
+    if channel is None or channel.expiration <= timezone.now():
+        raise UnknownChannel(channel_id)
+    if channel.resource_id != resource_id or not hmac.compare_digest(channel.token, token or ''):
+        raise ChannelMismatch(channel_id)
+
+    if resource_state in CHANGE_STATES:
+        mark_changed(channel.user_id, channel.calendar_id)
+
+
+def renew_expiring_channels(margin=None):
+    """
+    Replace channels that expire within margin seconds. Google cannot extend
+    a channel, so a new one is opened before the old one is stopped. Returns
+    (renewed, failed).
+    """
+    margin = settings.CALENDAR_WATCH_RENEW_MARGIN if margin is None else margin
+    cutoff = timezone.now() + timedelta(seconds=margin)
+    renewed = failed = 0
+
+    for channel in CalendarWatchChannel.objects.filter(expiration__lte=cutoff).select_related('user'):
+        try:
+            access_token = get_access_token(channel.user)
+            if access_token is None:
+                raise GoogleAPIError(401, 'No stored Google token')
+            watch_calendar(channel.user, access_token, channel.calendar_id)
+        except Exception as e:
+            print(f"Error renewing watch channel {channel.channel_id}: {str(e)}")
+            failed += 1
+            if channel.expiration <= timezone.now():
+                channel.delete()
+            continue
+
+        renewed += 1
+        try:
+            stop_channel(channel, access_token)
+        except Exception as e:
+            # Notifications on the old channel are ignored once its row is gone.
+            print(f"Error stopping watch channel {channel.channel_id}: {str(e)}")
+            channel.delete()
+
+    return renewed, failed
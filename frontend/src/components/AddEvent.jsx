@@ -1,8 +1,11 @@
 import { useState, useEffect, useRef } from 'react';
 import { Dialog, DialogTitle, DialogContent, DialogActions, Button, Select, MenuItem, Typography, TextField, DialogContentText } from '@mui/material';
-import { addCalendarEvent } from '../services/calendarService';
+import { addCalendarEvent, fetchFreeSlots } from '../services/calendarService';
 import { fetchNewEventAdded } from '../utils/calendarUtils';
 
+// Wait for duration picks and event reloads to settle before asking for slots.
+const FREE_SLOTS_DEBOUNCE_MS = 250;
+
 const AddEvent = ({
     open,
     handleClose,
@@ -31,9 +34,16 @@ const AddEvent = ({
     const [summary, setSummary] = useState('');
 
     useEffect(() => {
-        if (selectedSlot && events) {
-            findAvailableSlots();
-        }
+        if (!selectedSlot || !events) return;
+
+        // Aborting on cleanup drops responses for a slot or duration that
+        // is no longer selected, so they cannot overwrite newer ones.
+        const controller = new AbortController();
+        const timer = setTimeout(() => findAvailableSlots(controller.signal), FREE_SLOTS_DEBOUNCE_MS);
+        return () => {
+            clearTimeout(timer);
+            controller.abort();
+        };
     }, [selectedSlot, duration, events]);
 
     useEffect(() => {
@@ -48,46 +58,28 @@ const AddEvent = ({
         }
     }, [open]);
 
-    const findAvailableSlots = () => {
-        const clickedDate = new Date(selectedSlot.start);
-        clickedDate.setHours(0, 0, 0, 0);
-
-        const existingEvents = events
-            .filter(event => {
-                const eventStart = new Date(event.start?.dateTime || event.start?.date);
-                return eventStart.toDateString() === clickedDate.toDateString();
-            })
-            .map(event => ({
-                start: new Date(event.start?.dateTime || event.start?.date),
-                end: new Date(event.end?.dateTime || event.end?.date),
-            }))
-            .sort((a, b) => a.start - b.start);
-
-        const slots = [];
-        let currentTime = new Date(clickedDate);
-        currentTime.setHours(9, 0, 0, 0);
-
-        const endOfSearch = new Date(clickedDate);
-        endOfSearch.setHours(17, 0, 0, 0);
-
-        while (currentTime < endOfSearch) {
-            const slotEnd = new Date(currentTime.getTime() + duration * 60000);
-            if (slotEnd > endOfSearch) break;
-
-            const isAvailable = !existingEvents.some(event =>
-                currentTime < event.end && slotEnd > event.start
-            );
+    const toLocalDateString = (date) => {
+        const year = date.getFullYear();
+        const month = String(date.getMonth() + 1).padStart(2, '0');
+        const day = String(date.getDate()).padStart(2, '0');
+        return `${year}-${month}-${day}`;
+    };
 
-            if (isAvailable) {
-                slots.push({ start: new Date(currentTime), end: new Date(slotEnd) });
-                currentTime = slotEnd;
-            } else {
-                const nextEvent = existingEvents.find(e => e.start >= currentTime);
-                currentTime = nextEvent ? new Date(nextEvent.end) : endOfSearch;
-            }
+    const findAvailableSlots = async (signal) => {
+        try {
+            const day = toLocalDateString(new Date(selectedSlot.start));
+            const data = await fetchFreeSlots({ start: day, duration, signal });
+            if (signal.aborted) return;
+
+            setAvailableSlots((data.slots || []).map(slot => ({
+                start: new Date(slot.start),
+                end: new Date(slot.end),
+            })));
+        } catch (error) {
+            if (signal.aborted) return;
+            console.error('Error finding available slots:', error);
+            setAvailableSlots([]);
         }
-
-        setAvailableSlots(slots);
         setSelectedSlotIndex(0);
     };
 
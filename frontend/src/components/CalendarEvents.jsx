@@ -1,6 +1,6 @@
 import './CalendarEvents.css';
 import { useState, useRef } from 'react';
-import { fetchCalendarEvents } from '../services/calendarService';
+import { fetchCalendarEventsRange } from '../services/calendarService';
 import { useAuth } from '../context/AuthContext';
 import FullCalendar from '@fullcalendar/react'
 import dayGridPlugin from '@fullcalendar/daygrid'
@@ -44,15 +44,28 @@ const CalendarEvents = () => {
 
         try {
             setLoading(true);
-            const data = await fetchCalendarEvents(year, month);
-            const monthEvents = data.events || [];
+            const previous = new Date(year, month - 2, 1);
+            const next = new Date(year, month, 1);
+            const data = await fetchCalendarEventsRange(
+                `${previous.getFullYear()}-${previous.getMonth() + 1}`,
+                `${next.getFullYear()}-${next.getMonth() + 1}`
+            );
+
+            if (data.complete === false) {
+                throw new Error('Calendar events were only partly loaded');
+            }
+
+            const eventsById = Object.fromEntries((data.events || []).map(event => [event.id, event]));
+            const months = Object.fromEntries(
+                Object.entries(data.months || {}).map(([key, ids]) => [key, ids.map(id => eventsById[id])])
+            );
 
             setLoadedMonths(prev => ({
                 ...prev,
-                [cacheKey]: monthEvents
+                ...months
             }));
 
-            setEvents(monthEvents);
+            setEvents(months[cacheKey] || []);
 
             setError(null);
         } catch (err) {
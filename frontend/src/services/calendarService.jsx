@@ -1,6 +1,7 @@
 import { API_BASE_URL } from '../api/api.js';
 
 const currentUrl = `${API_BASE_URL}/api`;
+const MONTH_ATTEMPTS = 2;
 
 export const fetchCalendarEvents = async (year, month) => {
     try {
@@ -9,7 +10,42 @@ export const fetchCalendarEvents = async (year, month) => {
             url += `?year=${year}&month=${month}`;
         }
 
-        const response = await fetch(url, {
+        for (let attempt = 1; ; attempt++) {
+            const response = await fetch(url, {
+                method: 'GET',
+                credentials: 'include',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+            });
+
+            if (!response.ok) {
+                throw new Error('Failed to fetch calendar events');
+            }
+
+            // A month streamed from Google ends with complete: false when
+            // Google failed part-way through; it is retried before giving up.
+            const data = await response.json();
+            if (data.complete !== false) {
+                return data;
+            }
+            if (attempt >= MONTH_ATTEMPTS) {
+                throw new Error('Calendar events were only partly loaded');
+            }
+        }
+    } catch (error) {
+        console.error('Error fetching calendar events:', error);
+        throw error;
+    }
+};
+export const fetchCalendarEventsRange = async (start, end, calendars) => {
+    try {
+        const params = new URLSearchParams({ start, end });
+        if (calendars) {
+            params.set('calendars', Array.isArray(calendars) ? calendars.join(',') : calendars);
+        }
+
+        const response = await fetch(`${currentUrl}/calendar/range/?${params}`, {
             method: 'GET',
             credentials: 'include',
             headers: {
@@ -23,11 +59,43 @@ export const fetchCalendarEvents = async (year, month) => {
 
         return await response.json();
     } catch (error) {
-        console.error('Error fetching calendar events:', error);
+        console.error('Error fetching calendar events range:', error);
         throw error;
     }
 };
 
+export const fetchFreeSlots = async ({ start, end, duration, workStart = '09:00', workEnd = '17:00', signal }) => {
+    try {
+        const params = new URLSearchParams({
+            start,
+            end: end || start,
+            duration,
+            work_start: workStart,
+            work_end: workEnd,
+            timezone: Intl.DateTimeFormat().resolvedOptions().timeZone,
+        });
+
+        const response = await fetch(`${currentUrl}/calendar/free-slots/?${params}`, {
+            method: 'GET',
+            credentials: 'include',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            signal,
+        });
+
+        if (!response.ok) {
+            throw new Error('Failed to fetch free slots');
+        }
+
+        return await response.json();
+    } catch (error) {
+        if (error.name !== 'AbortError') {
+            console.error('Error fetching free slots:', error);
+        }
+        throw error;
+    }
+};
 
 export const fetchCsrfToken = async () => {
     try {
@@ -115,4 +183,47 @@ export const deleteCalendarEvent = async (eventId) => {
         console.error('Error deleting calendar event:', error);
         throw error;
     }
-};
\ No newline at end of file
+};
+
+const postCalendarBatch = async (path, body) => {
+    const csrfToken = await fetchCsrfToken();
+
+    if (!csrfToken) {
+        throw new Error('Unable to retrieve CSRF token');
+    }
+
+    const response = await fetch(`${currentUrl}/calendar/batch/${path}`, {
+        method: 'POST',
+        credentials: 'include',
+        headers: {
+            'Content-Type': 'application/json',
+            'X-CSRFToken': csrfToken
+        },
+        body: JSON.stringify(body)
+    });
+
+    if (!response.ok) {
+        const errorText = await response.text();
+        throw new Error(`Batch request failed: ${errorText || response.statusText}`);
+    }
+
+    return await response.json();
+};
+
+export const addCalendarEvents = async (events) => {
+    try {
+        return await postCalendarBatch('add-events', { events });
+    } catch (error) {
+        console.error('Error adding calendar events:', error);
+        throw error;
+    }
+};
+
+export const deleteCalendarEvents = async (eventIds) => {
+    try {
+        return await postCalendarBatch('delete-events', { eventIds });
+    } catch (error) {
+        console.error('Error deleting calendar events:', error);
+        throw error;
+    }
+};